@@ -1,7 +1,9 @@
 import os
-from flask import Flask
+from flask import Flask, Response
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy.orm import DeclarativeBase
+from utils.metrics import REGISTRY
+from utils.pool import engine_options, install_idle_ping
 
 class Base(DeclarativeBase):
     pass
@@ -11,17 +13,22 @@ app = Flask(__name__)
 
 # Configure database
 app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URL")
-app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
-    "pool_recycle": 300,
-    "pool_pre_ping": True,
-}
+if app.config["SQLALCHEMY_DATABASE_URI"]:
+    # Same DB_POOL_* sizing as the bot's engine, without a ping on every checkout
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = engine_options(app.config["SQLALCHEMY_DATABASE_URI"])
 
 db.init_app(app)
 
-with app.app_context():
-    from models.document import Document
-    from models.activity import Inspection, Sanction
-    db.create_all()
+if app.config["SQLALCHEMY_DATABASE_URI"]:
+    # pool_pre_ping is off, so stale connections are caught by the idle ping instead
+    with app.app_context():
+        install_idle_ping(db.engine)
+
+# The schema is managed by models/migrations.py (python -m tools.migrate), not at import
+
+@app.route("/metrics")
+def metrics():
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
 
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5000)
\ No newline at end of file
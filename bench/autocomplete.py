@@ -0,0 +1,61 @@
+"""
+Per-keystroke latency of the activity-name autocomplete index.
+
+Builds a PrefixIndex over N synthetic activity names and times lookups for
+random 1-4 character prefixes, as typed into the slash command field.
+
+    python -m bench.autocomplete --names 100000 --lookups 20000
+"""
+import argparse
+import random
+import string
+import time
+from utils.activity_index import PrefixIndex
+
+WORDS = [
+    "bar", "ristorante", "officina", "negozio", "hotel", "pizzeria", "farmacia",
+    "concessionaria", "discoteca", "palestra", "banca", "armeria", "taxi", "meccanico",
+]
+
+def synthetic_names(count: int, rng: random.Random) -> list:
+    names = set()
+    while len(names) < count:
+        suffix = "".join(rng.choices(string.ascii_lowercase + string.digits, k=6))
+        names.add(f"{rng.choice(WORDS).title()} {suffix}")
+    return list(names)
+
+def main(args):
+    rng = random.Random(args.seed)
+    names = synthetic_names(args.names, rng)
+
+    started = time.perf_counter()
+    index = PrefixIndex(names)
+    build_ms = (time.perf_counter() - started) * 1000
+    size = len(index)
+
+    prefixes = [name[:rng.randint(1, 4)].lower() for name in rng.choices(names, k=args.lookups)]
+    timings = []
+    for prefix in prefixes:
+        started = time.perf_counter_ns()
+        index.search(prefix)
+        timings.append(time.perf_counter_ns() - started)
+
+    started = time.perf_counter_ns()
+    for name in synthetic_names(1000, random.Random(args.seed + 1)):
+        index.add(name)
+    insert_us = (time.perf_counter_ns() - started) / 1000 / 1000
+
+    timings.sort()
+    def pct(p):
+        return timings[min(len(timings) - 1, int(p / 100 * len(timings)))] / 1000
+
+    print(f"{size} names, index built in {build_ms:.1f} ms")
+    print(f"lookup: mean={sum(timings) / len(timings) / 1000:.2f} us  p50={pct(50):.2f} us  p99={pct(99):.2f} us  max={timings[-1] / 1000:.2f} us")
+    print(f"insert: mean={insert_us:.2f} us")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Autocomplete prefix index latency")
+    parser.add_argument("--names", type=int, default=100_000)
+    parser.add_argument("--lookups", type=int, default=20_000)
+    parser.add_argument("--seed", type=int, default=7)
+    main(parser.parse_args())
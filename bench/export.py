@@ -0,0 +1,153 @@
+"""
+Memory and correctness of the streaming /esporta archive builder.
+
+Fills a scratch database with one activity holding --documents small text
+documents, --inspections random binary inspections of --inspection-mb MB
+each and --sanctions sanctions, exports it with a small part limit and
+checks that every part fits the limit, that the manifests account for
+every record and that chunked payloads reassemble to their stored hash.
+Peak Python heap (tracemalloc) is reported for increasing activity sizes
+to show it stays flat.
+
+    python -m bench.export --documents 2000 --inspections 6 --part-mb 8
+"""
+import argparse
+import asyncio
+import hashlib
+import io
+import json
+import os
+import sys
+import tarfile
+import tempfile
+import time
+import tracemalloc
+import zipfile
+
+_tmpdir = tempfile.mkdtemp(prefix="docbot-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}")
+os.environ.setdefault("BLOB_STORE_PATH", os.path.join(_tmpdir, "blobs"))
+
+from utils.database import configure_engine, dispose_engine
+from utils.write_batcher import close_write_batcher
+from models.migrations import migrate_database
+from models.repository import add_documents, add_inspection, add_sanction
+from utils.archive_export import MANIFEST_NAME, ActivityExporter
+
+async def populate(activity: str, documents: int, inspections: int, inspection_bytes: int, sanctions: int):
+    batch = 50
+    for start in range(0, documents, batch):
+        await add_documents(
+            [
+                {"content": f"Documento {index} di {activity}\n".encode() * 40, "context": f"Contesto del documento {index}"}
+                for index in range(start, min(documents, start + batch))
+            ],
+            activity, "1", "bench"
+        )
+    for _ in range(inspections):
+        await add_inspection(activity, os.urandom(inspection_bytes), "1", "bench", "application/pdf")
+    for index in range(sanctions):
+        await add_sanction(activity, f"Motivo {index}", "Sanzione di prova", "1", "bench")
+
+def read_part(fmt: str, data: bytes) -> dict:
+    entries = {}
+    if fmt == "zip":
+        with zipfile.ZipFile(io.BytesIO(data)) as archive:
+            for name in archive.namelist():
+                entries[name] = archive.read(name)
+    else:
+        with tarfile.open(fileobj=io.BytesIO(data), mode="r:gz") as archive:
+            for member in archive.getmembers():
+                entries[member.name] = archive.extractfile(member).read()
+    return entries
+
+async def export(activity: str, fmt: str, part_limit: int) -> dict:
+    exporter = ActivityExporter(activity, fmt=fmt, part_limit=part_limit)
+    failures = []
+    entries, records, last_manifest = {}, [], None
+    largest = peak = 0
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    async for part in exporter.parts():
+        # Verification copies stay outside the measured peak
+        peak = max(peak, tracemalloc.get_traced_memory()[1])
+        tracemalloc.stop()
+        data = part.file.read()
+        part.close()
+        largest = max(largest, len(data))
+        if len(data) > part_limit:
+            failures.append(f"part {part.number} is {len(data)} bytes, over the {part_limit} limit")
+        content = read_part(fmt, data)
+        manifest = json.loads(content.pop(MANIFEST_NAME))
+        entries.update(content)
+        records.extend(manifest["records"])
+        last_manifest = manifest
+        del data, content
+        tracemalloc.start()
+    elapsed = time.perf_counter() - started
+    peak = max(peak, tracemalloc.get_traced_memory()[1])
+    tracemalloc.stop()
+
+    for record in records:
+        if "file" not in record:
+            continue
+        names = record.get("chunks", [record["file"]])
+        missing = [name for name in names if name not in entries]
+        if missing:
+            failures.append(f"record {record['kind']} {record['id']} is missing {missing}")
+            continue
+        payload = b"".join(entries[name] for name in names)
+        if record["sha256"] and hashlib.sha256(payload).hexdigest() != record["sha256"]:
+            failures.append(f"record {record['kind']} {record['id']} does not match its hash")
+
+    totals = last_manifest["totals"]
+    if not last_manifest["last_part"] or len(records) != sum(totals[k] for k in ("documents", "inspections", "sanctions")):
+        failures.append("manifests do not account for every record")
+
+    return {
+        "records": len(records),
+        "parts": exporter.stats.parts,
+        "payload_mb": exporter.stats.payload_bytes / 1024 / 1024,
+        "largest_mb": largest / 1024 / 1024,
+        "peak_mb": peak / 1024 / 1024,
+        "seconds": elapsed,
+        "failures": failures,
+    }
+
+async def main(args) -> int:
+    configure_engine(os.environ["DATABASE_URL"])
+    await migrate_database()
+
+    failed = False
+    print(f"part limit {args.part_mb} MB")
+    print(f"{'activity':<12} {'format':<7} {'records':>8} {'payload MB':>11} {'parts':>6} {'largest MB':>11} {'peak heap MB':>13} {'seconds':>8}")
+    for scale in (1, 2, 4):
+        activity = f"bench-x{scale}"
+        await populate(
+            activity, args.documents * scale, args.inspections * scale,
+            int(args.inspection_mb * 1024 * 1024), args.sanctions * scale
+        )
+        for fmt in ("zip", "tar.gz"):
+            result = await export(activity, fmt, int(args.part_mb * 1024 * 1024))
+            print(
+                f"{activity:<12} {fmt:<7} {result['records']:>8} {result['payload_mb']:>11.1f} {result['parts']:>6} "
+                f"{result['largest_mb']:>11.2f} {result['peak_mb']:>13.2f} {result['seconds']:>8.2f}"
+            )
+            for failure in result["failures"]:
+                print(f"  FAIL: {failure}")
+                failed = True
+
+    await close_write_batcher()
+    await dispose_engine()
+    print("FAIL" if failed else "OK")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Streaming archive export")
+    parser.add_argument("--documents", type=int, default=1000)
+    parser.add_argument("--inspections", type=int, default=4)
+    parser.add_argument("--inspection-mb", type=float, default=6.0)
+    parser.add_argument("--sanctions", type=int, default=200)
+    parser.add_argument("--part-mb", type=float, default=8.0)
+    sys.exit(asyncio.run(main(parser.parse_args())))
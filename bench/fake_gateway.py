@@ -0,0 +1,350 @@
+"""
+Minimal offline stand-in for Discord's REST API and gateway.
+
+Implements just enough for discord.py to log in, identify shards and fire
+on_ready: /users/@me, /oauth2/applications/@me, /gateway/bot, command
+sync (optionally slowed down like Discord's rate-limited bulk overwrite),
+and a websocket that answers HELLO/IDENTIFY/HEARTBEAT. Every IDENTIFY and
+command sync is recorded and exposed on /_fake/identifies so shard
+distribution and reconnects can be checked; invalidate_sessions() forces
+every shard to reconnect and identify again.
+
+POST /channels/{id}/messages enforces Discord's per-message limits (400)
+and a per-channel rate-limit bucket (X-RateLimit-* headers, 429 when
+exhausted), counting both in `message_stats`.
+
+GET /attachments/{size}/{filename} stands in for the CDN: it streams
+`size` random bytes, so attachment downloads can be exercised offline.
+
+The benches point discord.py at it with use_fake_gateway(), in the
+process that runs the bot; worker processes get the addresses through
+FAKE_DISCORD_API_BASE and FAKE_DISCORD_GATEWAY_URL. The bot itself always
+talks to Discord.
+
+    python -m bench.fake_gateway --port 8765 --shards 4
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import threading
+import os
+import time
+import uuid
+from typing import Optional
+from datetime import datetime, timezone
+
+from aiohttp import WSMsgType, web
+
+BOT_USER = {
+    "id": "100000000000000001",
+    "username": "DocBot",
+    "discriminator": "0000",
+    "global_name": None,
+    "avatar": None,
+    "bot": True,
+}
+
+APPLICATION = {
+    "id": "100000000000000002",
+    "name": "DocBot",
+    "description": "",
+    "icon": None,
+    "bot_public": False,
+    "bot_require_code_grant": False,
+    "verify_key": "0" * 64,
+    "owner": {**BOT_USER, "id": "100000000000000003", "username": "owner", "bot": False},
+    "flags": 0,
+}
+
+HEARTBEAT_INTERVAL_MS = 41250
+
+MAX_EMBEDS = 10
+MAX_FILES = 10
+MAX_EMBED_CHARS = 6000
+
+def _embed_chars(embed: dict) -> int:
+    total = len(embed.get("title", "")) + len(embed.get("description", ""))
+    total += len(embed.get("footer", {}).get("text", "")) + len(embed.get("author", {}).get("name", ""))
+    total += sum(len(field["name"]) + len(field["value"]) for field in embed.get("fields", []))
+    return total
+
+def json_response(payload) -> web.Response:
+    # discord.py only decodes bodies whose content type is exactly application/json
+    return web.Response(body=json.dumps(payload).encode(), headers={"Content-Type": "application/json"})
+
+class FakeGateway:
+    def __init__(
+        self,
+        shards: int = 1,
+        host: str = "127.0.0.1",
+        port: int = 8765,
+        sync_delay: float = 0.0,
+        message_limit: int = 5,
+        message_window: float = 5.0,
+    ):
+        self.shards = shards
+        self.host = host
+        self.port = port
+        self.sync_delay = sync_delay
+        self.message_limit = message_limit
+        self.message_window = message_window
+        self.message_stats = {"posted": 0, "rate_limited": 0, "rejected": 0, "embeds": 0, "files": 0}
+        self._channel_buckets = {}
+        self._ids = itertools.count(200000000000000000)
+        self.identifies = []
+        self.connected = {}
+        self.syncs = 0
+        self._sockets = set()
+        self._runner = None
+        self._loop = None
+
+    @property
+    def api_base(self) -> str:
+        return f"http://{self.host}:{self.port}/api/v10"
+
+    @property
+    def gateway_url(self) -> str:
+        return f"ws://{self.host}:{self.port}/gateway"
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/api/v10/users/@me", self.json_handler(BOT_USER))
+        app.router.add_get("/api/v10/oauth2/applications/@me", self.json_handler(APPLICATION))
+        app.router.add_get("/api/v10/gateway/bot", self.gateway_bot)
+        app.router.add_get("/api/v10/gateway", self.json_handler({"url": self.gateway_url}))
+        app.router.add_put("/api/v10/applications/{application_id}/commands", self.sync_commands)
+        app.router.add_post("/api/v10/channels/{channel_id}/messages", self.create_message)
+        app.router.add_get("/gateway", self.websocket)
+        app.router.add_get("/_fake/identifies", self.report)
+        app.router.add_get("/attachments/{size}/{filename}", self.attachment)
+        app.router.add_route("*", "/api/v10/{tail:.*}", self.json_handler({}))
+        return app
+
+    def json_handler(self, payload):
+        async def handler(request):
+            return json_response(payload)
+        return handler
+
+    async def gateway_bot(self, request):
+        return json_response({
+            "url": self.gateway_url,
+            "shards": self.shards,
+            "session_start_limit": {"total": 1000, "remaining": 1000, "reset_after": 0, "max_concurrency": 1},
+        })
+
+    async def sync_commands(self, request):
+        await asyncio.sleep(self.sync_delay)
+        self.syncs += 1
+        return json_response([])
+
+    def _take_message_token(self, channel_id: str):
+        """
+        Fixed-window bucket per channel. Returns (allowed, remaining, reset_after).
+        """
+        now = time.monotonic()
+        window_start, used = self._channel_buckets.get(channel_id, (now, 0))
+        if now - window_start >= self.message_window:
+            window_start, used = now, 0
+        reset_after = self.message_window - (now - window_start)
+        if used >= self.message_limit:
+            return False, 0, reset_after
+        used += 1
+        self._channel_buckets[channel_id] = (window_start, used)
+        return True, self.message_limit - used, reset_after
+
+    async def create_message(self, request):
+        channel_id = request.match_info["channel_id"]
+        allowed, remaining, reset_after = self._take_message_token(channel_id)
+        headers = {
+            "Content-Type": "application/json",
+            "X-RateLimit-Limit": str(self.message_limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+            "X-RateLimit-Bucket": f"channel-{channel_id}",
+            # discord.py treats a 429 without Via as a Cloudflare ban and gives up
+            "Via": "1.1 google",
+        }
+        if not allowed:
+            self.message_stats["rate_limited"] += 1
+            headers["X-RateLimit-Scope"] = "user"
+            body = {"message": "You are being rate limited.", "retry_after": reset_after, "global": False}
+            return web.Response(status=429, body=json.dumps(body).encode(), headers=headers)
+
+        payload, files = {}, []
+        if request.content_type.startswith("multipart/"):
+            reader = await request.multipart()
+            async for part in reader:
+                if part.name == "payload_json":
+                    payload = json.loads(await part.text())
+                else:
+                    files.append((part.filename, len(await part.read())))
+        else:
+            payload = await request.json()
+
+        embeds = payload.get("embeds") or []
+        if (len(embeds) > MAX_EMBEDS or len(files) > MAX_FILES
+                or sum(_embed_chars(embed) for embed in embeds) > MAX_EMBED_CHARS):
+            self.message_stats["rejected"] += 1
+            body = {"code": 50035, "message": "Invalid Form Body"}
+            return web.Response(status=400, body=json.dumps(body).encode(), headers=headers)
+
+        self.message_stats["posted"] += 1
+        self.message_stats["embeds"] += len(embeds)
+        self.message_stats["files"] += len(files)
+        message = {
+            "id": str(next(self._ids)),
+            "channel_id": channel_id,
+            "content": payload.get("content") or "",
+            "embeds": embeds,
+            "attachments": [
+                {"id": str(next(self._ids)), "filename": filename, "size": size,
+                 "url": f"http://{self.host}/{filename}", "proxy_url": f"http://{self.host}/{filename}"}
+                for filename, size in files
+            ],
+            "author": BOT_USER,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "edited_timestamp": None,
+            "type": 0,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "pinned": False,
+            "flags": 0,
+        }
+        return web.Response(body=json.dumps(message).encode(), headers=headers)
+
+    def attachment_url(self, size: int, filename: str) -> str:
+        return f"http://{self.host}:{self.port}/attachments/{size}/{filename}"
+
+    async def attachment(self, request):
+        size = int(request.match_info["size"])
+        response = web.StreamResponse(headers={"Content-Type": "application/octet-stream"})
+        response.content_length = size
+        await response.prepare(request)
+        # Random bytes, so every download is a distinct blob
+        while size > 0:
+            chunk = os.urandom(min(size, 64 * 1024))
+            await response.write(chunk)
+            size -= len(chunk)
+        await response.write_eof()
+        return response
+
+    async def report(self, request):
+        return json_response({
+            "identifies": self.identifies,
+            "syncs": self.syncs,
+            "connected": {str(shard): count for shard, count in self.connected.items() if count},
+        })
+
+    async def websocket(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        self._sockets.add(ws)
+        await ws.send_str(json.dumps({"op": 10, "d": {"heartbeat_interval": HEARTBEAT_INTERVAL_MS}}))
+
+        shard = None
+        sequence = 0
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                payload = json.loads(message.data)
+                if payload["op"] == 1:
+                    await ws.send_str(json.dumps({"op": 11}))
+                elif payload["op"] == 2:
+                    shard_id, shard_count = payload["d"].get("shard", [0, 1])
+                    shard = shard_id
+                    self.connected[shard] = self.connected.get(shard, 0) + 1
+                    self.identifies.append({"shard": shard_id, "shard_count": shard_count, "at": time.time()})
+                    sequence += 1
+                    await ws.send_str(json.dumps({
+                        "op": 0, "t": "READY", "s": sequence,
+                        "d": {
+                            "v": 10,
+                            "user": BOT_USER,
+                            "guilds": [],
+                            "session_id": uuid.uuid4().hex,
+                            "resume_gateway_url": self.gateway_url,
+                            "shard": [shard_id, shard_count],
+                            "application": {"id": APPLICATION["id"], "flags": 0},
+                        },
+                    }))
+        finally:
+            self._sockets.discard(ws)
+            if shard is not None:
+                self.connected[shard] -= 1
+        return ws
+
+    async def invalidate_sessions(self):
+        """
+        Send INVALID_SESSION (not resumable) to every connected shard.
+        """
+        for ws in list(self._sockets):
+            await ws.send_str(json.dumps({"op": 9, "d": False}))
+
+    def invalidate_sessions_threadsafe(self):
+        asyncio.run_coroutine_threadsafe(self.invalidate_sessions(), self._loop).result()
+
+    async def start(self):
+        self._runner = web.AppRunner(self.app())
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def start_in_thread(self) -> threading.Thread:
+        """
+        Serve from a daemon thread with its own event loop.
+        """
+        started = threading.Event()
+
+        def serve():
+            loop = self._loop = asyncio.new_event_loop()
+            loop.run_until_complete(self.start())
+            started.set()
+            loop.run_forever()
+
+        thread = threading.Thread(target=serve, name="fake-gateway", daemon=True)
+        thread.start()
+        started.wait()
+        return thread
+
+def use_fake_gateway(api_base: Optional[str] = None, gateway_url: Optional[str] = None):
+    """
+    Send this process's discord.py REST calls and gateway connections to a
+    fake gateway, by default the one named in FAKE_DISCORD_API_BASE and
+    FAKE_DISCORD_GATEWAY_URL.
+    """
+    import discord
+    import yarl
+    from discord.gateway import DiscordWebSocket
+
+    discord.http.Route.BASE = api_base or os.environ["FAKE_DISCORD_API_BASE"]
+    DiscordWebSocket.DEFAULT_GATEWAY = yarl.URL(gateway_url or os.environ["FAKE_DISCORD_GATEWAY_URL"])
+
+def run_fake_cluster(spec, token: str):
+    """
+    Supervisor target: utils.cluster.run_cluster against the fake gateway.
+    """
+    from utils.cluster import run_cluster
+    use_fake_gateway()
+    run_cluster(spec, token)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--shards", type=int, default=4)
+    parser.add_argument("--sync-delay", type=float, default=0.0)
+    args = parser.parse_args()
+
+    gateway = FakeGateway(args.shards, args.host, args.port, args.sync_delay)
+    print(f"API {gateway.api_base}, gateway {gateway.gateway_url}, {args.shards} shards")
+    web.run_app(gateway.app(), host=args.host, port=args.port, print=None)
+
+if __name__ == "__main__":
+    main()
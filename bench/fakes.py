@@ -0,0 +1,151 @@
+"""
+Stand-ins for the discord.py objects the cogs touch, so command handlers
+can be called directly without a gateway connection.
+
+Every REST call an interaction would make (responses, followups, channel
+sends, deletes) is recorded on the FakeInteraction and can be delayed by
+`api_latency` seconds to model the round trip to Discord. Files passed to
+a send are read to the end, as discord.py does when it uploads them.
+"""
+import asyncio
+import itertools
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional
+
+import discord
+
+_ids = itertools.count(300000000000000000)
+
+def snowflake() -> int:
+    return next(_ids)
+
+@dataclass
+class SentMessage:
+    """One recorded call: what was sent and through which endpoint."""
+    via: str
+    content: Optional[str] = None
+    embeds: List[discord.Embed] = field(default_factory=list)
+    files: int = 0
+    file_bytes: int = 0
+    ephemeral: bool = False
+
+def _drain(files) -> int:
+    total = 0
+    for file in files or ():
+        total += len(file.fp.read())
+        file.close()
+    return total
+
+def _record(log: List[SentMessage], via: str, content=None, embed=None, embeds=None, file=None, files=None, ephemeral=False, **_) -> SentMessage:
+    embeds = list(embeds or ()) + ([embed] if embed is not None else [])
+    files = list(files or ()) + ([file] if file is not None else [])
+    sent = SentMessage(via, content, embeds, len(files), _drain(files), ephemeral)
+    log.append(sent)
+    return sent
+
+class FakeMessage:
+    def __init__(self, channel: "FakeChannel", sent: SentMessage):
+        self.id = snowflake()
+        self.channel = channel
+        self.sent = sent
+        self.deleted = False
+
+    async def delete(self):
+        await self.channel._round_trip()
+        self.deleted = True
+
+class FakeChannel:
+    """A text channel, or the followup webhook of an interaction."""
+
+    def __init__(self, log: List[SentMessage], api_latency: float = 0.0, via: str = "channel"):
+        self.id = snowflake()
+        self.log = log
+        self.api_latency = api_latency
+        self.via = via
+
+    async def _round_trip(self):
+        if self.api_latency:
+            await asyncio.sleep(self.api_latency)
+
+    async def send(self, content=None, **kwargs) -> FakeMessage:
+        await self._round_trip()
+        return FakeMessage(self, _record(self.log, self.via, content, **kwargs))
+
+class FakeResponse:
+    """discord.InteractionResponse: one initial response per interaction."""
+
+    def __init__(self, interaction: "FakeInteraction"):
+        self._interaction = interaction
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def _respond(self):
+        if self._done:
+            raise discord.InteractionResponded(self._interaction)
+        self._done = True
+        await self._interaction.channel._round_trip()
+
+    async def defer(self, ephemeral: bool = False, thinking: bool = False):
+        await self._respond()
+
+    async def send_message(self, content=None, **kwargs):
+        await self._respond()
+        _record(self._interaction.sent, "response", content, **kwargs)
+
+    async def edit_message(self, content=None, **kwargs):
+        await self._respond()
+        _record(self._interaction.sent, "edit", content, **kwargs)
+
+    async def send_modal(self, modal: discord.ui.Modal):
+        await self._respond()
+        self._interaction.sent.append(SentMessage("modal", modal.title))
+
+class FakeMember:
+    def __init__(self, user_id: Optional[int] = None, name: str = "Bench"):
+        self.id = user_id if user_id is not None else snowflake()
+        self.name = name
+        self.display_name = name
+        self.mention = f"<@{self.id}>"
+        self.display_avatar = SimpleNamespace(url="https://cdn.discordapp.com/embed/avatars/0.png")
+        self.guild_permissions = discord.Permissions.all()
+
+class FakeAttachment:
+    def __init__(self, url: str, size: int, filename: str = "ispezione.pdf", content_type: str = "application/pdf"):
+        self.id = snowflake()
+        self.url = url
+        self.size = size
+        self.filename = filename
+        self.content_type = content_type
+
+class FakeGuild:
+    def __init__(self, filesize_limit: int = 25 * 1024 * 1024):
+        self.id = snowflake()
+        self.filesize_limit = filesize_limit
+
+class FakeInteraction:
+    """
+    discord.Interaction as seen by a command handler: user, guild, channel,
+    response and followup. Everything sent is appended to `sent`.
+    """
+
+    def __init__(
+        self,
+        user: Optional[FakeMember] = None,
+        guild: Optional[FakeGuild] = None,
+        channel: Optional[FakeChannel] = None,
+        api_latency: float = 0.0,
+    ):
+        self.id = snowflake()
+        self.sent: List[SentMessage] = []
+        self.user = user or FakeMember()
+        self.guild = guild or FakeGuild()
+        self.channel = channel or FakeChannel(self.sent, api_latency)
+        self.followup = FakeChannel(self.sent, api_latency, via="followup")
+        self.response = FakeResponse(self)
+        self.extras: Dict[str, Any] = {}
+
+    def messages(self, via: Optional[str] = None) -> List[SentMessage]:
+        return [message for message in self.sent if via is None or message.via == via]
@@ -0,0 +1,89 @@
+"""
+Throughput and latency of group commit at different batching windows.
+
+Fires concurrent sanction inserts (the smallest write path) through the
+repository for each window size and reports writes/s, p50/p99 latency per
+write and the mean batch size. Window 0 is the unbatched baseline where
+every write commits on its own.
+
+    python -m bench.group_commit --writes 2000 --concurrency 100 --windows 0 2 5 10 20
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+_tmpdir = tempfile.mkdtemp(prefix="docbot-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}")
+os.environ.setdefault("BLOB_STORE_PATH", os.path.join(_tmpdir, "blobs"))
+
+from sqlalchemy import event
+from utils.database import configure_engine, dispose_engine
+from utils.write_batcher import close_write_batcher, configure_write_batcher, get_write_batcher
+from models.repository import add_sanction
+from models.migrations import migrate_database
+
+async def run(window_ms: float, writes: int, concurrency: int, max_rows: int) -> dict:
+    configure_write_batcher(window_ms, max_rows)
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one(index: int):
+        async with semaphore:
+            started = time.perf_counter()
+            await add_sanction(f"bench-{index % 50}", "motivo", "sanzione", str(index % 20), "bench")
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(writes)))
+    elapsed = time.perf_counter() - started
+
+    batcher = get_write_batcher()
+    mean_batch = batcher.stats()["mean_batch_size"] if batcher else 1.0
+    await close_write_batcher()
+
+    latencies.sort()
+    return {
+        "window_ms": window_ms,
+        "throughput": writes / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))] * 1000,
+        "mean_batch": mean_batch,
+    }
+
+async def main(args) -> int:
+    engine = configure_engine(os.environ["DATABASE_URL"], pool_size=args.pool_size, max_overflow=0)
+    if engine.url.get_backend_name() == "sqlite":
+        @event.listens_for(engine.sync_engine, "connect")
+        def durable_sqlite(dbapi_connection, connection_record):
+            # Make every commit pay for an fsync, as Postgres does
+            cursor = dbapi_connection.cursor()
+            cursor.execute("PRAGMA journal_mode=WAL")
+            cursor.execute("PRAGMA synchronous=FULL")
+            cursor.execute("PRAGMA busy_timeout=30000")
+            cursor.close()
+
+    await migrate_database()
+
+    print(f"{args.writes} writes, concurrency {args.concurrency}, backend {engine.url.get_backend_name()}")
+    print(f"{'window':>8} {'writes/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'batch':>7}")
+    for window in args.windows:
+        result = await run(window, args.writes, args.concurrency, args.max_rows)
+        print(
+            f"{result['window_ms']:>6.1f}ms {result['throughput']:>10.0f} "
+            f"{result['p50_ms']:>9.2f} {result['p99_ms']:>9.2f} {result['mean_batch']:>7.1f}"
+        )
+
+    await dispose_engine()
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Group commit throughput and latency")
+    parser.add_argument("--writes", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=100)
+    parser.add_argument("--windows", type=float, nargs="+", default=[0, 2, 5, 10, 20])
+    parser.add_argument("--max-rows", type=int, default=100)
+    parser.add_argument("--pool-size", type=int, default=5)
+    sys.exit(asyncio.run(main(parser.parse_args())))
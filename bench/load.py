@@ -0,0 +1,338 @@
+"""
+Offline load test of the command handlers.
+
+Calls the cogs' handlers directly with fake interactions (bench.fakes), at
+--concurrency operations in flight, against DATABASE_URL (a scratch SQLite
+file by default, or a local Postgres). Scenarios:
+
+    documenti   /documenti: open (or reopen) an upload draft
+    invia       the draft's "Invia" button with --documents documents attached
+    attivita    /attivita: first page of an activity, payloads included
+    ispezione   /ispezione with an --inspection-kb attachment, downloaded
+                from the fake gateway's CDN stand-in
+    sanzione    /sanzione
+    stipendio   /stipendio for one of the seeded authors
+
+With --journal, submissions go through the write journal (in a scratch
+directory) and are acknowledged once fsynced; the run waits for the
+replay to catch up before reporting. Each scenario reports throughput
+and p50/p95/p99 latency; an operation
+counts as failed when the handler answers with an error message. Results
+are written as JSON (--output) together with the commit they were taken
+at, and --compare prints the change against an earlier run, exiting with
+status 1 if any scenario got slower than --threshold percent at p95 or in
+throughput.
+
+    python -m bench.load --seed-documents 100000 --concurrency 50 --operations 500 --output load.json
+    python -m bench.load --compare load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+_tmpdir = tempfile.mkdtemp(prefix="docbot-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}")
+os.environ.setdefault("BLOB_STORE_PATH", os.path.join(_tmpdir, "blobs"))
+os.environ.setdefault("DRAFT_STORE_PATH", os.path.join(_tmpdir, "drafts"))
+os.environ.setdefault("JOURNAL_PATH", os.path.join(_tmpdir, "journal"))
+os.environ.setdefault("LOG_LEVEL", "CRITICAL")
+
+import logging
+
+from bench.fake_gateway import FakeGateway
+from bench.fakes import FakeAttachment, FakeChannel, FakeInteraction, FakeMember
+from bench.seed import seed
+from cogs.admin_commands import AdminCommands
+from cogs.document_handler import DocumentHandler, SubmitDraftButton
+from models.migrations import migrate_database
+from models.repository import apply_journal_entries, get_activity_names
+from utils.database import configure_engine, dispose_engine
+from utils.drafts import get_draft_store
+from utils.journal import close_journal, start_journal
+from utils.send_scheduler import send_scheduler
+from utils.write_batcher import close_write_batcher
+
+SCENARIOS = ("documenti", "invia", "attivita", "ispezione", "sanzione", "stipendio")
+
+def percentile(values: list, p: float) -> float:
+    return values[min(len(values) - 1, int(p / 100 * len(values)))] if values else 0.0
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+class LoadTest:
+    def __init__(self, args, gateway: FakeGateway, staff: list, activities: list):
+        self.args = args
+        self.gateway = gateway
+        self.staff = staff
+        self.activities = activities
+        self.rng = random.Random(args.seed)
+        self.bot = None
+        self.documents = DocumentHandler(self.bot)
+        self.admin = AdminCommands(self.bot)
+        self.channels = [FakeChannel([], args.api_latency) for _ in range(args.channels)]
+        self._users = iter(range(10**15, 10**16))
+
+    def interaction(self, user: FakeMember = None) -> FakeInteraction:
+        return FakeInteraction(
+            user=user or FakeMember(next(self._users), "Bench"),
+            channel=self.rng.choice(self.channels),
+            api_latency=self.args.api_latency
+        )
+
+    # Each scenario returns (prepare, run, ok): prepare is untimed setup for
+    # one operation, run the handler call, ok checks what the handler answered.
+
+    def documenti(self):
+        async def prepare():
+            return self.interaction(), self.rng.choice(self.activities)
+
+        async def run(state):
+            interaction, activity = state
+            await self.documents.documents.callback(self.documents, interaction, activity)
+
+        def ok(state):
+            return any(m.via == "response" and m.content and m.content.startswith("Caricamento") for m in state[0].sent)
+
+        return prepare, run, ok
+
+    def invia(self):
+        store = get_draft_store()
+
+        async def prepare():
+            interaction = self.interaction()
+            draft = await store.open(str(interaction.user.id), self.rng.choice(self.activities))
+            for index in range(self.args.documents):
+                draft = await store.add_document(
+                    draft.user_id, draft.draft_id,
+                    # Unique per draft, so the duplicate check does not flag every upload after the first
+                    f"Documento di prova {index} della bozza {draft.draft_id}\n".encode() * 20,
+                    f"Contesto del documento {index}"
+                )
+            return interaction, draft
+
+        async def run(state):
+            interaction, draft = state
+            await SubmitDraftButton(draft.draft_id).callback(interaction)
+
+        def ok(state):
+            return any(m.content == "Documenti caricati con successo!" for m in state[0].messages("followup"))
+
+        return prepare, run, ok
+
+    def attivita(self):
+        async def prepare():
+            return self.interaction(), self.rng.choice(self.activities)
+
+        async def run(state):
+            interaction, activity = state
+            await self.documents.activities.callback(self.documents, interaction, activity)
+
+        def ok(state):
+            return any(
+                m.via == "response" and m.content and
+                (m.content.startswith("Documenti trovati") or m.content.startswith("Nessun documento"))
+                for m in state[0].sent
+            )
+
+        return prepare, run, ok
+
+    def ispezione(self):
+        size = self.args.inspection_kb * 1024
+
+        async def prepare():
+            interaction = self.interaction(FakeMember(*self.rng.choice(self.staff)))
+            attachment = FakeAttachment(self.gateway.attachment_url(size, "ispezione.pdf"), size)
+            return interaction, self.rng.choice(self.activities), attachment
+
+        async def run(state):
+            interaction, activity, attachment = state
+            await self.admin.ispezione.callback(self.admin, interaction, activity, attachment)
+
+        def ok(state):
+            return any(m.via == "followup" and m.files == 1 for m in state[0].sent)
+
+        return prepare, run, ok
+
+    def sanzione(self):
+        async def prepare():
+            interaction = self.interaction(FakeMember(*self.rng.choice(self.staff)))
+            return interaction, self.rng.choice(self.activities)
+
+        async def run(state):
+            interaction, activity = state
+            await self.admin.sanzione.callback(
+                self.admin, interaction, activity, "Violazione del regolamento", "Multa di 5000€"
+            )
+
+        def ok(state):
+            return any(m.embeds and m.embeds[0].title.startswith("Sanzione") for m in state[0].sent)
+
+        return prepare, run, ok
+
+    def stipendio(self):
+        async def prepare():
+            return self.interaction(), FakeMember(*self.rng.choice(self.staff))
+
+        async def run(state):
+            interaction, user = state
+            await self.admin.stipendio.callback(self.admin, interaction, user)
+
+        def ok(state):
+            return any(m.embeds and m.embeds[0].title.startswith("Calcolo Stipendio") for m in state[0].sent)
+
+        return prepare, run, ok
+
+    async def run_scenario(self, name: str) -> dict:
+        prepare, run, ok = getattr(self, name)()
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+        latencies = []
+        failures = 0
+
+        # Setup runs up front so only the handler calls overlap
+        states = [await prepare() for _ in range(self.args.operations)]
+
+        async def one(state):
+            nonlocal failures
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    await run(state)
+                except Exception:
+                    failures += 1
+                    return
+                latencies.append(time.perf_counter() - started)
+                if not ok(state):
+                    failures += 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one(state) for state in states))
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        return {
+            "operations": self.args.operations,
+            "failures": failures,
+            "seconds": round(elapsed, 3),
+            "throughput": round(self.args.operations / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        }
+
+def compare(current: dict, baseline: dict, threshold: float) -> bool:
+    """
+    Print the change per scenario; True when something regressed.
+    """
+    regressed = False
+    print(f"\nagainst {baseline['commit']} ({baseline['created_at']})")
+    print(f"{'scenario':<10} {'ops/s':>14} {'p95 ms':>18}")
+    for name, result in current["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            continue
+        throughput = (result["throughput"] - before["throughput"]) / before["throughput"] * 100 if before["throughput"] else 0.0
+        p95 = (result["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0.0
+        flag = ""
+        if throughput < -threshold or p95 > threshold:
+            flag = "  REGRESSION"
+            regressed = True
+        print(f"{name:<10} {result['throughput']:>8.1f} {throughput:>+5.0f}% {result['p95_ms']:>11.2f} {p95:>+5.0f}%{flag}")
+    return regressed
+
+async def main(args) -> int:
+    logging.basicConfig(level=os.environ["LOG_LEVEL"])
+    gateway = FakeGateway(port=args.port)
+    gateway.start_in_thread()
+
+    configure_engine(os.environ["DATABASE_URL"])
+    await migrate_database()
+    seeded = await seed(
+        args.seed_documents, args.seed_documents // 50, args.seed_documents // 100,
+        activities=args.activities, seed_value=args.seed, progress=args.seed_documents >= 100_000
+    )
+    staff = seeded.pop("staff")
+    activities = (await get_activity_names())[:args.activities] or ["Bench"]
+
+    journal = start_journal(apply_journal_entries) if args.journal else None
+    test = LoadTest(args, gateway, staff, activities)
+    await test.admin.cog_load()
+    backend = os.environ["DATABASE_URL"].split(":", 1)[0]
+    print(f"{backend}, {args.seed_documents} seeded documents, concurrency {args.concurrency}, api latency {args.api_latency * 1000:.0f} ms")
+    print(f"{'scenario':<10} {'ops':>6} {'failed':>7} {'ops/s':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+
+    results = {}
+    for name in args.scenarios:
+        result = results[name] = await test.run_scenario(name)
+        print(
+            f"{name:<10} {result['operations']:>6} {result['failures']:>7} {result['throughput']:>8.1f} "
+            f"{result['p50_ms']:>9.2f} {result['p95_ms']:>9.2f} {result['p99_ms']:>9.2f}"
+        )
+
+    journal_stats = None
+    if journal is not None:
+        started = time.perf_counter()
+        await journal.drain()
+        journal_stats = {**journal.stats(), "drain_seconds": round(time.perf_counter() - started, 3)}
+        print(f"journal drained in {journal_stats['drain_seconds']:.2f}s: {journal_stats}")
+        await close_journal()
+
+    await test.admin.cog_unload()
+    await send_scheduler.close()
+    await close_write_batcher()
+    await dispose_engine()
+
+    report = {
+        "commit": git_commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "backend": backend,
+        "config": {
+            key: getattr(args, key)
+            for key in ("concurrency", "operations", "documents", "inspection_kb", "api_latency", "channels", "seed", "journal")
+        },
+        "seed": seeded,
+        "scenarios": results,
+        "journal": journal_stats,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"written to {args.output}")
+
+    failed = any(result["failures"] for result in results.values())
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            failed = compare(report, json.load(f), args.threshold) or failed
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Offline load test of the command handlers")
+    parser.add_argument("--scenarios", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--operations", type=int, default=200, help="operations per scenario")
+    parser.add_argument("--seed-documents", type=int, default=10_000)
+    parser.add_argument("--activities", type=int, default=500)
+    parser.add_argument("--documents", type=int, default=5, help="documents per submitted draft")
+    parser.add_argument("--inspection-kb", type=int, default=512)
+    parser.add_argument("--api-latency", type=float, default=0.05, help="seconds per fake Discord API call")
+    parser.add_argument("--channels", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--journal", action="store_true", help="acknowledge submissions from the write journal")
+    parser.add_argument("--output", help="write the results as JSON")
+    parser.add_argument("--compare", help="JSON results of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=10.0, help="percent change counted as a regression")
+    sys.exit(asyncio.run(main(parser.parse_args())))
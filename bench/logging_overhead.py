@@ -0,0 +1,100 @@
+"""
+Per-interaction logging overhead on the calling thread.
+
+Replays the log calls of a `/documenti` submit (per-document debug lines,
+gateway payload dumps from discord.py) under the old setup, basicConfig at
+DEBUG with f-strings writing straight to a stream, and under the queued
+pipeline at DEBUG (sampled) and at its default INFO level.
+
+The second row runs the old setup with the same lazy %-style calls, so
+the rows at DEBUG compare like for like: the queued pipeline is about
+1.3-1.4x cheaper there (e.g. 134 vs 172 us/interaction), from sampling
+and moving formatting off the calling thread. The large multiple of the
+last row comes from running at INFO, where debug calls are discarded
+before any formatting, not from the pipeline itself.
+
+    python -m bench.logging_overhead --interactions 2000 --documents 5
+"""
+import argparse
+import logging
+import os
+import tempfile
+import time
+
+from utils.log_pipeline import DEFAULT_LEVELS, configure_logging, stop_logging
+
+cog_logger = logging.getLogger("cogs.document_handler")
+gateway_logger = logging.getLogger("discord.gateway")
+
+PAYLOAD = '{"op": 0, "t": "INTERACTION_CREATE", "d": {' + '"k": "v", ' * 40 + '"end": 1}}'
+
+def interaction_fstring(documents: int, name: str):
+    gateway_logger.debug(f"For Shard ID 0: WebSocket Event: {PAYLOAD}")
+    cog_logger.debug(f"Submit button clicked")
+    cog_logger.debug(f"Deferring response")
+    for idx in range(1, documents + 1):
+        cog_logger.debug(f"Generated filename: {name}_contenuto_{idx}.txt")
+    cog_logger.debug(f"Sending documents to channel")
+    gateway_logger.debug(f"For Shard ID 0: WebSocket Event: {PAYLOAD}")
+    cog_logger.debug(f"Starting database save operation")
+    cog_logger.debug(f"Attempting to save {documents} documents with name: {name}")
+    cog_logger.debug(f"Transaction committed successfully")
+    cog_logger.debug(f"Sending success message")
+
+def interaction_lazy(documents: int, name: str):
+    gateway_logger.debug("For Shard ID 0: WebSocket Event: %s", PAYLOAD)
+    cog_logger.debug("Submit button clicked")
+    cog_logger.debug("Deferring response")
+    for idx in range(1, documents + 1):
+        cog_logger.debug("Generated filename: %s_contenuto_%d.txt", name, idx)
+    cog_logger.debug("Sending documents to channel")
+    gateway_logger.debug("For Shard ID 0: WebSocket Event: %s", PAYLOAD)
+    cog_logger.debug("Starting database save operation")
+    cog_logger.debug("Attempting to save %d documents with name: %s", documents, name)
+    cog_logger.debug("Transaction committed successfully")
+    cog_logger.debug("Sending success message")
+
+def _reset():
+    stop_logging()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    for name in ("discord.gateway", "discord.http", "cogs.document_handler"):
+        logging.getLogger(name).setLevel(logging.NOTSET)
+
+def _run(interaction, count: int, documents: int) -> float:
+    started = time.perf_counter()
+    for i in range(count):
+        interaction(documents, f"attivita{i % 50}")
+    return (time.perf_counter() - started) / count
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--interactions", type=int, default=2000)
+    parser.add_argument("--documents", type=int, default=5)
+    args = parser.parse_args()
+
+    sink_path = os.path.join(tempfile.mkdtemp(prefix="docbot-bench-"), "log.out")
+    results = []
+    with open(sink_path, "w") as sink:
+        _reset()
+        logging.basicConfig(level=logging.DEBUG, stream=sink)
+        results.append(("basicConfig DEBUG, f-strings", _run(interaction_fstring, args.interactions, args.documents)))
+        results.append(("basicConfig DEBUG, lazy", _run(interaction_lazy, args.interactions, args.documents)))
+
+        _reset()
+        configure_logging(level="DEBUG", levels={}, stream=sink)
+        results.append(("queued DEBUG, sampled", _run(interaction_lazy, args.interactions, args.documents)))
+
+        _reset()
+        configure_logging(level="INFO", levels=DEFAULT_LEVELS, stream=sink)
+        results.append(("queued INFO (default)", _run(interaction_lazy, args.interactions, args.documents)))
+        _reset()
+
+    baseline = results[0][1]
+    print(f"{args.interactions} interactions, {args.documents} documents each")
+    for label, per_interaction in results:
+        print(f"  {label:<30} {per_interaction * 1e6:9.1f} us/interaction  ({baseline / per_interaction:5.1f}x)")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Event-loop lag under slow database queries.
+
+Runs a burst of deliberately slow queries through the async data-access
+layer while a LoopLagMonitor samples the loop, then repeats the burst with
+blocking calls made directly on the loop for comparison. Exits with status 1
+if the async p99 lag goes over the budget.
+
+    python -m bench.loop_lag --queries 50 --delay 0.2 --budget-ms 50
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+_tmpdir = tempfile.mkdtemp(prefix="docbot-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}")
+
+from sqlalchemy import event, text
+from utils.database import configure_engine, dispose_engine, session_scope
+from utils.loop_monitor import LoopLagMonitor
+
+def _slow(seconds):
+    time.sleep(seconds)
+    return seconds
+
+async def _slow_query(delay: float, is_sqlite: bool):
+    sql = "SELECT slow(:d)" if is_sqlite else "SELECT pg_sleep(:d)"
+    async with session_scope() as session:
+        await session.execute(text(sql), {"d": delay})
+
+async def _measure(burst) -> LoopLagMonitor:
+    monitor = LoopLagMonitor(interval=0.005, window=100_000, warn_threshold=float("inf"))
+    monitor.start()
+    await asyncio.sleep(0.05)
+    await burst()
+    await asyncio.sleep(0.05)
+    await monitor.stop()
+    return monitor
+
+def _report(label: str, monitor: LoopLagMonitor):
+    print(
+        f"{label:>9}: p50={monitor.percentile(50) * 1000:7.2f} ms  "
+        f"p99={monitor.percentile(99) * 1000:7.2f} ms  "
+        f"max={monitor.max_lag * 1000:7.2f} ms  samples={len(monitor.samples)}"
+    )
+
+async def main(args) -> int:
+    engine = configure_engine(os.environ["DATABASE_URL"], pool_size=args.concurrency, max_overflow=0)
+    is_sqlite = engine.url.get_backend_name() == "sqlite"
+    if is_sqlite:
+        @event.listens_for(engine.sync_engine, "connect")
+        def register_slow(dbapi_connection, connection_record):
+            dbapi_connection.create_function("slow", 1, _slow)
+
+    async def async_burst():
+        semaphore = asyncio.Semaphore(args.concurrency)
+
+        async def one():
+            async with semaphore:
+                await _slow_query(args.delay, is_sqlite)
+
+        await asyncio.gather(*(one() for _ in range(args.queries)))
+
+    async def blocking_burst():
+        # What the cogs used to do: a synchronous driver call on the loop thread
+        connection = sqlite3.connect(":memory:")
+        connection.create_function("slow", 1, _slow)
+        for _ in range(min(args.queries, 5)):
+            connection.execute("SELECT slow(?)", (args.delay,))
+            await asyncio.sleep(0)
+        connection.close()
+
+    started = time.perf_counter()
+    async_monitor = await _measure(async_burst)
+    elapsed = time.perf_counter() - started
+    blocking_monitor = await _measure(blocking_burst)
+    await dispose_engine()
+
+    print(f"{args.queries} queries x {args.delay * 1000:.0f} ms, concurrency {args.concurrency}, {elapsed:.2f} s total")
+    _report("async", async_monitor)
+    _report("blocking", blocking_monitor)
+
+    if async_monitor.percentile(99) * 1000 > args.budget_ms:
+        print(f"FAIL: async p99 lag above budget of {args.budget_ms} ms")
+        return 1
+    print(f"OK: async p99 lag within budget of {args.budget_ms} ms")
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--delay", type=float, default=0.2, help="Seconds each query sleeps")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--budget-ms", type=float, default=50.0)
+    sys.exit(asyncio.run(main(parser.parse_args())))
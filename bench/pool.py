@@ -0,0 +1,86 @@
+"""
+Connection pool behaviour under bursts of concurrent sessions.
+
+Runs --bursts bursts of --concurrency concurrent searches against a
+scratch SQLite database through a pool of --pool-size connections (plus
+--overflow), sleeping --idle seconds between bursts, and reports the pool
+gauges, how many checkouts were pinged and how many statements were served
+from the compiled cache. With DB_POOL_PING_IDLE below --idle, only the
+first checkout of each connection after a pause is pinged.
+
+    python -m bench.pool --concurrency 20 --pool-size 4 --overflow 2 --idle 1.5
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+_tmpdir = tempfile.mkdtemp(prefix="docbot-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}")
+os.environ.setdefault("BLOB_STORE_PATH", os.path.join(_tmpdir, "blobs"))
+os.environ.setdefault("DB_POOL_PING_IDLE", "1")
+
+from utils.database import configure_engine, dispose_engine
+from utils.metrics import REGISTRY
+from utils.pool import DB_POOL_CHECKED_OUT, DB_POOL_WAITING
+from utils.write_batcher import close_write_batcher
+from models.migrations import migrate_database
+from models.repository import add_documents, search_page
+
+def metric_lines(*prefixes: str):
+    return [
+        line for line in REGISTRY.render().splitlines()
+        if line.startswith(prefixes)
+    ]
+
+async def burst(concurrency: int) -> dict:
+    peak = {"checked_out": 0, "waiting": 0}
+
+    async def sample():
+        while True:
+            peak["checked_out"] = max(peak["checked_out"], DB_POOL_CHECKED_OUT.callback())
+            peak["waiting"] = max(peak["waiting"], DB_POOL_WAITING._values.get((), 0))
+            await asyncio.sleep(0)
+
+    sampler = asyncio.create_task(sample())
+    started = time.perf_counter()
+    await asyncio.gather(*(search_page(f"documento {index % 5}") for index in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    sampler.cancel()
+    return {"seconds": elapsed, **peak}
+
+async def main(args) -> int:
+    configure_engine(os.environ["DATABASE_URL"], pool_size=args.pool_size, max_overflow=args.overflow)
+    await migrate_database()
+    await add_documents(
+        [{"content": f"documento {index}".encode(), "context": f"documento {index}"} for index in range(50)],
+        "bench", "1", "bench"
+    )
+
+    print(f"pool {args.pool_size}+{args.overflow}, ping after {os.environ['DB_POOL_PING_IDLE']}s idle")
+    print(f"{'burst':>5} {'seconds':>8} {'peak in use':>12} {'peak waiting':>13}")
+    for index in range(args.bursts):
+        result = await burst(args.concurrency)
+        print(f"{index + 1:>5} {result['seconds']:>8.3f} {result['checked_out']:>12} {result['waiting']:>13}")
+        await asyncio.sleep(args.idle)
+
+    for line in metric_lines(
+        "docbot_db_pool_pings", "docbot_db_statement_cache", "docbot_db_pool_size",
+        "docbot_db_pool_overflow", "docbot_db_pool_wait_seconds_count", "docbot_db_pool_wait_seconds_sum"
+    ):
+        print(line)
+
+    await close_write_batcher()
+    await dispose_engine()
+    return 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Connection pool under bursts")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--bursts", type=int, default=3)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--overflow", type=int, default=2)
+    parser.add_argument("--idle", type=float, default=1.5)
+    sys.exit(asyncio.run(main(parser.parse_args())))
@@ -0,0 +1,116 @@
+"""
+Outbound message sends against the fake gateway's rate-limited channel.
+
+Simulates several /documenti submits landing at once, each posting one
+embed and one file per document, followed by a burst of short notices:
+
+    naive      every submit is a single channel.send with all embeds/files,
+               every notice its own send, all concurrent
+    split      the same, but submits are split into chunks of 10 by hand
+    scheduler  everything goes through send_scheduler
+
+The fake channel allows --limit messages per --window seconds and rejects
+messages over Discord's limits with 400, like the real API.
+
+    python -m bench.send_scheduler --submits 4 --documents 12 --notices 20
+"""
+import argparse
+import asyncio
+import io
+import sys
+import time
+from types import SimpleNamespace
+
+import discord
+from discord.http import Route
+
+from bench.fake_gateway import FakeGateway
+from utils.embed_builder import create_document_embed
+from utils.send_scheduler import send_scheduler
+
+AUTHOR = SimpleNamespace(
+    display_name="Bench", mention="<@1>",
+    display_avatar=SimpleNamespace(url="https://cdn.discordapp.com/embed/avatars/0.png")
+)
+
+def build_submit(documents: int, context_chars: int, size: int):
+    embeds = [
+        create_document_embed(AUTHOR, "x" * context_chars, index, "bench")
+        for index in range(1, documents + 1)
+    ]
+    files = [discord.File(io.BytesIO(b"\0" * size), filename=f"documento_{index}.pdf") for index in range(documents)]
+    return embeds, files
+
+async def naive(channel, submits, notices, split: bool):
+    async def submit(embeds, files):
+        step = 10 if split else len(embeds)
+        for start in range(0, len(embeds), step):
+            await channel.send(embeds=embeds[start:start + step], files=files[start:start + step])
+
+    tasks = [submit(embeds, files) for embeds, files in submits]
+    tasks += [channel.send(content=notice) for notice in notices]
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+async def scheduled(channel, submits, notices):
+    tasks = [
+        send_scheduler.send(channel, embeds=embeds, files=files, coalesce=False)
+        for embeds, files in submits
+    ]
+    tasks += [send_scheduler.send(channel, content=notice) for notice in notices]
+    return await asyncio.gather(*tasks, return_exceptions=True)
+
+async def run(args) -> int:
+    gateway = FakeGateway(port=args.port, message_limit=args.limit, message_window=args.window)
+    gateway.start_in_thread()
+    Route.BASE = gateway.api_base
+
+    client = discord.Client(intents=discord.Intents.none(), http_trace=send_scheduler.trace_config())
+    await client.login("fake-token")
+
+    print(f"{args.submits} submits x {args.documents} documents, {args.notices} notices, "
+          f"channel bucket {args.limit}/{args.window:.0f}s")
+    print(f"{'mode':<10} {'elapsed':>8} {'messages':>9} {'429':>5} {'400':>5} {'failed calls':>13}")
+    failed = False
+    for channel_id, mode in enumerate(("naive", "split", "scheduler"), start=1):
+        channel = client.get_partial_messageable(channel_id)
+        submits = [build_submit(args.documents, args.context, args.size) for _ in range(args.submits)]
+        notices = [f"Notifica {index}" for index in range(args.notices)]
+        before = dict(gateway.message_stats)
+
+        started = time.perf_counter()
+        if mode == "scheduler":
+            results = await scheduled(channel, submits, notices)
+        else:
+            results = await naive(channel, submits, notices, split=mode == "split")
+        elapsed = time.perf_counter() - started
+
+        errors = [result for result in results if isinstance(result, Exception)]
+        stats = {key: gateway.message_stats[key] - before[key] for key in before}
+        print(f"{mode:<10} {elapsed:>7.2f}s {stats['posted']:>9} {stats['rate_limited']:>5} "
+              f"{stats['rejected']:>5} {len(errors):>13}")
+        if mode == "scheduler":
+            failed = bool(errors or stats["rejected"] or stats["rate_limited"])
+            expected = args.submits * args.documents
+            if stats["embeds"] != expected or stats["files"] != expected:
+                print(f"FAIL: {stats['embeds']} embeds / {stats['files']} files posted, expected {expected}")
+                failed = True
+
+    await client.close()
+    print("FAIL" if failed else "OK")
+    return 1 if failed else 0
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--submits", type=int, default=4)
+    parser.add_argument("--documents", type=int, default=12)
+    parser.add_argument("--context", type=int, default=400, help="context characters per document")
+    parser.add_argument("--size", type=int, default=64 * 1024, help="bytes per document")
+    parser.add_argument("--notices", type=int, default=20)
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--window", type=float, default=2.0)
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+    return asyncio.run(run(args))
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+"""
+Offline check of the sharded cluster launcher.
+
+Starts the fake gateway, spreads its shards over worker processes with the
+Supervisor, waits until every shard has identified, kills one worker and
+waits for its shards to identify again. Exits with status 1 on failure.
+
+    python -m bench.sharding --shards 6 --processes 3
+"""
+import argparse
+import asyncio
+import os
+import signal
+import sys
+import tempfile
+import time
+
+_tmpdir = tempfile.mkdtemp(prefix="docbot-bench-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(_tmpdir, 'bench.db')}")
+os.environ.setdefault("BLOB_STORE_PATH", os.path.join(_tmpdir, "blobs"))
+
+from bench.fake_gateway import FakeGateway, run_fake_cluster
+from utils.cluster import Supervisor, build_plan
+
+def _wait_for(supervisor: Supervisor, condition, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        supervisor.poll(0.2)
+    return False
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--shards", type=int, default=6)
+    parser.add_argument("--processes", type=int, default=3)
+    parser.add_argument("--pool-budget", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    gateway = FakeGateway(args.shards, port=args.port)
+    gateway.start_in_thread()
+    os.environ["FAKE_DISCORD_API_BASE"] = gateway.api_base
+    os.environ["FAKE_DISCORD_GATEWAY_URL"] = gateway.gateway_url
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+    # Create the schema once so the workers do not race on it
+    from main import migrate_once
+    asyncio.run(migrate_once())
+
+    plan = build_plan(args.shards, args.processes, args.pool_budget)
+    for spec in plan:
+        print(f"cluster {spec.cluster_id}: shards {spec.shard_ids}, pool {spec.pool_size}")
+
+    supervisor = Supervisor(plan, token="fake-token", backoff=0.5, target=run_fake_cluster)
+    all_shards = set(range(args.shards))
+    failed = False
+    try:
+        started = time.monotonic()
+        supervisor.start()
+        if not _wait_for(supervisor, lambda: {int(s) for s, n in gateway.connected.items() if n} == all_shards, args.timeout):
+            print(f"FAIL: connected shards {sorted(gateway.connected)} after {args.timeout}s")
+            return 1
+        print(f"all {args.shards} shards identified in {time.monotonic() - started:.1f}s")
+
+        identified_shards = sorted(entry["shard"] for entry in gateway.identifies)
+        if identified_shards != sorted(all_shards):
+            print(f"FAIL: expected one IDENTIFY per shard, got {identified_shards}")
+            failed = True
+
+        victim = plan[-1]
+        process = supervisor.processes[victim.cluster_id]
+        before = len(gateway.identifies)
+        os.kill(process.pid, signal.SIGKILL)
+        killed_at = time.monotonic()
+        print(f"killed cluster {victim.cluster_id} (pid {process.pid}), shards {victim.shard_ids}")
+
+        def reidentified():
+            shards = {entry["shard"] for entry in gateway.identifies[before:]}
+            return shards >= set(victim.shard_ids) and supervisor.restarts[victim.cluster_id] == 1
+
+        if not _wait_for(supervisor, reidentified, args.timeout):
+            print("FAIL: killed shards did not come back")
+            return 1
+        print(f"shards {victim.shard_ids} re-identified {time.monotonic() - killed_at:.1f}s after the crash")
+
+        others = {entry["shard"] for entry in gateway.identifies[before:]} - set(victim.shard_ids)
+        if others:
+            print(f"FAIL: shards {sorted(others)} of healthy clusters reconnected")
+            failed = True
+    finally:
+        supervisor.stop()
+
+    print("FAIL" if failed else "OK")
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""
+Cold-start, warm-start and reconnect time against the fake gateway.
+
+Each scenario runs the bot in a fresh process twice, first with an empty
+command-sync state (cold) and then again (warm); during the warm run the
+gateway invalidates the session to force a full re-identify. The legacy
+scenario reproduces the old startup, create_all at import and a command
+sync on every READY (COMMAND_SYNC=always); the current one uses versioned
+migrations and the fingerprint-gated sync. Command syncs are slowed down by
+--sync-delay to stand in for Discord's rate-limited bulk overwrite.
+
+    python -m bench.startup --sync-delay 1.0
+"""
+import time
+
+_process_started = time.perf_counter()
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+def worker(legacy: bool, invalidate: bool):
+    if legacy:
+        from app import app, db
+        import models.migrations  # noqa: F401  (registers every model)
+        with app.app_context():
+            db.create_all()
+
+    from bench.fake_gateway import use_fake_gateway
+    from bot import DocBot
+    use_fake_gateway()
+
+    class TimedBot(DocBot):
+        async def on_ready(self):
+            reconnecting = self._disconnected_at is not None
+            disconnected_at = self._disconnected_at
+            await super().on_ready()
+            if reconnecting:
+                report("reconnect", seconds=time.perf_counter() - disconnected_at)
+                await self.close()
+            elif "process" not in self.startup_phases:
+                self.startup_phases["process"] = time.perf_counter() - _process_started
+                report("ready", phases=self.startup_phases)
+                # Otherwise wait for the parent to invalidate the session
+                if not invalidate:
+                    await self.close()
+
+    def report(event, **data):
+        print(json.dumps({"event": event, **data}), flush=True)
+
+    TimedBot().run("fake-token", log_handler=None)
+
+def run_scenario(gateway, legacy: bool, workdir: str, invalidate: bool) -> dict:
+    env = dict(
+        os.environ,
+        DATABASE_URL=f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        BLOB_STORE_PATH=os.path.join(workdir, "blobs"),
+        COMMAND_SYNC="always" if legacy else "changed",
+        COMMAND_SYNC_STATE=os.path.join(workdir, "command_sync.json"),
+        FAKE_DISCORD_API_BASE=gateway.api_base,
+        FAKE_DISCORD_GATEWAY_URL=gateway.gateway_url,
+        LOG_LEVEL="WARNING",
+    )
+    args = [sys.executable, "-m", "bench.startup", "--worker"]
+    if legacy:
+        args.append("--legacy")
+    if invalidate:
+        args.append("--invalidate")
+
+    syncs_before = gateway.syncs
+    result = {}
+    with subprocess.Popen(args, env=env, stdout=subprocess.PIPE, text=True) as process:
+        for line in process.stdout:
+            if not line.startswith("{"):
+                continue
+            event = json.loads(line)
+            if event["event"] == "ready":
+                result["phases"] = event["phases"]
+                if invalidate:
+                    gateway.invalidate_sessions_threadsafe()
+            elif event["event"] == "reconnect":
+                result["reconnect"] = event["seconds"]
+        process.wait(timeout=60)
+    result["syncs"] = gateway.syncs - syncs_before
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sync-delay", type=float, default=1.0)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--legacy", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--invalidate", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        worker(args.legacy, args.invalidate)
+        return 0
+
+    from bench.fake_gateway import FakeGateway
+
+    gateway = FakeGateway(1, port=args.port, sync_delay=args.sync_delay)
+    gateway.start_in_thread()
+
+    print(f"command sync delay {args.sync_delay:.1f}s, times in seconds")
+    print(f"{'scenario':<10} {'run':<6} {'process->ready':>15} {'migrations':>11} {'sync':>6} {'reconnect':>10} {'syncs':>6}")
+    for label, legacy in (("legacy", True), ("current", False)):
+        workdir = tempfile.mkdtemp(prefix=f"docbot-bench-{label}-")
+        for run, invalidate in (("cold", False), ("warm", True)):
+            result = run_scenario(gateway, legacy, workdir, invalidate)
+            phases = result.get("phases", {})
+            reconnect = result.get("reconnect")
+            print(
+                f"{label:<10} {run:<6} {phases.get('process', float('nan')):>15.2f} "
+                f"{phases.get('migrations', 0.0):>11.3f} {phases.get('command_sync', 0.0):>6.2f} "
+                f"{(f'{reconnect:.2f}' if reconnect is not None else '-'):>10} {result['syncs']:>6}"
+            )
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,30 @@
+import os
+import time
 import discord
 from discord.ext import commands
 import logging
+from typing import Optional, Sequence
+from utils.activity_index import activity_names
+from utils.command_sync import COMMAND_SYNC, sync_commands
+from utils.database import dispose_engine
+from utils.write_batcher import close_write_batcher, configure_write_batcher
+from utils.journal import close_journal, start_journal
+from models.repository import apply_journal_entries, get_activity_names
+from models.migrations import migrate_database
+from utils.loop_monitor import LoopLagMonitor
+from utils.send_scheduler import send_scheduler
+from utils.metrics import LOOP_LAG, RECONNECT, REGISTRY, STARTUP_PHASE
 
 logger = logging.getLogger(__name__)
 
-class DocBot(commands.Bot):
-    def __init__(self):
+class DocBot(commands.AutoShardedBot):
+    def __init__(self, shard_ids: Optional[Sequence[int]] = None, shard_count: Optional[int] = None):
+        """
+        Args:
+            shard_ids: Shards run by this process; all shards when omitted
+            shard_count: Total shards across the cluster; Discord's
+                recommendation when omitted
+        """
         # Enable all intents that we need
         intents = discord.Intents.default()
         intents.message_content = True
@@ -17,28 +36,108 @@ class DocBot(commands.Bot):
         super().__init__(
             command_prefix="!",
             intents=intents,
+            shard_ids=list(shard_ids) if shard_ids is not None else None,
+            shard_count=shard_count,
+            # Lets the send scheduler see every REST response's rate-limit headers
+            http_trace=send_scheduler.trace_config(),
             activity=discord.Activity(
                 type=discord.ActivityType.watching,
                 name="/documents"
             )
         )
+        self.started_at = time.perf_counter()
+        self.commands_synced = False
+        self.startup_phases = {}
+        self._disconnected_at: Optional[float] = None
+        self.loop_monitor = LoopLagMonitor(on_sample=LOOP_LAG.observe)
+        REGISTRY.gauge(
+            "docbot_gateway_latency_seconds", "Discord gateway heartbeat latency", ["shard"],
+            callback=lambda: {(str(shard_id),): latency for shard_id, latency in self.latencies}
+        )
 
     async def setup_hook(self):
+        setup_started = time.perf_counter()
+        self.loop_monitor.start()
+        configure_write_batcher()
+
+        # Normally a single version check; upgrades run here or via tools.migrate
+        migrations_started = time.perf_counter()
+        applied = await migrate_database()
+        self.record_startup_phase("migrations", time.perf_counter() - migrations_started)
+        if applied:
+            logger.info(f"Applied schema migrations {applied}")
+
+        # Replays whatever an earlier run journaled but did not get into the database
+        start_journal(apply_journal_entries)
+
+        # Warm the autocomplete index before any command can be invoked
+        activity_names.update(await get_activity_names())
+        logger.info(f"Loaded {len(activity_names)} activity names for autocomplete")
+
         # Load all cogs
         await self.load_extension("cogs.document_handler")
         logger.info("Document handler cog loaded")
         await self.load_extension("cogs.admin_commands")
         logger.info("Admin commands cog loaded")
+        await self.load_extension("cogs.maintenance")
+        logger.info("Maintenance cog loaded")
+
+        # Upload draft buttons outlive the process; route their clicks again after a restart
+        from cogs.document_handler import AttachDocumentButton, SubmitDraftButton
+        self.add_dynamic_items(AttachDocumentButton, SubmitDraftButton)
+        self.record_startup_phase("setup", time.perf_counter() - setup_started)
 
     async def on_ready(self):
-        logger.info(f"Bot is ready! Logged in as {self.user}")
-
-        # Sync commands with Discord
-        try:
-            synced = await self.tree.sync()
-            logger.info(f"Synced {len(synced)} command(s)")
-        except Exception as e:
-            logger.error(f"Failed to sync commands: {e}")
+        logger.info(f"Bot is ready! Logged in as {self.user} (shards {sorted(self.shards)} of {self.shard_count})")
+
+        # Global commands are shared by every shard; only the process owning shard 0 syncs them,
+        # and only once per process unless COMMAND_SYNC=always
+        if 0 in self.shards and (not self.commands_synced or COMMAND_SYNC == "always"):
+            sync_started = time.perf_counter()
+            try:
+                synced = await sync_commands(self.tree, self.application_id)
+                if synced is not None:
+                    logger.info(f"Synced {synced} command(s)")
+                self.commands_synced = True
+            except Exception as e:
+                logger.error(f"Failed to sync commands: {e}")
+            self.record_startup_phase("command_sync", time.perf_counter() - sync_started)
+
+        if self._disconnected_at is not None:
+            elapsed = time.perf_counter() - self._disconnected_at
+            self._disconnected_at = None
+            RECONNECT.observe(elapsed, kind="identify")
+            logger.info(f"Ready again {elapsed:.2f}s after disconnect")
+        elif "ready" not in self.startup_phases:
+            self.record_startup_phase("ready", time.perf_counter() - self.started_at)
+            logger.info(f"Cold start took {self.startup_phases['ready']:.2f}s ({self.startup_phases})")
+
+    async def on_shard_ready(self, shard_id: int):
+        logger.info(f"Shard {shard_id} ready")
+
+    async def on_shard_disconnect(self, shard_id: int):
+        if self._disconnected_at is None and "ready" in self.startup_phases:
+            self._disconnected_at = time.perf_counter()
+
+    async def on_shard_resumed(self, shard_id: int):
+        # A resume replays missed events without a new READY, so on_ready does not run
+        if self._disconnected_at is not None:
+            elapsed = time.perf_counter() - self._disconnected_at
+            self._disconnected_at = None
+            RECONNECT.observe(elapsed, kind="resume")
+            logger.info(f"Shard {shard_id} resumed {elapsed:.2f}s after disconnect")
+
+    def record_startup_phase(self, phase: str, seconds: float):
+        self.startup_phases[phase] = seconds
+        STARTUP_PHASE.set(seconds, phase=phase)
+
+    async def close(self):
+        await self.loop_monitor.stop()
+        await send_scheduler.close()
+        await close_journal()
+        await close_write_batcher()
+        await dispose_engine()
+        await super().close()
 
     async def on_error(self, event_method: str, *args, **kwargs):
         logger.error(f"Error in {event_method}: ", exc_info=True)
\ No newline at end of file
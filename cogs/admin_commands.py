@@ -1,18 +1,215 @@
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 import logging
-from datetime import datetime, timedelta, timezone
-from app import app, db
-from models.document import Document
-from models.activity import Inspection, Sanction
-import io
+from contextlib import aclosing
+from datetime import date, datetime, timedelta, timezone
+from typing import List, NamedTuple, Optional, Tuple
+from models.repository import (
+    AuthorTotals,
+    InvalidSubmission,
+    close_payroll_week,
+    get_activity_summary_page,
+    get_author_totals,
+    get_closed_author_totals,
+    get_closed_payroll_totals,
+    get_last_closed_payroll_week,
+    get_payroll_totals,
+    get_payroll_week,
+    get_unposted_payroll_weeks,
+    mark_payroll_week_posted,
+    submit_inspection,
+    submit_sanction,
+)
+from models.duplicates import DUPLICATE_POLICY, is_inspection_duplicate
+from models.payroll import (
+    DOCUMENT_PAY,
+    INSPECTION_PAY,
+    PAYROLL_CHANNEL_ID,
+    PAYROLL_CLOSE_TIME,
+    PayrollWeek,
+    payroll_week_start,
+)
+from models.summary import recent_volume
+from utils.activity_index import activity_autocomplete
+from utils.archive_export import ActivityExporter
+from utils.blob_store import get_blob_store
+from utils.paginator import Page, PaginatorView, list_page
+from utils.ingest import INSPECTION_MAX_BYTES, AttachmentTooLarge, spool_attachment
+from utils.metrics import instrumented, phase
+from utils.send_scheduler import MAX_UPLOAD_BYTES, send_scheduler
+from utils.validators import parse_day
+import aiohttp
 
 logger = logging.getLogger(__name__)
 
+PAYROLL_DAYS = 7
+PAYROLL_PAGE_SIZE = 10
+DASHBOARD_PAGE_SIZE = 10
+
+def payroll_window() -> tuple:
+    """
+    The last PAYROLL_DAYS calendar days (UTC), today included.
+    """
+    end_day = datetime.now(timezone.utc).date()
+    return end_day - timedelta(days=PAYROLL_DAYS - 1), end_day
+
+class PayrollPeriod(NamedTuple):
+    start_day: date
+    end_day: date
+    label: str
+    # Set when the period is a closed payroll week, whose totals are frozen
+    week: Optional[PayrollWeek] = None
+
+    @classmethod
+    def closed(cls, week: PayrollWeek) -> "PayrollPeriod":
+        return cls(
+            week.week_start, week.week_end,
+            f"settimana {week.week_start:%d/%m/%Y} - {week.week_end:%d/%m/%Y} (chiusa)", week
+        )
+
+    @property
+    def rates(self) -> Tuple[int, int]:
+        """
+        Pay per document and per inspection: those in force when the week
+        closed, else the current ones.
+        """
+        if self.week is not None:
+            return self.week.document_pay, self.week.inspection_pay
+        return DOCUMENT_PAY, INSPECTION_PAY
+
+async def payroll_period(settimana: Optional[str]) -> PayrollPeriod:
+    """
+    The rolling payroll window, or the payroll week containing the day
+    `settimana` (GG/MM/AAAA). Raises ValueError, with a message for the
+    user, if the day is malformed or its week has not started yet.
+    """
+    if not settimana:
+        start_day, end_day = payroll_window()
+        return PayrollPeriod(start_day, end_day, f"ultimi {PAYROLL_DAYS} giorni")
+
+    try:
+        day = parse_day(settimana).date()
+    except ValueError:
+        raise ValueError("Data non valida, usa il formato GG/MM/AAAA.")
+    start_day = payroll_week_start(day)
+    week = await get_payroll_week(start_day)
+    if week is not None:
+        return PayrollPeriod.closed(week)
+
+    today = datetime.now(timezone.utc).date()
+    if start_day > today:
+        raise ValueError("La settimana indicata non è ancora iniziata.")
+    end_day = start_day + timedelta(days=6)
+    label = f"settimana {start_day:%d/%m/%Y} - {end_day:%d/%m/%Y} (non chiusa)"
+    return PayrollPeriod(start_day, min(end_day, today), label)
+
+def payroll_report_view(
+    rows: List[AuthorTotals],
+    period: PayrollPeriod,
+    exclude_duplicates: bool = False,
+    owner_id: Optional[int] = None,
+    timeout: Optional[float] = 300
+) -> PaginatorView:
+    """
+    Paginated payroll report over `rows`, already sorted.
+    """
+    document_pay, inspection_pay = period.rates
+    grand_total = sum(row.documents * document_pay + row.inspections * inspection_pay for row in rows)
+
+    async def fetch_page(after, before):
+        return list_page(rows, after, before, PAYROLL_PAGE_SIZE)
+
+    async def render_page(page: Page, page_number: int) -> dict:
+        lines = []
+        for position, row in enumerate(page.items, (page.first_key or 0) + 1):
+            total = row.documents * document_pay + row.inspections * inspection_pay
+            lines.append(
+                f"**{position}. {row.author_name}** — {row.documents} documenti, "
+                f"{row.inspections} ispezioni — €{total:,}"
+            )
+
+        embed = discord.Embed(
+            title="Resoconto Stipendi",
+            description="\n".join(lines) or "Nessun documento o ispezione.",
+            color=discord.Color.green(),
+            timestamp=datetime.now(timezone.utc)
+        )
+        embed.add_field(name="Periodo", value=f"{period.start_day:%d/%m/%Y} - {period.end_day:%d/%m/%Y}", inline=True)
+        embed.add_field(name="Totale Staff", value=f"€{grand_total:,}", inline=True)
+        if exclude_duplicates:
+            embed.add_field(name="Duplicati", value="Esclusi", inline=True)
+        embed.set_footer(text=f"Pagina {page_number} di {max(1, -(-len(rows) // PAYROLL_PAGE_SIZE))}")
+        return {"embed": embed}
+
+    return PaginatorView(fetch_page, render_page, owner_id=owner_id, timeout=timeout)
+
 class AdminCommands(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.http_session: Optional[aiohttp.ClientSession] = None
+
+    async def cog_load(self):
+        self.http_session = aiohttp.ClientSession()
+        self.close_payroll_weeks.start()
+
+    async def cog_unload(self):
+        self.close_payroll_weeks.cancel()
+        if self.http_session is not None:
+            await self.http_session.close()
+
+    @tasks.loop(time=PAYROLL_CLOSE_TIME)
+    async def close_payroll_weeks(self):
+        """
+        Daily: close every payroll week that has ended, then post the
+        reports not posted yet. Journal entries dated in a closed week that
+        any process replays later are added to it when applied, and its
+        report is posted again (see repository.bump_author_day).
+        """
+        # In a cluster only the process owning shard 0 runs it, like the archival job
+        if self.bot.shard_ids is not None and 0 not in self.bot.shard_ids:
+            return
+        try:
+            last_ended = payroll_week_start(datetime.now(timezone.utc).date()) - timedelta(days=7)
+            last_closed = await get_last_closed_payroll_week()
+            # The first run closes only the last week; later runs catch up on any missed while offline
+            week_start = last_ended if last_closed is None else last_closed + timedelta(days=7)
+            while week_start <= last_ended:
+                await close_payroll_week(week_start)
+                week_start += timedelta(days=7)
+
+            if PAYROLL_CHANNEL_ID:
+                await self.post_payroll_reports()
+        except Exception as e:
+            logger.error("Error closing payroll weeks: %s", e, exc_info=True)
+
+    async def post_payroll_reports(self):
+        channel = self.bot.get_channel(PAYROLL_CHANNEL_ID) or await self.bot.fetch_channel(PAYROLL_CHANNEL_ID)
+        for week in await get_unposted_payroll_weeks():
+            rows = await get_closed_payroll_totals(week)
+            # Anyone in the channel can page through it, for as long as the process runs
+            view = payroll_report_view(rows, PayrollPeriod.closed(week), timeout=None)
+            await view.load_first_page()
+            await view.post(channel)
+            await mark_payroll_week_posted(week.week_start)
+            logger.info("Posted the payroll report of the week starting %s", week.week_start)
+
+    def upload_size_limit(self, interaction: discord.Interaction) -> int:
+        """
+        Largest file we can send back in this channel.
+        """
+        if interaction.guild is not None:
+            return min(MAX_UPLOAD_BYTES, interaction.guild.filesize_limit)
+        return MAX_UPLOAD_BYTES
+
+    def inspection_size_limit(self, interaction: discord.Interaction) -> int:
+        """
+        Largest inspection we accept: the configured cap, further limited by
+        what the guild lets us re-upload.
+        """
+        if interaction.guild is not None:
+            return min(INSPECTION_MAX_BYTES, interaction.guild.filesize_limit)
+        return INSPECTION_MAX_BYTES
 
     @app_commands.command(
         name="ispezione",
@@ -22,7 +219,9 @@ class AdminCommands(commands.Cog):
         activity="Nome dell'attività da ispezionare",
         attachment="File dell'ispezione"
     )
+    @app_commands.autocomplete(activity=activity_autocomplete)
     @app_commands.checks.has_permissions(manage_messages=True)
+    @instrumented("ispezione")
     async def ispezione(
         self,
         interaction: discord.Interaction,
@@ -30,59 +229,101 @@ class AdminCommands(commands.Cog):
         attachment: discord.Attachment
     ):
         try:
-            logger.debug(f"Starting inspection upload for activity: {activity}")
-            logger.debug(f"Attachment details - Name: {attachment.filename}, Size: {attachment.size}")
+            logger.debug("Starting inspection upload for activity: %s", activity)
+            logger.debug("Attachment details - Name: %s, Size: %d", attachment.filename, attachment.size)
+
+            # Reject oversize files before downloading anything
+            max_size = self.inspection_size_limit(interaction)
+            if attachment.size > max_size:
+                await interaction.response.send_message(
+                    f"Il file supera il limite di {max_size // (1024 * 1024)} MB.",
+                    ephemeral=True
+                )
+                return
 
             # First defer the response to prevent timeout
-            await interaction.response.defer()
+            with phase("defer"):
+                await interaction.response.defer()
 
-            # Download the attachment
-            content = await attachment.read()
-            logger.debug("Successfully read attachment content")
+            # Stream the attachment, hashing and size-checking as it arrives
+            with phase("download"):
+                upload = await spool_attachment(self.http_session, attachment, max_size)
 
-            # Create inspection record
-            with app.app_context():
-                logger.debug(f"Creating inspection record for {activity}")
-                inspection = Inspection(
-                    activity_name=activity,
-                    content=content,
-                    author_id=str(interaction.user.id),
-                    author_name=interaction.user.display_name
-                )
-                db.session.add(inspection)
-                db.session.commit()
+            async with upload:
+                logger.debug("Successfully spooled attachment content")
+                duplicate = False
+                if DUPLICATE_POLICY != "off":
+                    try:
+                        duplicate = await is_inspection_duplicate(upload.sha256)
+                    except Exception as e:
+                        # Not worth failing an upload the journal could still accept
+                        logger.warning("Duplicate check skipped: %s", e)
+                    if duplicate and DUPLICATE_POLICY == "reject":
+                        await interaction.followup.send("Questa ispezione è già stata caricata.", ephemeral=True)
+                        return
+                with phase("storage"):
+                    ref = await get_blob_store().put_file_async(upload.file, upload.sha256)
+
+                # Create inspection record
+                logger.debug("Creating inspection record for %s", activity)
+                with phase("db"):
+                    await submit_inspection(
+                        activity_name=activity,
+                        content=ref,
+                        author_id=str(interaction.user.id),
+                        author_name=interaction.user.display_name,
+                        mime_type=upload.content_type
+                    )
                 logger.debug("Inspection record created successfully")
 
-            # Create a more descriptive filename
-            filename = f"ispezione_{activity}_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.txt"
-            filename = "".join(c for c in filename if c.isalnum() or c in "._-")
-            logger.debug(f"Generated filename: {filename}")
+                # Create a more descriptive filename
+                filename = f"ispezione_{activity}_{datetime.now(timezone.utc).strftime('%Y%m%d_%H%M%S')}.txt"
+                filename = "".join(c for c in filename if c.isalnum() or c in "._-")
+                logger.debug("Generated filename: %s", filename)
 
-            # Send confirmation with the file
-            file = discord.File(
-                io.BytesIO(content),
-                filename=filename
-            )
+                # Send confirmation with the file, re-read from the spool
+                upload.rewind()
+                file = discord.File(
+                    upload.file,
+                    filename=filename
+                )
 
-            embed = discord.Embed(
-                title=f"Ispezione per {activity}",
-                description="Ispezione caricata con successo",
-                color=discord.Color.blue(),
-                timestamp=datetime.now(timezone.utc)
-            )
-            embed.set_author(
-                name=interaction.user.display_name,
-                icon_url=interaction.user.display_avatar.url
-            )
+                embed = discord.Embed(
+                    title=f"Ispezione per {activity}",
+                    description="Ispezione caricata con successo",
+                    color=discord.Color.blue(),
+                    timestamp=datetime.now(timezone.utc)
+                )
+                embed.set_author(
+                    name=interaction.user.display_name,
+                    icon_url=interaction.user.display_avatar.url
+                )
+                if duplicate:
+                    embed.add_field(
+                        name="Attenzione",
+                        value="Questo file risulta già caricato e potrebbe non essere conteggiato nello stipendio.",
+                        inline=False
+                    )
+
+                with phase("upload"):
+                    await interaction.followup.send(
+                        embed=embed,
+                        file=file
+                    )
+            logger.debug("Inspection response sent successfully")
 
+        except AttachmentTooLarge as e:
+            logger.warning("Rejected inspection upload for %s: %s", activity, e)
             await interaction.followup.send(
-                embed=embed,
-                file=file
+                f"Il file supera il limite di {e.limit // (1024 * 1024)} MB.",
+                ephemeral=True
             )
-            logger.debug("Inspection response sent successfully")
+
+        except InvalidSubmission as e:
+            await interaction.followup.send(f"Ispezione non salvata: {e}", ephemeral=True)
 
         except Exception as e:
-            logger.error(f"Error in inspection command: {e}", exc_info=True)
+            logger.error("Error in inspection command: %s", e, exc_info=True)
             if not interaction.response.is_done():
                 await interaction.response.send_message(
                     "Si è verificato un errore durante il caricamento dell'ispezione.",
@@ -103,7 +344,9 @@ class AdminCommands(commands.Cog):
         reason="Motivo della sanzione",
         sanction="Dettagli della sanzione"
     )
+    @app_commands.autocomplete(activity=activity_autocomplete)
     @app_commands.checks.has_permissions(manage_messages=True)
+    @instrumented("sanzione")
     async def sanzione(
         self,
         interaction: discord.Interaction,
@@ -112,16 +355,14 @@ class AdminCommands(commands.Cog):
         sanction: str
     ):
         try:
-            with app.app_context():
-                sanction_record = Sanction(
+            with phase("db"):
+                await submit_sanction(
                     activity_name=activity,
                     reason=reason,
                     sanction_text=sanction,
                     author_id=str(interaction.user.id),
                     author_name=interaction.user.display_name
                 )
-                db.session.add(sanction_record)
-                db.session.commit()
 
             embed = discord.Embed(
                 title=f"Sanzione per {activity}",
@@ -135,10 +376,14 @@ class AdminCommands(commands.Cog):
                 icon_url=interaction.user.display_avatar.url
             )
 
-            await interaction.response.send_message(embed=embed)
+            with phase("followup"):
+                await interaction.response.send_message(embed=embed)
+
+        except InvalidSubmission as e:
+            await interaction.response.send_message(f"Sanzione non applicata: {e}", ephemeral=True)
 
         except Exception as e:
-            logger.error(f"Error in sanction command: {e}", exc_info=True)
+            logger.error("Error in sanction command: %s", e, exc_info=True)
             await interaction.response.send_message(
                 "Si è verificato un errore durante l'applicazione della sanzione.",
                 ephemeral=True
@@ -149,49 +394,52 @@ class AdminCommands(commands.Cog):
         description="Calcola lo stipendio di un utente basato sui documenti inseriti"
     )
     @app_commands.describe(
-        user="L'utente di cui calcolare lo stipendio"
+        user="L'utente di cui calcolare lo stipendio",
+        escludi_duplicati="Non conteggiare i documenti e le ispezioni già caricati in precedenza",
+        settimana="Un giorno della settimana di paga da calcolare (GG/MM/AAAA), invece degli ultimi 7 giorni"
     )
     @app_commands.checks.has_permissions(manage_messages=True)
+    @instrumented("stipendio")
     async def stipendio(
         self,
         interaction: discord.Interaction,
-        user: discord.Member
+        user: discord.Member,
+        escludi_duplicati: bool = False,
+        settimana: Optional[str] = None
     ):
         try:
-            # Calculate date range using timezone-aware datetime
-            end_date = datetime.now(timezone.utc)
-            start_date = end_date - timedelta(days=7)
-            logger.debug(f"Calculating salary for {user.display_name} between {start_date} and {end_date}")
-
-            with app.app_context():
-                # Count documents with proper date filtering
-                regular_docs = Document.query.filter(
-                    Document.author_id == str(user.id),
-                    Document.created_at >= start_date,
-                    Document.created_at <= end_date
-                ).count()
-                logger.debug(f"Found {regular_docs} regular documents for user {user.display_name}")
-
-                inspections = Inspection.query.filter(
-                    Inspection.author_id == str(user.id),
-                    Inspection.created_at >= start_date,
-                    Inspection.created_at <= end_date
-                ).count()
-                logger.debug(f"Found {inspections} inspections for user {user.display_name}")
+            try:
+                period = await payroll_period(settimana)
+            except ValueError as e:
+                await interaction.response.send_message(str(e), ephemeral=True)
+                return
+            logger.debug("Calculating salary for %s between %s and %s", user.display_name, period.start_day, period.end_day)
+
+            # Closed weeks come from their frozen entries, anything else from the per-day rollup
+            with phase("db"):
+                if period.week is not None:
+                    regular_docs, inspections = await get_closed_author_totals(
+                        str(user.id), period.week, exclude_duplicates=escludi_duplicati
+                    )
+                else:
+                    regular_docs, inspections = await get_author_totals(
+                        str(user.id), period.start_day, period.end_day, exclude_duplicates=escludi_duplicati
+                    )
+            document_pay, inspection_pay = period.rates
 
             # Calculate salary
-            regular_salary = regular_docs * 2000
-            inspection_salary = inspections * 3000
+            regular_salary = regular_docs * document_pay
+            inspection_salary = inspections * inspection_pay
             total_salary = regular_salary + inspection_salary
 
-            logger.debug(f"Calculated salary for {user.display_name}:")
-            logger.debug(f"Regular docs ({regular_docs}): €{regular_salary:,}")
-            logger.debug(f"Inspections ({inspections}): €{inspection_salary:,}")
-            logger.debug(f"Total: €{total_salary:,}")
+            logger.debug(
+                "Calculated salary for %s: %d docs (€%d) + %d inspections (€%d) = €%d",
+                user.display_name, regular_docs, regular_salary, inspections, inspection_salary, total_salary
+            )
 
             embed = discord.Embed(
                 title=f"Calcolo Stipendio per {user.display_name}",
-                description=f"Periodo: ultimi 7 giorni",
+                description=f"Periodo: {period.label}" + (", duplicati esclusi" if escludi_duplicati else ""),
                 color=discord.Color.green(),
                 timestamp=datetime.now(timezone.utc)
             )
@@ -217,17 +465,220 @@ class AdminCommands(commands.Cog):
                 icon_url=user.display_avatar.url
             )
 
-            await interaction.response.send_message(embed=embed)
+            with phase("followup"):
+                await interaction.response.send_message(embed=embed)
 
         except Exception as e:
-            logger.error(f"Error in salary command: {e}", exc_info=True)
+            logger.error("Error in salary command: %s", e, exc_info=True)
             await interaction.response.send_message(
                 "Si è verificato un errore durante il calcolo dello stipendio.",
                 ephemeral=True
             )
 
+    @app_commands.command(
+        name="stipendi",
+        description="Calcola gli stipendi di tutto lo staff per gli ultimi 7 giorni o per una settimana di paga"
+    )
+    @app_commands.describe(
+        ordina="Criterio di ordinamento del resoconto",
+        escludi_duplicati="Non conteggiare i documenti e le ispezioni già caricati in precedenza",
+        settimana="Un giorno della settimana di paga da calcolare (GG/MM/AAAA), invece degli ultimi 7 giorni"
+    )
+    @app_commands.choices(ordina=[
+        app_commands.Choice(name="Totale", value="total"),
+        app_commands.Choice(name="Documenti", value="documents"),
+        app_commands.Choice(name="Ispezioni", value="inspections"),
+        app_commands.Choice(name="Nome", value="name"),
+    ])
+    @app_commands.checks.has_permissions(manage_messages=True)
+    @instrumented("stipendi")
+    async def stipendi(
+        self,
+        interaction: discord.Interaction,
+        ordina: Optional[app_commands.Choice[str]] = None,
+        escludi_duplicati: bool = False,
+        settimana: Optional[str] = None
+    ):
+        try:
+            try:
+                period = await payroll_period(settimana)
+            except ValueError as e:
+                await interaction.response.send_message(str(e), ephemeral=True)
+                return
+            sort = ordina.value if ordina else "total"
+            with phase("db"):
+                if period.week is not None:
+                    rows = await get_closed_payroll_totals(period.week, sort, exclude_duplicates=escludi_duplicati)
+                else:
+                    rows = await get_payroll_totals(
+                        period.start_day, period.end_day, sort, exclude_duplicates=escludi_duplicati
+                    )
+
+            if not rows:
+                await interaction.response.send_message(
+                    f"Nessun documento o ispezione nel periodo: {period.label}.",
+                    ephemeral=True
+                )
+                return
+
+            view = payroll_report_view(rows, period, escludi_duplicati, owner_id=interaction.user.id)
+            await view.load_first_page()
+            with phase("followup"):
+                await view.send(interaction)
+
+        except Exception as e:
+            logger.error("Error in payroll report command: %s", e, exc_info=True)
+            await interaction.response.send_message(
+                "Si è verificato un errore durante il calcolo degli stipendi.",
+                ephemeral=True
+            )
+
+    @app_commands.command(
+        name="esporta",
+        description="Esporta in un archivio tutti i documenti, le ispezioni e le sanzioni di un'attività"
+    )
+    @app_commands.describe(
+        activity="Nome dell'attività da esportare",
+        formato="Formato dell'archivio"
+    )
+    @app_commands.choices(formato=[
+        app_commands.Choice(name="ZIP", value="zip"),
+        app_commands.Choice(name="TAR.GZ", value="tar.gz"),
+    ])
+    @app_commands.autocomplete(activity=activity_autocomplete)
+    @app_commands.checks.has_permissions(manage_messages=True)
+    @instrumented("esporta")
+    async def esporta(
+        self,
+        interaction: discord.Interaction,
+        activity: str,
+        formato: Optional[app_commands.Choice[str]] = None
+    ):
+        try:
+            with phase("defer"):
+                await interaction.response.defer(thinking=True)
+
+            exporter = ActivityExporter(
+                activity,
+                fmt=formato.value if formato else "zip",
+                part_limit=self.upload_size_limit(interaction)
+            )
+            # Parts are uploaded as soon as they are complete, so only one is held at a time
+            async with aclosing(exporter.parts()) as parts:
+                async for part in parts:
+                    try:
+                        if part.number == 1 and exporter.stats.records == 0:
+                            await interaction.followup.send(f"Nessun dato trovato per '{activity}'.")
+                            return
+                        with phase("upload"):
+                            await send_scheduler.send(
+                                interaction.followup,
+                                content=f"Archivio '{activity}' - parte {part.number}",
+                                files=[discord.File(part.file, filename=part.filename)],
+                                coalesce=False
+                            )
+                    finally:
+                        part.close()
+
+            stats = exporter.stats
+            embed = discord.Embed(
+                title=f"Esportazione di {activity}",
+                description=f"Archivio completato in {stats.parts} {'parte' if stats.parts == 1 else 'parti'}.",
+                color=discord.Color.blue(),
+                timestamp=datetime.now(timezone.utc)
+            )
+            embed.add_field(name="Documenti", value=str(stats.documents), inline=True)
+            embed.add_field(name="Ispezioni", value=str(stats.inspections), inline=True)
+            embed.add_field(name="Sanzioni", value=str(stats.sanctions), inline=True)
+            embed.set_footer(text="L'elenco completo è nel file manifest.json di ogni parte")
+            with phase("followup"):
+                await interaction.followup.send(embed=embed)
+
+        except Exception as e:
+            logger.error("Error in export command for %s: %s", activity, e, exc_info=True)
+            message = "Si è verificato un errore durante l'esportazione dell'attività."
+            if not interaction.response.is_done():
+                await interaction.response.send_message(message, ephemeral=True)
+            else:
+                await interaction.followup.send(message, ephemeral=True)
+
+    @app_commands.command(
+        name="dashboard",
+        description="Mostra le attività più attive o più sanzionate"
+    )
+    @app_commands.describe(
+        ordina="Criterio di ordinamento"
+    )
+    @app_commands.choices(ordina=[
+        app_commands.Choice(name="Attività recente", value="recent"),
+        app_commands.Choice(name="Sanzioni", value="sanctions"),
+        app_commands.Choice(name="Documenti", value="documents"),
+        app_commands.Choice(name="Ultimo evento", value="last_event"),
+    ])
+    @app_commands.checks.has_permissions(manage_messages=True)
+    @instrumented("dashboard")
+    async def dashboard(
+        self,
+        interaction: discord.Interaction,
+        ordina: Optional[app_commands.Choice[str]] = None
+    ):
+        try:
+            sort = ordina.value if ordina else "recent"
+            sort_label = ordina.name if ordina else "Attività recente"
+
+            async def fetch_page(after, before):
+                return await get_activity_summary_page(sort, after=after, before=before, limit=DASHBOARD_PAGE_SIZE)
+
+            async def render_page(page: Page, page_number: int) -> dict:
+                now = datetime.now(timezone.utc)
+                lines = []
+                first_position = (page_number - 1) * DASHBOARD_PAGE_SIZE + 1
+                for position, row in enumerate(page.items, first_position):
+                    last_inspection = (
+                        f"{row.last_inspection_at:%d/%m/%Y}" if row.last_inspection_at else "mai"
+                    )
+                    lines.append(
+                        f"**{position}. {row.activity_name}** — {row.documents} documenti, "
+                        f"{row.inspections} ispezioni, {row.sanctions} sanzioni\n"
+                        f"Ultima ispezione: {last_inspection} · "
+                        f"Volume recente: {recent_volume(row.heat, now):.1f}"
+                    )
+
+                embed = discord.Embed(
+                    title="Dashboard Attività",
+                    description="\n".join(lines),
+                    color=discord.Color.blue(),
+                    timestamp=now
+                )
+                embed.set_footer(text=f"Pagina {page_number} · Ordinate per: {sort_label}")
+                return {"embed": embed}
+
+            view = PaginatorView(fetch_page, render_page, owner_id=interaction.user.id)
+            with phase("db"):
+                page = await view.load_first_page()
+
+            if not page.items:
+                await interaction.response.send_message(
+                    "Nessuna attività registrata.",
+                    ephemeral=True
+                )
+                return
+
+            with phase("followup"):
+                await view.send(interaction)
+
+        except Exception as e:
+            logger.error("Error in dashboard command: %s", e, exc_info=True)
+            await interaction.response.send_message(
+                "Si è verificato un errore durante il caricamento della dashboard.",
+                ephemeral=True
+            )
+
     @ispezione.error
+    @dashboard.error
+    @esporta.error
     @stipendio.error
+    @stipendi.error
     async def admin_command_error(self, interaction: discord.Interaction, error: app_commands.AppCommandError):
         if isinstance(error, app_commands.MissingPermissions):
             await interaction.response.send_message(
@@ -235,7 +686,7 @@ class AdminCommands(commands.Cog):
                 ephemeral=True
             )
         else:
-            logger.error(f"Unexpected error in admin command: {error}")
+            logger.error("Unexpected error in admin command: %s", error)
             await interaction.response.send_message(
                 "Si è verificato un errore imprevisto. Riprova più tardi.",
                 ephemeral=True
@@ -1,89 +1,138 @@
 import discord
 from discord import app_commands
-from discord.ext import commands
+from discord.ext import commands, tasks
 import logging
-from typing import Optional, List
 import io
-from utils.validators import validate_file
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional
+from utils.validators import DATE_FORMAT, parse_day, validate_file
 from utils.embed_builder import create_document_embed
-from app import app, db
 from models.document import Document
-import asyncio
-from functools import partial
+from models.repository import (
+    PAGE_SIZE,
+    InvalidSubmission,
+    check_columns,
+    get_documents_page,
+    get_timeline_page,
+    load_content,
+    search_page,
+    search_terms,
+    submit_documents,
+)
+from models.duplicates import DUPLICATE_POLICY, DuplicateMatch, find_document_duplicates
+from utils.activity_index import activity_autocomplete
+from utils.metrics import instrumented, phase
+from utils.paginator import Page, PaginatorView
+from utils.send_scheduler import send_scheduler
+from utils.drafts import (
+    DRAFT_JANITOR_INTERVAL,
+    DRAFT_MAX_DOCUMENTS,
+    DRAFT_MAX_PER_USER,
+    Draft,
+    DraftLimitExceeded,
+    get_draft_store,
+)
 
 logger = logging.getLogger(__name__)
 
+SEARCH_KIND_LABELS = {
+    "document": "Documento",
+    "inspection": "Ispezione",
+    "sanction": "Sanzione",
+}
+
+TIMELINE_PAGE_SIZE = 10
+
 async def save_documents_to_db(documents, name, author_id, author_name):
     """
-    Save documents to database in a separate function.
-    Returns True if successful, False otherwise.
+    Save documents, through the write journal when it is running (see
+    models.repository.submit_documents).
+    Returns True if successful, False otherwise; InvalidSubmission is
+    raised for the caller to show.
     """
     try:
-        logger.debug(f"Attempting to save {len(documents)} documents with name: {name}")
-        with app.app_context():
-            logger.debug(f"Starting database transaction for {name}")
-            for doc in documents:
-                db_doc = Document(
-                    name=name,
-                    content=doc['content'],
-                    context=doc['context'],
-                    author_id=author_id,
-                    author_name=author_name
-                )
-                db.session.add(db_doc)
-                logger.debug(f"Added document to session: {name} - Context: {doc['context'][:30]}...")
-
-            logger.debug("Committing transaction")
-            db.session.commit()
-            logger.debug("Transaction committed successfully")
-            return True
+        logger.debug("Attempting to save %d documents with name: %s", len(documents), name)
+        await submit_documents(documents, name, author_id, author_name)
+        logger.debug("Documents saved successfully")
+        return True
+    except InvalidSubmission:
+        raise
     except Exception as e:
-        logger.error(f"Database error: {e}", exc_info=True)
-        with app.app_context():
-            db.session.rollback()
+        logger.error("Database error: %s", e, exc_info=True)
         return False
 
-class DocumentUploadView(discord.ui.View):
-    def __init__(self, name: str, timeout: Optional[float] = 180):
-        super().__init__(timeout=timeout)
-        self.documents = []
-        self.name = name
-        logger.debug(f"Created DocumentUploadView with name: {name}")
-
-    @discord.ui.button(label="Allega Documento", style=discord.ButtonStyle.primary)
-    async def attach_document(self, interaction: discord.Interaction, button: discord.ui.Button):
-        logger.debug("Attach document button clicked")
-        modal = DocumentUploadModal()
-        await interaction.response.send_modal(modal)
-        await modal.wait()
-
-        if modal.file_content and modal.context_text:
-            self.documents.append({
-                'content': modal.file_content,
-                'context': modal.context_text
-            })
-            logger.debug(f"Added document. Total documents: {len(self.documents)}")
+async def document_duplicates(contents: List[bytes], activity: str, author_id: str) -> List[Optional[DuplicateMatch]]:
+    """
+    find_document_duplicates, except that a database outage skips the
+    check rather than failing an upload the journal could still accept.
+    """
+    try:
+        return await find_document_duplicates(contents, activity, author_id)
+    except Exception as e:
+        logger.warning("Duplicate check skipped: %s", e)
+        return [None] * len(contents)
 
-            # Update button label to show document count
-            button.label = f"Documenti Allegati: {len(self.documents)}"
+DRAFT_ID_PATTERN = r"(?P<draft_id>[0-9a-f]{24})"
+DRAFT_EXPIRED_MESSAGE = "Questa bozza è scaduta o è già stata inviata. Usa di nuovo /documenti."
 
-            # Use edit_original_response instead of edit_original_message
-            try:
-                logger.debug("Updating view with new button label")
-                await interaction.message.edit(view=self)
-            except Exception as e:
-                logger.error(f"Error updating view: {e}")
-                # If edit fails, at least confirm to the user
-                await interaction.followup.send(
-                    "Documento allegato con successo!",
-                    ephemeral=True
-                )
+def draft_message(draft: Draft) -> str:
+    return f"Caricamento documenti per '{draft.activity}'.\nUsa i pulsanti qui sotto per caricare i tuoi documenti:"
 
-    @discord.ui.button(label="Invia", style=discord.ButtonStyle.green)
-    async def submit(self, interaction: discord.Interaction, button: discord.ui.Button):
+def draft_view(draft: Draft) -> discord.ui.View:
+    """
+    Buttons for one draft. Their custom_ids carry the draft id, so clicks
+    keep working after a restart (the items are registered in setup_hook).
+    """
+    view = discord.ui.View(timeout=None)
+    view.add_item(AttachDocumentButton(draft.draft_id, len(draft.documents)))
+    view.add_item(SubmitDraftButton(draft.draft_id))
+    return view
+
+class AttachDocumentButton(discord.ui.DynamicItem[discord.ui.Button], template=r"docbot:draft:attach:" + DRAFT_ID_PATTERN):
+    def __init__(self, draft_id: str, document_count: int = 0):
+        label = f"Documenti Allegati: {document_count}" if document_count else "Allega Documento"
+        super().__init__(discord.ui.Button(
+            label=label,
+            style=discord.ButtonStyle.primary,
+            custom_id=f"docbot:draft:attach:{draft_id}"
+        ))
+        self.draft_id = draft_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match["draft_id"])
+
+    async def callback(self, interaction: discord.Interaction):
+        logger.debug("Attach document button clicked")
+        draft = await get_draft_store().get(str(interaction.user.id), self.draft_id)
+        if draft is None:
+            await interaction.response.send_message(DRAFT_EXPIRED_MESSAGE, ephemeral=True)
+            return
+        await interaction.response.send_modal(DocumentUploadModal(draft))
+
+class SubmitDraftButton(discord.ui.DynamicItem[discord.ui.Button], template=r"docbot:draft:submit:" + DRAFT_ID_PATTERN):
+    def __init__(self, draft_id: str):
+        super().__init__(discord.ui.Button(
+            label="Invia",
+            style=discord.ButtonStyle.green,
+            custom_id=f"docbot:draft:submit:{draft_id}"
+        ))
+        self.draft_id = draft_id
+
+    @classmethod
+    async def from_custom_id(cls, interaction: discord.Interaction, item: discord.ui.Button, match):
+        return cls(match["draft_id"])
+
+    @instrumented("documenti_invia")
+    async def callback(self, interaction: discord.Interaction):
         logger.debug("Submit button clicked")
+        store = get_draft_store()
+        draft = await store.get(str(interaction.user.id), self.draft_id)
+        if draft is None:
+            await interaction.response.send_message(DRAFT_EXPIRED_MESSAGE, ephemeral=True)
+            return
 
-        if not self.documents:
+        if not draft.documents:
             await interaction.response.send_message(
                 "Per favore allega almeno un documento prima!",
                 ephemeral=True
@@ -93,17 +142,36 @@ class DocumentUploadView(discord.ui.View):
         try:
             # First defer the response to prevent timeout
             logger.debug("Deferring response")
-            await interaction.response.defer(ephemeral=True)
+            with phase("defer"):
+                await interaction.response.defer(ephemeral=True)
+
+            documents = await store.load_documents(draft)
+            duplicates = 0
+            if DUPLICATE_POLICY != "off":
+                with phase("duplicates"):
+                    matches = await document_duplicates(
+                        [doc['content'] for doc in documents], draft.activity, str(interaction.user.id)
+                    )
+                duplicates = sum(match is not None for match in matches)
+                if DUPLICATE_POLICY == "reject" and duplicates:
+                    documents = [doc for doc, match in zip(documents, matches) if match is None]
+                    if not documents:
+                        await store.discard(draft)
+                        await interaction.followup.send(
+                            "Tutti i documenti allegati sono già stati caricati: bozza annullata.",
+                            ephemeral=True
+                        )
+                        return
 
             files = []
             embeds = []
 
-            for idx, doc in enumerate(self.documents, 1):
+            for idx, doc in enumerate(documents, 1):
                 # Create a more descriptive filename using the name and content preview
                 content_preview = doc['context'][:30].replace(" ", "_")  # First 30 chars of context
-                filename = f"{self.name}_{content_preview}_{idx}.txt"
+                filename = f"{draft.activity}_{content_preview}_{idx}.txt"
                 filename = "".join(c for c in filename if c.isalnum() or c in "._-")  # Sanitize filename
-                logger.debug(f"Generated filename: {filename}")
+                logger.debug("Generated filename: %s", filename)
 
                 # Create Discord file and embed
                 file = discord.File(
@@ -116,47 +184,64 @@ class DocumentUploadView(discord.ui.View):
                     author=interaction.user,
                     context=doc['context'],
                     index=idx,
-                    name=self.name
+                    name=draft.activity
                 )
                 embeds.append(embed)
 
-            # Send documents to channel first
-            logger.debug("Sending documents to channel")
-            message = await interaction.channel.send(
-                embeds=embeds,
-                files=files
-            )
-
-            # Save to database using the new function
+            # Save first: once journaled the submission survives a database outage, so
+            # nothing is posted to the channel that might have to be taken back
             logger.debug("Starting database save operation")
-            success = await save_documents_to_db(
-                self.documents,
-                self.name,
-                str(interaction.user.id),
-                interaction.user.display_name
-            )
+            with phase("db"):
+                try:
+                    success = await save_documents_to_db(
+                        documents,
+                        draft.activity,
+                        str(interaction.user.id),
+                        interaction.user.display_name
+                    )
+                except InvalidSubmission as e:
+                    await interaction.followup.send(f"Documenti non salvati: {e}", ephemeral=True)
+                    return
 
             if not success:
                 logger.error("Database save operation failed")
-                if message:
-                    await message.delete()
                 await interaction.followup.send(
                     "Errore durante il salvataggio dei documenti nel database.",
                     ephemeral=True
                 )
                 return
 
+            await store.discard(draft)
+
+            # Post the documents to the channel, split into as many messages as Discord's limits need
+            logger.debug("Sending documents to channel")
+            try:
+                with phase("upload"):
+                    await send_scheduler.send(
+                        interaction.channel,
+                        embeds=embeds,
+                        files=files
+                    )
+            except Exception as e:
+                logger.error("Documents saved but not posted to the channel: %s", e, exc_info=True)
+                await interaction.followup.send(
+                    "Documenti salvati, ma non è stato possibile pubblicarli nel canale.",
+                    ephemeral=True
+                )
+                return
+
             # Send success message using followup
             logger.debug("Sending success message")
-            await interaction.followup.send(
-                "Documenti caricati con successo!",
-                ephemeral=True
-            )
-
-            self.stop()
+            message = "Documenti caricati con successo!"
+            if duplicates and DUPLICATE_POLICY == "reject":
+                message += f" {duplicates} documenti già caricati sono stati scartati."
+            elif duplicates:
+                message += f" Attenzione: {duplicates} documenti risultano già caricati e potrebbero non essere conteggiati nello stipendio."
+            with phase("followup"):
+                await interaction.followup.send(message, ephemeral=True)
 
         except Exception as e:
-            logger.error(f"Error in submit: {e}", exc_info=True)
+            logger.error("Error in submit: %s", e, exc_info=True)
             try:
                 await interaction.followup.send(
                     "Errore durante il caricamento dei documenti. Riprova.",
@@ -182,9 +267,11 @@ class DocumentUploadModal(discord.ui.Modal, title="Carica Documento"):
         max_length=2000
     )
 
-    async def on_submit(self, interaction: discord.Interaction):
-        self.context_text = self.context_input.value
+    def __init__(self, draft: Draft):
+        super().__init__()
+        self.draft = draft
 
+    async def on_submit(self, interaction: discord.Interaction):
         if not validate_file(self.file_input.value):
             await interaction.response.send_message(
                 "Contenuto del documento non valido. Riprova.",
@@ -192,16 +279,60 @@ class DocumentUploadModal(discord.ui.Modal, title="Carica Documento"):
             )
             return
 
-        self.file_content = self.file_input.value.encode()
-        await interaction.response.send_message(
-            "Documento pronto per il caricamento!",
-            ephemeral=True
-        )
+        content = self.file_input.value.encode()
+        match = None
+        if DUPLICATE_POLICY != "off":
+            match = (await document_duplicates([content], self.draft.activity, str(interaction.user.id)))[0]
+            if match is not None and DUPLICATE_POLICY == "reject":
+                await interaction.response.send_message(
+                    f"Questo documento è già stato caricato per l'attività {match.activity_name}.",
+                    ephemeral=True
+                )
+                return
+
+        try:
+            draft = await get_draft_store().add_document(
+                self.draft.user_id,
+                self.draft.draft_id,
+                content,
+                self.context_input.value
+            )
+        except KeyError:
+            await interaction.response.send_message(DRAFT_EXPIRED_MESSAGE, ephemeral=True)
+            return
+        except DraftLimitExceeded:
+            await interaction.response.send_message(
+                f"Puoi allegare al massimo {DRAFT_MAX_DOCUMENTS} documenti per invio.",
+                ephemeral=True
+            )
+            return
+        logger.debug("Added document. Total documents: %d", len(draft.documents))
+
+        # The modal was opened from the draft message, so its buttons can be updated in place
+        content = draft_message(draft)
+        if match is not None:
+            content += f"\nAttenzione: l'ultimo documento allegato risulta già caricato per l'attività {match.activity_name}."
+        await interaction.response.edit_message(content=content, view=draft_view(draft))
 
 class DocumentHandler(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
+    async def cog_load(self):
+        self.purge_drafts.start()
+
+    async def cog_unload(self):
+        self.purge_drafts.cancel()
+
+    @tasks.loop(seconds=DRAFT_JANITOR_INTERVAL)
+    async def purge_drafts(self):
+        try:
+            removed = await get_draft_store().purge_expired()
+            if removed:
+                logger.info("Removed %d expired upload drafts", removed)
+        except Exception as e:
+            logger.error("Error purging upload drafts: %s", e, exc_info=True)
+
     @app_commands.command(
         name="documenti",
         description="Carica più documenti con un nome specifico"
@@ -209,18 +340,33 @@ class DocumentHandler(commands.Cog):
     @app_commands.describe(
         nome="Nome per identificare questi documenti"
     )
+    @app_commands.autocomplete(nome=activity_autocomplete)
     @app_commands.checks.has_permissions(attach_files=True)
+    @instrumented("documenti")
     async def documents(self, interaction: discord.Interaction, nome: str):
         try:
-            view = DocumentUploadView(name=nome)
+            # Refuse a name the database would not take before any document is drafted for it
+            check_columns(Document, name=nome)
+            # Reopens the user's pending draft for this activity if there is one
+            draft = await get_draft_store().open(str(interaction.user.id), nome)
+            logger.debug("Opened draft %s with name: %s", draft.draft_id, nome)
+            await interaction.response.send_message(
+                draft_message(draft),
+                view=draft_view(draft),
+                ephemeral=True
+            )
+
+        except InvalidSubmission as e:
+            await interaction.response.send_message(str(e), ephemeral=True)
+
+        except DraftLimitExceeded:
             await interaction.response.send_message(
-                f"Caricamento documenti per '{nome}'.\nUsa i pulsanti qui sotto per caricare i tuoi documenti:",
-                view=view,
+                f"Hai già {DRAFT_MAX_PER_USER} caricamenti in sospeso. Inviali o attendi che scadano.",
                 ephemeral=True
             )
 
         except Exception as e:
-            logger.error(f"Error in documents command: {e}")
+            logger.error("Error in documents command: %s", e)
             await interaction.response.send_message(
                 "Si è verificato un errore durante l'elaborazione della richiesta.",
                 ephemeral=True
@@ -233,53 +379,220 @@ class DocumentHandler(commands.Cog):
     @app_commands.describe(
         nome="Nome dei documenti da cercare"
     )
+    @app_commands.autocomplete(nome=activity_autocomplete)
+    @instrumented("attivita")
     async def activities(self, interaction: discord.Interaction, nome: str):
         try:
-            with app.app_context():
-                # Query documents from database
-                documents = Document.query.filter_by(name=nome).all()
+            async def fetch_page(after, before):
+                return await get_documents_page(nome, after=after, before=before)
+
+            async def render_page(page: Page, page_number: int) -> dict:
+                return await self.render_documents_page(interaction, nome, page, page_number)
 
-            if not documents:
+            view = PaginatorView(fetch_page, render_page, owner_id=interaction.user.id)
+            with phase("db"):
+                page = await view.load_first_page()
+
+            if not page.items:
                 await interaction.response.send_message(
                     f"Nessun documento trovato per '{nome}'.",
                     ephemeral=True
                 )
                 return
 
-            # Send documents
-            files = []
-            embeds = []
+            with phase("upload"):
+                await view.send(interaction)
 
-            for idx, doc in enumerate(documents, 1):
-                # Create descriptive filename using content preview
-                content_preview = doc.context[:30].replace(" ", "_")
-                filename = f"{nome}_{content_preview}_{idx}.txt"
-                filename = "".join(c for c in filename if c.isalnum() or c in "._-")  # Sanitize filename
+        except Exception as e:
+            logger.error("Error in activities command: %s", e)
+            await interaction.response.send_message(
+                "Si è verificato un errore durante la ricerca dei documenti.",
+                ephemeral=True
+            )
 
-                file = discord.File(
-                    io.BytesIO(doc.content),
-                    filename=filename
-                )
-                files.append(file)
+    async def render_documents_page(self, interaction: discord.Interaction, nome: str, page: Page, page_number: int) -> dict:
+        # Payloads are only loaded here, for the rows on screen
+        files = []
+        embeds = []
+
+        first_index = (page_number - 1) * PAGE_SIZE + 1
+        for idx, doc in enumerate(page.items, first_index):
+            # Create descriptive filename using content preview
+            content_preview = doc.context[:30].replace(" ", "_")
+            filename = f"{nome}_{content_preview}_{idx}.txt"
+            filename = "".join(c for c in filename if c.isalnum() or c in "._-")  # Sanitize filename
+
+            file = discord.File(
+                io.BytesIO(await load_content(doc)),
+                filename=filename
+            )
+            files.append(file)
 
-                embed = create_document_embed(
-                    author=interaction.user,
-                    context=doc.context,
-                    index=idx,
-                    name=nome
+            embed = create_document_embed(
+                author=interaction.user,
+                context=doc.context,
+                index=idx,
+                name=nome
+            )
+            embeds.append(embed)
+
+        return {
+            "content": f"Documenti trovati per '{nome}' (pagina {page_number}):",
+            "embeds": embeds,
+            "files": files
+        }
+
+    @app_commands.command(
+        name="cerca",
+        description="Cerca nel testo di documenti, ispezioni e sanzioni"
+    )
+    @app_commands.describe(
+        testo="Parole da cercare"
+    )
+    @instrumented("cerca")
+    async def search(self, interaction: discord.Interaction, testo: str):
+        if not search_terms(testo):
+            await interaction.response.send_message(
+                "La ricerca è vuota: scrivi almeno una parola da cercare.",
+                ephemeral=True
+            )
+            return
+
+        try:
+            async def fetch_page(after, before):
+                return await search_page(testo, after=after, before=before)
+
+            async def render_page(page: Page, page_number: int) -> dict:
+                embed = discord.Embed(
+                    title=f"Risultati per '{testo}'",
+                    color=discord.Color.blue(),
+                    timestamp=datetime.now(timezone.utc)
                 )
-                embeds.append(embed)
+                for position, hit in enumerate(page.items, page.first_key + 1):
+                    label = SEARCH_KIND_LABELS.get(hit.kind, hit.kind)
+                    snippet = hit.snippet or "(nessuna anteprima)"
+                    embed.add_field(
+                        name=f"{position}. {label} #{hit.source_id} - {hit.activity_name}",
+                        value=f"{snippet[:900]}\n*{hit.created_at:%d/%m/%Y %H:%M}*",
+                        inline=False
+                    )
+                embed.set_footer(text=f"Pagina {page_number}")
+                return {"embed": embed}
+
+            view = PaginatorView(fetch_page, render_page, owner_id=interaction.user.id)
+            with phase("db"):
+                page = await view.load_first_page()
+
+            if not page.items:
+                await interaction.response.send_message(
+                    f"Nessun risultato per '{testo}'.",
+                    ephemeral=True
+                )
+                return
+
+            with phase("followup"):
+                await view.send(interaction)
+
+        except Exception as e:
+            logger.error("Error in search command: %s", e, exc_info=True)
+            await interaction.response.send_message(
+                "Si è verificato un errore durante la ricerca.",
+                ephemeral=True
+            )
 
+    @app_commands.command(
+        name="storico",
+        description="Mostra la cronologia di documenti, ispezioni e sanzioni di un'attività"
+    )
+    @app_commands.describe(
+        nome="Nome dell'attività",
+        tipo="Mostra solo un tipo di evento",
+        dal="Dal giorno (GG/MM/AAAA)",
+        al="Fino al giorno incluso (GG/MM/AAAA)"
+    )
+    @app_commands.choices(tipo=[
+        app_commands.Choice(name="Documenti", value="document"),
+        app_commands.Choice(name="Ispezioni", value="inspection"),
+        app_commands.Choice(name="Sanzioni", value="sanction"),
+    ])
+    @app_commands.autocomplete(nome=activity_autocomplete)
+    @instrumented("storico")
+    async def history(
+        self,
+        interaction: discord.Interaction,
+        nome: str,
+        tipo: Optional[app_commands.Choice[str]] = None,
+        dal: Optional[str] = None,
+        al: Optional[str] = None
+    ):
+        try:
+            since = parse_day(dal) if dal else None
+            # Inclusive end day: everything before the following midnight
+            until = parse_day(al) + timedelta(days=1) if al else None
+        except ValueError:
+            await interaction.response.send_message(
+                "Data non valida. Usa il formato GG/MM/AAAA.",
+                ephemeral=True
+            )
+            return
+        if since is not None and until is not None and since >= until:
             await interaction.response.send_message(
-                f"Documenti trovati per '{nome}':",
-                embeds=embeds,
-                files=files
+                "La data di inizio deve precedere quella di fine.",
+                ephemeral=True
             )
+            return
+        kind = tipo.value if tipo else None
+
+        try:
+            async def fetch_page(after, before):
+                return await get_timeline_page(
+                    nome, kind=kind, since=since, until=until,
+                    after=after, before=before, limit=TIMELINE_PAGE_SIZE
+                )
+
+            async def render_page(page: Page, page_number: int) -> dict:
+                embed = discord.Embed(
+                    title=f"Storico di '{nome}'",
+                    color=discord.Color.blue(),
+                    timestamp=datetime.now(timezone.utc)
+                )
+                for event in page.items:
+                    label = SEARCH_KIND_LABELS.get(event.kind, event.kind)
+                    summary = event.summary or "(nessun dettaglio)"
+                    embed.add_field(
+                        name=f"{event.created_at:%d/%m/%Y %H:%M} - {label} #{event.source_id}",
+                        value=f"{summary[:900]}\n*{event.author_name}*",
+                        inline=False
+                    )
+                filters = [tipo.name] if tipo else []
+                if dal:
+                    filters.append(f"dal {dal}")
+                if al:
+                    filters.append(f"al {al}")
+                footer = f"Pagina {page_number}"
+                if filters:
+                    footer += " · " + ", ".join(filters)
+                embed.set_footer(text=footer)
+                return {"embed": embed}
+
+            view = PaginatorView(fetch_page, render_page, owner_id=interaction.user.id)
+            with phase("db"):
+                page = await view.load_first_page()
+
+            if not page.items:
+                await interaction.response.send_message(
+                    f"Nessun evento trovato per '{nome}'.",
+                    ephemeral=True
+                )
+                return
+
+            with phase("followup"):
+                await view.send(interaction)
 
         except Exception as e:
-            logger.error(f"Error in activities command: {e}")
+            logger.error("Error in history command: %s", e, exc_info=True)
             await interaction.response.send_message(
-                "Si è verificato un errore durante la ricerca dei documenti.",
+                "Si è verificato un errore durante la lettura dello storico.",
                 ephemeral=True
             )
 
@@ -291,7 +604,7 @@ class DocumentHandler(commands.Cog):
                 ephemeral=True
             )
         else:
-            logger.error(f"Unexpected error in documents command: {error}")
+            logger.error("Unexpected error in documents command: %s", error)
             await interaction.response.send_message(
                 "Si è verificato un errore imprevisto. Riprova più tardi.",
                 ephemeral=True
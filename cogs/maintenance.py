@@ -0,0 +1,43 @@
+from discord.ext import commands, tasks
+import logging
+from datetime import timedelta
+from models.archival import ARCHIVE_AFTER_MONTHS, ARCHIVE_INTERVAL, archive_old_records
+from models.partitions import maintain_partitions
+from models.repository import prune_applied_journal_entries
+from utils.journal import JOURNAL_MARKER_DAYS
+
+logger = logging.getLogger(__name__)
+
+class Maintenance(commands.Cog):
+    """
+    Background upkeep of the database: next months' partitions, cold
+    archival of old records and old write journal replay markers.
+    """
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    async def cog_load(self):
+        self.archive_records.start()
+
+    async def cog_unload(self):
+        self.archive_records.cancel()
+
+    @tasks.loop(seconds=ARCHIVE_INTERVAL)
+    async def archive_records(self):
+        # In a cluster only the process owning shard 0 does the upkeep, like the command sync
+        if self.bot.shard_ids is not None and 0 not in self.bot.shard_ids:
+            return
+        try:
+            await maintain_partitions()
+            archived = await archive_old_records(ARCHIVE_AFTER_MONTHS)
+            if archived:
+                logger.info("Archived records older than %d months: %s", ARCHIVE_AFTER_MONTHS, archived)
+            pruned = await prune_applied_journal_entries(timedelta(days=JOURNAL_MARKER_DAYS))
+            if pruned:
+                logger.info("Pruned %d journal replay markers", pruned)
+        except Exception as e:
+            logger.error("Error archiving old records: %s", e, exc_info=True)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(Maintenance(bot))
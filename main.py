@@ -1,11 +1,57 @@
 import os
+import asyncio
 import logging
+import threading
+from werkzeug.serving import make_server
 from bot import DocBot
+from app import app
+from models.migrations import migrate_database
+from utils.cluster import Supervisor, build_plan, fetch_recommended_shards
+from utils.database import dispose_engine
+from utils.log_pipeline import configure_logging, stop_logging
 
 # Configure logging
-logging.basicConfig(level=logging.DEBUG)
+configure_logging()
 logger = logging.getLogger(__name__)
 
+def start_metrics_server(port: int):
+    """
+    Serve the Flask app (and its /metrics route) from a background thread
+    of the bot process, so the metrics describe this process.
+    """
+    server = make_server("0.0.0.0", port, app, threaded=True)
+    thread = threading.Thread(target=server.serve_forever, name="metrics-server", daemon=True)
+    thread.start()
+    logger.info("Serving metrics on port %d", port)
+    return server
+
+async def migrate_once():
+    try:
+        applied = await migrate_database()
+        if applied:
+            logger.info("Applied schema migrations %s", applied)
+    finally:
+        await dispose_engine()
+
+def run_cluster_supervisor(token: str, processes: int):
+    """
+    Spread the shards over `processes` workers (each worker serves metrics
+    on METRICS_PORT + its cluster id) and restart them when they crash.
+    """
+    shard_count = os.getenv("SHARD_COUNT")
+    shard_count = int(shard_count) if shard_count else asyncio.run(fetch_recommended_shards(token))
+
+    # Upgrade the schema once here so the workers only find it current
+    asyncio.run(migrate_once())
+
+    plan = build_plan(shard_count, processes)
+    for spec in plan:
+        logger.info("Cluster %d: shards %s, pool size %d", spec.cluster_id, spec.shard_ids, spec.pool_size)
+    try:
+        Supervisor(plan, token).run()
+    finally:
+        stop_logging()
+
 def main():
     # Get the token from environment variables
     token = os.getenv("DISCORD_TOKEN")
@@ -15,18 +61,31 @@ def main():
 
     # Debug token format without exposing sensitive data
     token = token.strip()  # Remove any whitespace
-    logger.debug(f"Token length: {len(token)}")
-    logger.debug(f"Token format check - starts with: {token[:4]}... (rest hidden)")
-    logger.debug(f"Token format check - ends with: ...{token[-4:]}") #Added this line for more robust check
+    logger.debug("Token length: %d", len(token))
+    logger.debug("Token format check - starts with: %s... (rest hidden)", token[:4])
+    logger.debug("Token format check - ends with: ...%s", token[-4:]) #Added this line for more robust check
+
+    # More than one process: shard the bot and supervise the workers
+    processes = int(os.getenv("CLUSTER_PROCESSES", "1"))
+    if processes > 1:
+        run_cluster_supervisor(token, processes)
+        return
+
+    metrics_port = os.getenv("METRICS_PORT")
+    if metrics_port:
+        start_metrics_server(int(metrics_port))
 
     # Initialize and run the bot
     try:
         bot = DocBot()
         logger.info("Starting bot...")
-        bot.run(token)  # Token is already stripped
+        # log_handler=None keeps discord.py from adding its own stderr handler
+        bot.run(token, log_handler=None)  # Token is already stripped
     except Exception as e:
-        logger.error(f"Failed to start bot: {e}")
+        logger.error("Failed to start bot: %s", e)
         raise
+    finally:
+        stop_logging()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,13 +1,24 @@
-from sqlalchemy import Column, Integer, String, LargeBinary, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, LargeBinary, DateTime, ForeignKey, Index
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from app import db
+from models.types import CompressedBinary
 
 class Inspection(db.Model):
     __tablename__ = 'inspections'
-    
+    __table_args__ = (
+        Index('ix_inspections_author_id_created_at', 'author_id', 'created_at'),
+        # Exact duplicate lookups on upload
+        Index('ix_inspections_content_hash', 'content_hash'),
+    )
+
     id = Column(Integer, primary_key=True)
     activity_name = Column(String(100), nullable=False, index=True)
-    content = Column(LargeBinary, nullable=False)
+    # Legacy inline payload; new rows keep the bytes in the blob store
+    content = deferred(Column(CompressedBinary, nullable=True))
+    content_hash = Column(String(64))
+    content_size = Column(Integer)
+    mime_type = Column(String(100))
     author_id = Column(String(100), nullable=False)
     author_name = Column(String(100), nullable=False)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
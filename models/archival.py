@@ -0,0 +1,285 @@
+import asyncio
+import logging
+import os
+from datetime import date, datetime, timezone
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple, Union
+from sqlalchemy import delete, func, select, text
+from sqlalchemy.engine import Connection
+from models.document import Document
+from models.activity import Inspection, Sanction
+from models.partitions import (
+    PARTITIONED_MODELS,
+    add_months,
+    is_partitioned,
+    list_partitions,
+    month_start,
+    partition_name,
+)
+from utils.blob_store import get_blob_store
+from utils.cache import read_cache
+from utils.cold_archive import get_cold_archive
+from utils.database import get_engine, session_scope
+
+logger = logging.getLogger(__name__)
+
+# Months (besides the current one) that stay in the database
+ARCHIVE_AFTER_MONTHS = int(os.environ.get("ARCHIVE_AFTER_MONTHS", 12))
+# Seconds between archival runs
+ARCHIVE_INTERVAL = float(os.environ.get("ARCHIVE_INTERVAL", 6 * 60 * 60))
+ARCHIVE_BATCH_SIZE = 500
+
+Record = Union[Document, Inspection, Sanction]
+
+def activity_column(model) -> str:
+    return "name" if model is Document else "activity_name"
+
+def _month_bounds(month: date):
+    end = add_months(month, 1)
+    return (
+        datetime(month.year, month.month, 1, tzinfo=timezone.utc),
+        datetime(end.year, end.month, 1, tzinfo=timezone.utc),
+    )
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+def cursor_key(key: Tuple) -> Tuple:
+    """A (created_at, id) page cursor with created_at made timezone-aware, so archived and live keys compare."""
+    return (_as_utc(key[0]), key[1])
+
+def record_key(row: Record) -> Tuple:
+    return cursor_key((row.created_at, row.id))
+
+def row_to_dict(row: Record) -> dict:
+    # The deferred inline payload is never archived; payloads live in the blob store
+    return {
+        column.key: getattr(row, column.key)
+        for column in type(row).__table__.columns
+        if column.key != "content"
+    }
+
+def row_from_dict(model, data: dict) -> Record:
+    """
+    A transient (never added to a session) instance of an archived row, so
+    callers can treat it like one read from the database.
+    """
+    data = dict(data)
+    if data.get("created_at"):
+        data["created_at"] = _as_utc(datetime.fromisoformat(data["created_at"]))
+    return model(**data)
+
+def _months_to_archive(connection: Connection, model, cutoff: date) -> List[date]:
+    """
+    Every month before `cutoff` that still has rows or, on Postgres, a partition.
+    """
+    cutoff_at, _ = _month_bounds(cutoff)
+    months: Set[date] = set()
+    oldest = connection.execute(
+        select(func.min(model.created_at)).where(model.created_at < cutoff_at)
+    ).scalar()
+    if oldest is not None:
+        month = month_start(oldest)
+        while month < cutoff:
+            months.add(month)
+            month = add_months(month, 1)
+    if is_partitioned(connection, model.__tablename__):
+        months.update(month for _, month in list_partitions(connection, model.__tablename__) if month < cutoff)
+    return sorted(months)
+
+def _drop_month(connection: Connection, model, month: date, archived_ids: Set[int]):
+    """
+    Remove the archived rows of a month: the whole partition (or date range)
+    when it holds nothing else, otherwise just those rows.
+
+    Rows can reach a month after it was read for archiving: a journal entry
+    replayed late keeps the created_at it was submitted with. Those are left
+    in place for the next run to archive.
+    """
+    table = model.__tablename__
+    start, end = _month_bounds(month)
+    in_month = (model.created_at >= start, model.created_at < end)
+    partition = None
+    if is_partitioned(connection, table) and month in {m for _, m in list_partitions(connection, table)}:
+        partition = partition_name(table, month)
+        # Holds off inserts into the month until the partition is gone
+        connection.execute(text(f"LOCK TABLE {partition} IN ACCESS EXCLUSIVE MODE"))
+
+    # Archival is the only thing that deletes rows, so an equal count means
+    # the month holds exactly the archived rows
+    rows = connection.execute(select(func.count()).select_from(model).where(*in_month)).scalar()
+    if rows == len(archived_ids):
+        if partition is not None:
+            connection.execute(text(f"DROP TABLE {partition}"))
+        else:
+            connection.execute(delete(model).where(*in_month))
+        return
+
+    logger.warning(
+        f"{rows - len(archived_ids)} {table} rows arrived in {month:%Y-%m} while it was archived; "
+        "keeping them for the next run"
+    )
+    ids = sorted(archived_ids)
+    for index in range(0, len(ids), ARCHIVE_BATCH_SIZE):
+        connection.execute(delete(model).where(*in_month, model.id.in_(ids[index:index + ARCHIVE_BATCH_SIZE])))
+
+async def archive_month(model, month: date) -> int:
+    """
+    Move one month of `model` rows to the cold archive, then remove them
+    from the database (dropping the month's partition on Postgres when
+    nothing else arrived in it meanwhile; see _drop_month).
+
+    The archive file is durable before anything is deleted, so a crash
+    in between at worst archives the month twice; readers skip the duplicates.
+
+    Returns:
+        int: Number of rows archived
+    """
+    table = model.__tablename__
+    start, end = _month_bounds(month)
+    archive = get_cold_archive()
+    writer = await asyncio.to_thread(archive.open_slice, table, month, activity_column(model))
+    archived_ids: Set[int] = set()
+    try:
+        async with session_scope() as session:
+            result = await session.stream_scalars(
+                select(model)
+                .where(model.created_at >= start, model.created_at < end)
+                .order_by(model.created_at, model.id)
+                .execution_options(yield_per=ARCHIVE_BATCH_SIZE)
+            )
+            async for batch in result.partitions():
+                rows = []
+                for row in batch:
+                    data = row_to_dict(row)
+                    if "content_hash" in data and not data["content_hash"]:
+                        # Legacy inline payload: move it to the blob store so the archived row keeps a hash
+                        async with session_scope() as payload_session:
+                            content = await payload_session.scalar(select(model.content).where(model.id == row.id))
+                        ref = await get_blob_store().put_async(content)
+                        data.update(content_hash=ref.sha256, content_size=ref.size)
+                    rows.append(data)
+                    archived_ids.add(row.id)
+                await asyncio.to_thread(writer.write, rows)
+
+        if writer.rows:
+            name = await asyncio.to_thread(writer.commit)
+            logger.info(f"Archived {writer.rows} {table} rows from {month:%Y-%m} to {name}")
+        else:
+            await asyncio.to_thread(writer.abort)
+    except BaseException:
+        await asyncio.to_thread(writer.abort)
+        raise
+
+    async with get_engine().begin() as connection:
+        await connection.run_sync(_drop_month, model, month, archived_ids)
+
+    for activity in writer.activities:
+        read_cache.invalidate_tag(activity)
+    return writer.rows
+
+async def archive_old_records(max_age_months: int = ARCHIVE_AFTER_MONTHS) -> Dict[str, int]:
+    """
+    Archive every month older than the current month minus `max_age_months`.
+
+    Returns:
+        dict: Rows archived per table
+    """
+    cutoff = add_months(month_start(datetime.now(timezone.utc)), -max_age_months)
+    archived = {}
+    for model in PARTITIONED_MODELS:
+        async with get_engine().connect() as connection:
+            months = await connection.run_sync(_months_to_archive, model, cutoff)
+        for month in months:
+            archived[model.__tablename__] = archived.get(model.__tablename__, 0) + await archive_month(model, month)
+    return archived
+
+def has_archived(model, activity: str) -> bool:
+    """Whether the archive index lists any `model` rows of `activity` (no disk reads)."""
+    return get_cold_archive().has_activity(model.__tablename__, activity)
+
+def _read_archived(model, activity: str) -> List[Record]:
+    rows = get_cold_archive().iter_rows(model.__tablename__, activity, activity_column(model))
+    return sorted((row_from_dict(model, data) for data in rows), key=record_key)
+
+async def archived_rows(model, activity: str) -> List[Record]:
+    """
+    Archived rows of one activity, oldest first; empty without touching
+    the disk when the index shows nothing archived for it.
+    """
+    if not has_archived(model, activity):
+        return []
+    return await asyncio.to_thread(_read_archived, model, activity)
+
+def _month_of(key: Tuple) -> str:
+    return f"{cursor_key(key)[0].astimezone(timezone.utc):%Y-%m}"
+
+def _read_archived_page(model, activity: str, after: Optional[Tuple], before: Optional[Tuple], limit: int) -> List[Record]:
+    archive = get_cold_archive()
+    table = model.__tablename__
+    months = archive.months(table, activity)
+    if before is not None:
+        bound = cursor_key(before)
+        months = [month for month in reversed(months) if month <= _month_of(before)]
+    elif after is not None:
+        bound = cursor_key(after)
+        months = [month for month in months if month >= _month_of(after)]
+
+    rows: List[Record] = []
+    for month in months:
+        data = archive.iter_month(table, month, activity, activity_column(model))
+        batch = sorted((row_from_dict(model, item) for item in data), key=record_key)
+        if before is not None:
+            rows = [row for row in batch if record_key(row) < bound] + rows
+        else:
+            rows += [row for row in batch if after is None or record_key(row) > bound]
+        if len(rows) >= limit:
+            break
+    return rows[max(0, len(rows) - limit):] if before is not None else rows[:limit]
+
+async def archived_page(
+    model,
+    activity: str,
+    after: Optional[Tuple] = None,
+    before: Optional[Tuple] = None,
+    limit: int = ARCHIVE_BATCH_SIZE
+) -> List[Record]:
+    """
+    Archived rows of one activity next to a (created_at, id) cursor, in
+    ascending order: the first `limit` after `after`, or the last `limit`
+    before `before`.
+
+    Only the month slices from the cursor up to the one that fills the
+    page are decompressed, found through the archive index, so paging
+    through a long history never reads (or holds) all of it.
+    """
+    if not has_archived(model, activity):
+        return []
+    return await asyncio.to_thread(_read_archived_page, model, activity, after, before, limit)
+
+async def stream_archived(model, activity: str, batch_size: int = ARCHIVE_BATCH_SIZE) -> AsyncIterator[Record]:
+    """
+    Like archived_rows, but decoded `batch_size` rows at a time in a worker
+    thread, so an activity with a large archive does not fill memory.
+    """
+    if not has_archived(model, activity):
+        return
+    rows = get_cold_archive().iter_rows(model.__tablename__, activity, activity_column(model))
+
+    def next_batch() -> List[Record]:
+        batch = []
+        for data in rows:
+            batch.append(row_from_dict(model, data))
+            if len(batch) >= batch_size:
+                break
+        return batch
+
+    while batch := await asyncio.to_thread(next_batch):
+        for row in batch:
+            yield row
+
+def archived_activity_names() -> Set[str]:
+    return {
+        activity
+        for entry in get_cold_archive().index().values()
+        for activity in entry["activities"]
+    }
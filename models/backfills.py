@@ -0,0 +1,182 @@
+import logging
+from collections import defaultdict
+from datetime import date
+from sqlalchemy import Date, and_, cast, delete, func, insert, select
+from sqlalchemy.orm import aliased
+from utils.blob_store import BlobRef
+from utils.database import session_scope
+from models.document import Document
+from models.activity import Inspection, Sanction
+from models.payroll import AuthorDailyCount
+from models.search import SearchEntry
+from models.timeline import TimelineEvent
+from models.duplicates import DocumentFingerprint, Fingerprint, add_fingerprints
+from models.repository import (
+    document_search_text,
+    inspection_search_text,
+    load_content,
+    sanction_search_text,
+)
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = 500
+
+SEARCH_SOURCES = (("document", Document), ("inspection", Inspection), ("sanction", Sanction))
+
+def _utc_day(session, column):
+    if session.get_bind().dialect.name == "postgresql":
+        return cast(func.timezone("UTC", column), Date)
+    return func.date(column)
+
+async def fingerprint_documents(batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """
+    Fingerprint documents that have none yet, oldest first, so each copy is
+    flagged against the original. Committed in batches; safe to re-run.
+
+    Returns:
+        int: Documents fingerprinted
+    """
+    fingerprinted = duplicates = 0
+    last_id = 0
+    while True:
+        async with session_scope() as session:
+            missing = select(DocumentFingerprint.document_id).where(
+                DocumentFingerprint.document_id == Document.id
+            ).exists()
+            rows = list(await session.scalars(
+                select(Document)
+                .where(Document.id > last_id, ~missing)
+                .order_by(Document.id)
+                .limit(batch_size)
+            ))
+            if not rows:
+                break
+
+            fingerprints = [Fingerprint.of(await load_content(row)) for row in rows]
+            duplicates += await add_fingerprints(session, rows, fingerprints)
+
+        last_id = rows[-1].id
+        fingerprinted += len(rows)
+        logger.info(f"Fingerprinted {fingerprinted} documents, {duplicates} duplicates (last id {last_id})")
+    return fingerprinted
+
+async def rebuild_author_daily_counts() -> int:
+    """
+    Recompute author_daily_counts in a single transaction.
+
+    Document and inspection counts come from the timeline and duplicate
+    documents from their fingerprints, both of which outlive archival, so
+    archived days keep their totals. Duplicate inspections are found among
+    the inspections still in the database.
+
+    Returns:
+        int: Author/day rows written
+    """
+    counts = defaultdict(lambda: {
+        "author_name": None, "documents": 0, "inspections": 0,
+        "duplicate_documents": 0, "duplicate_inspections": 0,
+    })
+
+    def add(field: str, result):
+        for author_id, row_day, total, *author_name in result:
+            if isinstance(row_day, str):
+                row_day = date.fromisoformat(row_day)
+            entry = counts[(author_id, row_day)]
+            entry["author_name"] = entry["author_name"] or (author_name[0] if author_name else None)
+            entry[field] = total
+
+    async with session_scope() as session:
+        for kind, field in (("document", "documents"), ("inspection", "inspections")):
+            day = _utc_day(session, TimelineEvent.created_at)
+            add(field, await session.execute(
+                select(TimelineEvent.author_id, day, func.count(TimelineEvent.id), func.max(TimelineEvent.author_name))
+                .where(TimelineEvent.kind == kind)
+                .group_by(TimelineEvent.author_id, day)
+            ))
+
+        day = _utc_day(session, DocumentFingerprint.created_at)
+        add("duplicate_documents", await session.execute(
+            select(DocumentFingerprint.author_id, day, func.count(DocumentFingerprint.document_id))
+            .where(DocumentFingerprint.duplicate_of.is_not(None))
+            .group_by(DocumentFingerprint.author_id, day)
+        ))
+
+        earlier = aliased(Inspection)
+        day = _utc_day(session, Inspection.created_at)
+        add("duplicate_inspections", await session.execute(
+            select(Inspection.author_id, day, func.count(Inspection.id), func.max(Inspection.author_name))
+            .where(
+                select(earlier.id)
+                .where(earlier.content_hash == Inspection.content_hash, earlier.id < Inspection.id)
+                .exists()
+            )
+            .group_by(Inspection.author_id, day)
+        ))
+
+        await session.execute(delete(AuthorDailyCount))
+        if counts:
+            await session.execute(
+                insert(AuthorDailyCount),
+                [{"author_id": author_id, "day": day, **values} for (author_id, day), values in counts.items()]
+            )
+
+    logger.info(f"Rebuilt {len(counts)} author/day rows")
+    return len(counts)
+
+async def _search_entry(kind: str, row) -> SearchEntry:
+    if kind == "document":
+        body = document_search_text(row.context, await load_content(row))
+        activity_name = row.name
+    elif kind == "inspection":
+        if row.content_hash:
+            body = await inspection_search_text(BlobRef(row.content_hash, row.content_size), row.mime_type)
+        else:
+            body = (await load_content(row)).decode("utf-8", errors="ignore")
+        activity_name = row.activity_name
+    else:
+        body = sanction_search_text(row.reason, row.sanction_text)
+        activity_name = row.activity_name
+
+    return SearchEntry(
+        kind=kind,
+        source_id=row.id,
+        activity_name=activity_name,
+        body=body,
+        created_at=row.created_at
+    )
+
+async def index_search_entries(batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """
+    Index the documents, inspections and sanctions that have no search
+    entry yet. Committed in batches; safe to re-run.
+
+    Returns:
+        int: Rows indexed
+    """
+    indexed = 0
+    for kind, model in SEARCH_SOURCES:
+        last_id = 0
+        while True:
+            async with session_scope() as session:
+                missing = (
+                    select(SearchEntry.id)
+                    .where(and_(SearchEntry.kind == kind, SearchEntry.source_id == model.id))
+                    .exists()
+                )
+                rows = list(await session.scalars(
+                    select(model)
+                    .where(model.id > last_id, ~missing)
+                    .order_by(model.id)
+                    .limit(batch_size)
+                ))
+                if not rows:
+                    break
+
+                entries = [await _search_entry(kind, row) for row in rows]
+                session.add_all(entry for entry in entries if entry.body)
+
+            last_id = rows[-1].id
+            indexed += len(rows)
+            logger.info(f"{kind}: indexed {len(rows)} more rows (last id {last_id})")
+    return indexed
@@ -1,13 +1,24 @@
-from sqlalchemy import Column, Integer, String, LargeBinary, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, String, LargeBinary, DateTime, ForeignKey, Index
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from app import db
+from models.types import CompressedBinary
 
 class Document(db.Model):
     __tablename__ = 'documents'
+    __table_args__ = (
+        # Keyset pagination for /attivita walks (name, created_at, id)
+        Index('ix_documents_name_created_at_id', 'name', 'created_at', 'id'),
+        Index('ix_documents_author_id_created_at', 'author_id', 'created_at'),
+    )
     
     id = Column(Integer, primary_key=True)
     name = Column(String(100), nullable=False, index=True)
-    content = Column(LargeBinary, nullable=False)
+    # Legacy inline payload; new rows keep the bytes in the blob store
+    content = deferred(Column(CompressedBinary, nullable=True))
+    content_hash = Column(String(64))
+    content_size = Column(Integer)
+    mime_type = Column(String(100))
     context = Column(String(1000), nullable=False)
     author_id = Column(String(100), nullable=False)
     author_name = Column(String(100), nullable=False)
@@ -0,0 +1,219 @@
+import hashlib
+import logging
+import os
+from dataclasses import dataclass
+from typing import List, NamedTuple, Optional, Sequence
+from sqlalchemy import BigInteger, Column, DateTime, Integer, String, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import db
+from models.activity import Inspection
+from utils.database import session_scope
+from utils.simhash import SIMHASH_BANDS, bands, hamming, simhash, to_signed, to_unsigned
+
+logger = logging.getLogger(__name__)
+
+# What uploads do on a match: "off" (no check), "warn" (save and tell the
+# uploader) or "reject" (refuse the duplicate). Saved duplicates are flagged
+# for payroll whatever the policy.
+DUPLICATE_POLICY = os.environ.get("DUPLICATE_POLICY", "warn")
+# Largest SimHash distance, in bits, still counted as a near-duplicate. Must
+# stay below SIMHASH_BANDS for the band lookup to find every match.
+DUPLICATE_MAX_DISTANCE = min(int(os.environ.get("DUPLICATE_MAX_DISTANCE", 3)), SIMHASH_BANDS - 1)
+# Which stored documents an upload is compared with: "all", or only those
+# of the same "activity" or of the same "author"
+DUPLICATE_SCOPE = os.environ.get("DUPLICATE_SCOPE", "all")
+# Most rows sharing a band that are compared bit by bit per lookup, newest
+# first. Unrelated texts share a band about once per 16k documents, so this
+# only bounds pathological tables.
+DUPLICATE_CANDIDATES = int(os.environ.get("DUPLICATE_CANDIDATES", 1000))
+
+class DocumentFingerprint(db.Model):
+    """
+    Exact (SHA-256) and SimHash fingerprints of every document's text.
+
+    The SimHash is stored whole and cut into bands, each with its own
+    index: near-duplicates share at least one band, so a lookup is a few
+    index probes rather than a scan. Like the timeline, rows outlive
+    archival, so copies of archived documents are still caught.
+    """
+    __tablename__ = 'document_fingerprints'
+
+    document_id = Column(Integer, primary_key=True)
+    content_hash = Column(String(64), nullable=False, index=True)
+    simhash = Column(BigInteger)
+    band0 = Column(Integer, index=True)
+    band1 = Column(Integer, index=True)
+    band2 = Column(Integer, index=True)
+    band3 = Column(Integer, index=True)
+    activity_name = Column(String(100), nullable=False)
+    author_id = Column(String(100), nullable=False)
+    # The earlier document this one copies, if any
+    duplicate_of = Column(Integer)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+BAND_COLUMNS = [DocumentFingerprint.band0, DocumentFingerprint.band1, DocumentFingerprint.band2, DocumentFingerprint.band3]
+
+@dataclass
+class DuplicateMatch:
+    """
+    A stored document (document_id) or an earlier payload of the same batch
+    (batch_index) that a payload duplicates, byte for byte (exact) or within
+    `distance` SimHash bits.
+    """
+    distance: int
+    exact: bool = False
+    document_id: Optional[int] = None
+    batch_index: Optional[int] = None
+    activity_name: Optional[str] = None
+
+class Upload(NamedTuple):
+    """Who a payload belongs to, for DUPLICATE_SCOPE."""
+    activity_name: Optional[str] = None
+    author_id: Optional[str] = None
+    # Only stored documents older than this are compared (a backfill's own row)
+    before_id: Optional[int] = None
+
+def _scope(upload: Upload) -> list:
+    clauses = []
+    if DUPLICATE_SCOPE == "activity" and upload.activity_name is not None:
+        clauses.append(DocumentFingerprint.activity_name == upload.activity_name)
+    elif DUPLICATE_SCOPE == "author" and upload.author_id is not None:
+        clauses.append(DocumentFingerprint.author_id == upload.author_id)
+    if upload.before_id is not None:
+        clauses.append(DocumentFingerprint.document_id < upload.before_id)
+    return clauses
+
+def _same_scope(a: Upload, b: Upload) -> bool:
+    if DUPLICATE_SCOPE == "activity":
+        return a.activity_name == b.activity_name
+    if DUPLICATE_SCOPE == "author":
+        return a.author_id == b.author_id
+    return True
+
+@dataclass
+class Fingerprint:
+    content_hash: str
+    simhash: Optional[int]
+
+    @classmethod
+    def of(cls, content: bytes) -> "Fingerprint":
+        return cls(hashlib.sha256(content).hexdigest(), simhash(content.decode("utf-8", errors="ignore")))
+
+def fingerprint_values(fingerprint: Fingerprint) -> dict:
+    values = {"content_hash": fingerprint.content_hash, "simhash": None}
+    values.update({column.key: None for column in BAND_COLUMNS})
+    if fingerprint.simhash is not None:
+        values["simhash"] = to_signed(fingerprint.simhash)
+        values.update({column.key: band for column, band in zip(BAND_COLUMNS, bands(fingerprint.simhash))})
+    return values
+
+def _near(a: Fingerprint, b: Fingerprint) -> Optional[int]:
+    if a.content_hash == b.content_hash:
+        return 0
+    if a.simhash is None or b.simhash is None:
+        return None
+    distance = hamming(a.simhash, b.simhash)
+    return distance if distance <= DUPLICATE_MAX_DISTANCE else None
+
+async def _stored_match(session: AsyncSession, fingerprint: Fingerprint, upload: Upload = Upload()) -> Optional[DuplicateMatch]:
+    scope = _scope(upload)
+    exact = (await session.execute(
+        select(DocumentFingerprint.document_id, DocumentFingerprint.activity_name)
+        .where(DocumentFingerprint.content_hash == fingerprint.content_hash, *scope)
+        .order_by(DocumentFingerprint.document_id)
+        .limit(1)
+    )).first()
+    if exact is not None:
+        return DuplicateMatch(0, exact=True, document_id=exact.document_id, activity_name=exact.activity_name)
+    if fingerprint.simhash is None:
+        return None
+
+    candidates = await session.execute(
+        select(DocumentFingerprint.document_id, DocumentFingerprint.activity_name, DocumentFingerprint.simhash)
+        .where(or_(*(column == band for column, band in zip(BAND_COLUMNS, bands(fingerprint.simhash)))), *scope)
+        # Newest first: recent uploads are the likeliest to be copied again
+        .order_by(DocumentFingerprint.document_id.desc())
+        .limit(DUPLICATE_CANDIDATES)
+    )
+    best = None
+    for document_id, activity_name, stored in candidates:
+        distance = hamming(fingerprint.simhash, to_unsigned(stored))
+        if distance <= DUPLICATE_MAX_DISTANCE and (best is None or distance < best.distance):
+            best = DuplicateMatch(distance, document_id=document_id, activity_name=activity_name)
+    return best
+
+async def match_documents(
+    session: AsyncSession,
+    fingerprints: Sequence[Fingerprint],
+    uploads: Optional[Sequence[Upload]] = None
+) -> List[Optional[DuplicateMatch]]:
+    """
+    For each fingerprint, the stored document it duplicates, else an
+    earlier fingerprint of the same list it duplicates, else None. Both
+    are limited to DUPLICATE_SCOPE of the matching item of `uploads`.
+    """
+    uploads = uploads or [Upload()] * len(fingerprints)
+    matches = []
+    for index, fingerprint in enumerate(fingerprints):
+        match = await _stored_match(session, fingerprint, uploads[index])
+        if match is None:
+            for earlier in range(index):
+                if not _same_scope(uploads[index], uploads[earlier]):
+                    continue
+                distance = _near(fingerprint, fingerprints[earlier])
+                if distance is not None:
+                    exact = fingerprint.content_hash == fingerprints[earlier].content_hash
+                    match = DuplicateMatch(distance, exact=exact, batch_index=earlier)
+                    break
+        matches.append(match)
+    return matches
+
+async def add_fingerprints(session: AsyncSession, rows: Sequence, fingerprints: Sequence[Fingerprint]) -> int:
+    """
+    Record the fingerprints of freshly inserted documents (flushed, so they
+    have ids), flagging those that copy an earlier document.
+
+    Returns:
+        int: How many of the documents are duplicates
+    """
+    # Matched before these rows' own fingerprints are added, so nothing matches itself
+    uploads = [Upload(row.name, row.author_id, row.id) for row in rows]
+    matches = await match_documents(session, fingerprints, uploads)
+    for row, fingerprint, match in zip(rows, fingerprints, matches):
+        duplicate_of = None
+        if match is not None:
+            duplicate_of = match.document_id if match.batch_index is None else rows[match.batch_index].id
+        session.add(DocumentFingerprint(
+            document_id=row.id,
+            activity_name=row.name,
+            author_id=row.author_id,
+            duplicate_of=duplicate_of,
+            created_at=row.created_at,
+            **fingerprint_values(fingerprint)
+        ))
+    return sum(match is not None for match in matches)
+
+async def find_document_duplicates(
+    contents: Sequence[bytes],
+    activity_name: Optional[str] = None,
+    author_id: Optional[str] = None
+) -> List[Optional[DuplicateMatch]]:
+    """
+    match_documents for raw payloads, outside any write: what the upload
+    checks use to warn or refuse before anything is sent or saved.
+    """
+    fingerprints = [Fingerprint.of(content) for content in contents]
+    uploads = [Upload(activity_name, author_id)] * len(fingerprints)
+    async with session_scope() as session:
+        return await match_documents(session, fingerprints, uploads)
+
+async def find_inspection_duplicate(session: AsyncSession, sha256: str, before_id: Optional[int] = None) -> Optional[int]:
+    """The id of the earliest stored inspection (older than before_id) with the same payload."""
+    query = select(Inspection.id).where(Inspection.content_hash == sha256)
+    if before_id is not None:
+        query = query.where(Inspection.id < before_id)
+    return await session.scalar(query.order_by(Inspection.id).limit(1))
+
+async def is_inspection_duplicate(sha256: str) -> bool:
+    async with session_scope() as session:
+        return await find_inspection_duplicate(session, sha256) is not None
@@ -0,0 +1,19 @@
+from sqlalchemy import Column, String, DateTime, Index
+from app import db
+
+class AppliedJournalEntry(db.Model):
+    """
+    Journal entries (see utils.journal) already written to the database.
+
+    Inserted in the same transaction as the rows an entry produces, so a
+    replay that restarts before the journal's checkpoint skips the entries
+    it had applied instead of writing them twice.
+    """
+    __tablename__ = 'applied_journal_entries'
+    __table_args__ = (
+        # Pruning by age (see prune_applied_journal_entries)
+        Index('ix_applied_journal_entries_applied_at', 'applied_at'),
+    )
+
+    entry_id = Column(String(32), primary_key=True)
+    applied_at = Column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,272 @@
+import logging
+import time
+from typing import Any, Awaitable, Callable, List, NamedTuple, Optional, Set
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, insert, inspect, select, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.sql import func
+from app import db
+from models.document import Document
+from models.activity import Inspection, Sanction
+from models.payroll import AuthorDailyCount, PayrollEntry, PayrollWeek
+from models.search import SearchEntry
+from models.timeline import TimelineEvent, timeline_values
+from models.summary import ActivitySummary, rebuild_activity_summary
+from models.duplicates import DocumentFingerprint
+from models.journal import AppliedJournalEntry
+from models.partitions import partition_tables
+from models.archival import row_from_dict
+from models.backfills import fingerprint_documents, index_search_entries, rebuild_author_daily_counts
+from utils.cold_archive import get_cold_archive
+from utils.database import get_engine
+
+logger = logging.getLogger(__name__)
+
+# Kept outside db.metadata so create_all never manages it
+schema_migrations = Table(
+    'schema_migrations',
+    MetaData(),
+    Column('version', Integer, primary_key=True),
+    Column('description', String(200), nullable=False),
+    Column('applied_at', DateTime(timezone=True), server_default=func.now()),
+)
+
+# Serializes concurrent upgrades (several cluster workers starting at once) on Postgres
+ADVISORY_LOCK_ID = 0x646f6362
+
+BLOB_COLUMNS = {
+    "content_hash": "VARCHAR(64)",
+    "content_size": "INTEGER",
+    "mime_type": "VARCHAR(100)",
+}
+
+TIMELINE_SOURCES = (("document", Document), ("inspection", Inspection), ("sanction", Sanction))
+TIMELINE_BACKFILL_BATCH = 1000
+
+ROLLUP_DUPLICATE_COLUMNS = ("duplicate_documents", "duplicate_inspections")
+
+class Migration(NamedTuple):
+    """
+    A schema change (`apply`, run inside the upgrade transaction) or a data
+    backfill (`backfill`, run by migrate_database after the schema steps
+    before it, in its own committed batches, and recorded once it finishes).
+    """
+    version: int
+    description: str
+    apply: Optional[Callable[[Connection], None]] = None
+    backfill: Optional[Callable[[], Awaitable[Any]]] = None
+
+def _create_tables(connection: Connection):
+    db.metadata.create_all(connection)
+
+def _add_blob_columns(connection: Connection):
+    inspector = inspect(connection)
+    for model in (Document, Inspection):
+        table = model.__tablename__
+        existing = {column["name"] for column in inspector.get_columns(table)}
+        for name, ddl_type in BLOB_COLUMNS.items():
+            if name not in existing:
+                logger.info(f"Adding column {table}.{name}")
+                connection.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {ddl_type}"))
+
+def _relax_content_not_null(connection: Connection):
+    """
+    Payloads moved to the blob store, so content must accept NULL. SQLite
+    cannot alter a column in place and the table is rebuilt instead.
+    """
+    for model in (Document, Inspection):
+        table = model.__tablename__
+        inspector = inspect(connection)
+        columns = inspector.get_columns(table)
+        if next(column["nullable"] for column in columns if column["name"] == "content"):
+            continue
+
+        logger.info(f"Making {table}.content nullable")
+        if connection.dialect.name != "sqlite":
+            connection.execute(text(f"ALTER TABLE {table} ALTER COLUMN content DROP NOT NULL"))
+            continue
+
+        for index in inspector.get_indexes(table):
+            connection.execute(text(f"DROP INDEX {index['name']}"))
+        connection.execute(text(f"ALTER TABLE {table} RENAME TO {table}__old"))
+        model.__table__.create(connection)
+        names = ", ".join(column["name"] for column in columns if column["name"] in model.__table__.c)
+        connection.execute(text(f"INSERT INTO {table} ({names}) SELECT {names} FROM {table}__old"))
+        connection.execute(text(f"DROP TABLE {table}__old"))
+
+def _create_indexes(connection: Connection):
+    # Tables created before these indexes were declared do not have them yet
+    for table in (Document.__table__, Inspection.__table__, Sanction.__table__,
+                  AuthorDailyCount.__table__, SearchEntry.__table__):
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+
+def _create_timeline(connection: Connection):
+    """
+    Create timeline_events and backfill it with every row written so far,
+    archived ones included.
+    """
+    TimelineEvent.__table__.create(connection, checkfirst=True)
+    archive = get_cold_archive()
+    for kind, model in TIMELINE_SOURCES:
+        archived_ids = set()
+        batch = []
+        for data in archive.iter_rows(model.__tablename__):
+            archived_ids.add(data["id"])
+            batch.append(timeline_values(kind, row_from_dict(model, data)))
+            if len(batch) >= TIMELINE_BACKFILL_BATCH:
+                connection.execute(insert(TimelineEvent), batch)
+                batch = []
+        if batch:
+            connection.execute(insert(TimelineEvent), batch)
+
+        columns = [column for column in model.__table__.c if column.key != "content"]
+        result = connection.execute(
+            select(*columns)
+            .order_by(model.created_at, model.id)
+            .execution_options(yield_per=TIMELINE_BACKFILL_BATCH)
+        )
+        total = len(archived_ids)
+        for rows in result.partitions():
+            # A month archived but not yet deleted (interrupted archival) is in both places
+            values = [timeline_values(kind, row) for row in rows if row.id not in archived_ids]
+            if values:
+                connection.execute(insert(TimelineEvent), values)
+            total += len(values)
+        logger.info(f"Added {total} {model.__tablename__} to the timeline")
+
+def _create_activity_summary(connection: Connection):
+    ActivitySummary.__table__.create(connection, checkfirst=True)
+    rebuild_activity_summary(connection)
+
+def _duplicate_detection(connection: Connection):
+    """
+    Fingerprints table, inspection hash index and the payroll rollup's
+    duplicate counters. Documents uploaded before this are fingerprinted
+    by migration 11.
+    """
+    DocumentFingerprint.__table__.create(connection, checkfirst=True)
+    for index in Inspection.__table__.indexes:
+        index.create(connection, checkfirst=True)
+    existing = {column["name"] for column in inspect(connection).get_columns(AuthorDailyCount.__tablename__)}
+    for name in ROLLUP_DUPLICATE_COLUMNS:
+        if name not in existing:
+            logger.info(f"Adding column {AuthorDailyCount.__tablename__}.{name}")
+            connection.execute(text(
+                f"ALTER TABLE {AuthorDailyCount.__tablename__} ADD COLUMN {name} INTEGER NOT NULL DEFAULT 0"
+            ))
+
+def _create_payroll_weeks(connection: Connection):
+    # Empty to begin with: the weekly job closes the last finished week on its next run
+    PayrollWeek.__table__.create(connection, checkfirst=True)
+    PayrollEntry.__table__.create(connection, checkfirst=True)
+
+def _create_journal_markers(connection: Connection):
+    AppliedJournalEntry.__table__.create(connection, checkfirst=True)
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Create tables", _create_tables),
+    Migration(2, "Blob store columns on documents and inspections", _add_blob_columns),
+    Migration(3, "Nullable inline content", _relax_content_not_null),
+    Migration(4, "Paging and payroll indexes", _create_indexes),
+    Migration(5, "Monthly partitions on Postgres", partition_tables),
+    Migration(6, "Activity timeline", _create_timeline),
+    Migration(7, "Activity summary", _create_activity_summary),
+    Migration(8, "Duplicate upload detection", _duplicate_detection),
+    Migration(9, "Closed payroll weeks", _create_payroll_weeks),
+    Migration(10, "Write journal replay markers", _create_journal_markers),
+    # Tables created empty by earlier steps, filled from the rows they describe
+    Migration(11, "Fingerprint existing documents", backfill=fingerprint_documents),
+    Migration(12, "Rebuild payroll rollups", backfill=rebuild_author_daily_counts),
+    Migration(13, "Index existing rows for search", backfill=index_search_entries),
+]
+
+LATEST_VERSION = MIGRATIONS[-1].version
+
+def current_version(connection: Connection) -> int:
+    """
+    Return the highest applied migration, 0 for an empty database.
+    """
+    schema_migrations.create(connection, checkfirst=True)
+    return connection.execute(select(func.max(schema_migrations.c.version))).scalar() or 0
+
+def applied_versions(connection: Connection) -> Set[int]:
+    schema_migrations.create(connection, checkfirst=True)
+    return set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+def pending_migrations(connection: Connection) -> List[Migration]:
+    applied = applied_versions(connection)
+    return [migration for migration in MIGRATIONS if migration.version not in applied]
+
+def _record(connection: Connection, migration: Migration, started: float):
+    connection.execute(
+        schema_migrations.insert().values(version=migration.version, description=migration.description)
+    )
+    logger.info(
+        f"Applied migration {migration.version} ({migration.description}) "
+        f"in {time.perf_counter() - started:.2f}s"
+    )
+
+def upgrade(connection: Connection) -> List[int]:
+    """
+    Apply pending schema migrations in order, inside the caller's
+    transaction, up to the first pending backfill (see migrate_database).
+
+    Returns:
+        list: Versions applied by this call
+    """
+    if connection.dialect.name == "postgresql":
+        connection.execute(text("SELECT pg_advisory_xact_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+
+    applied = []
+    for migration in pending_migrations(connection):
+        if migration.backfill is not None:
+            break
+        started = time.perf_counter()
+        migration.apply(connection)
+        _record(connection, migration, started)
+        applied.append(migration.version)
+    return applied
+
+async def _run_backfill() -> Optional[int]:
+    """
+    Run the first pending migration if it is a backfill, holding the
+    upgrade lock on Postgres so concurrent workers wait rather than
+    repeat it. An interrupted backfill is recorded only once it finishes,
+    so it starts over (skipping what it already did) on the next start.
+    """
+    async with get_engine().connect() as connection:
+        postgres = connection.dialect.name == "postgresql"
+        if postgres:
+            await connection.execute(text("SELECT pg_advisory_lock(:id)"), {"id": ADVISORY_LOCK_ID})
+        try:
+            pending = await connection.run_sync(pending_migrations)
+            await connection.commit()
+            if not pending or pending[0].backfill is None:
+                return None
+
+            migration = pending[0]
+            started = time.perf_counter()
+            logger.info(f"Running migration {migration.version} ({migration.description})")
+            await migration.backfill()
+            await connection.run_sync(_record, migration, started)
+            await connection.commit()
+            return migration.version
+        finally:
+            if postgres:
+                await connection.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": ADVISORY_LOCK_ID})
+                await connection.commit()
+
+async def migrate_database() -> List[int]:
+    """
+    Bring the database up to LATEST_VERSION: schema steps in one
+    transaction each run of upgrade(), backfills in between as they come
+    up. A no-op costing a query or two when the database is current.
+    """
+    applied = []
+    while True:
+        async with get_engine().begin() as connection:
+            applied += await connection.run_sync(upgrade)
+        version = await _run_backfill()
+        if version is None:
+            return applied
+        applied.append(version)
@@ -0,0 +1,147 @@
+import logging
+import os
+import re
+from datetime import date, datetime, timezone
+from typing import List, Optional, Tuple
+from sqlalchemy import Table, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.exc import DBAPIError
+from models.document import Document
+from models.activity import Inspection, Sanction
+from utils.database import get_engine
+
+logger = logging.getLogger(__name__)
+
+# Monthly partitions created ahead of time, so inserts never land in the default partition
+PARTITION_PREMAKE_MONTHS = int(os.environ.get("PARTITION_PREMAKE_MONTHS", 3))
+
+PARTITIONED_MODELS = (Document, Inspection, Sanction)
+
+def month_start(value: datetime) -> date:
+    return date(value.year, value.month, 1)
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_y{month.year:04d}m{month.month:02d}"
+
+def parse_partition_name(table: str, name: str) -> Optional[date]:
+    match = re.fullmatch(rf"{re.escape(table)}_y(\d{{4}})m(\d{{2}})", name)
+    if match is None:
+        return None
+    return date(int(match.group(1)), int(match.group(2)), 1)
+
+def is_partitioned(connection: Connection, table: str) -> bool:
+    if connection.dialect.name != "postgresql":
+        return False
+    return connection.execute(
+        text("SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = :table"),
+        {"table": table}
+    ).first() is not None
+
+def list_partitions(connection: Connection, table: str) -> List[Tuple[str, date]]:
+    """
+    The monthly partitions of `table`, oldest first (the default partition is left out).
+    """
+    names = connection.execute(
+        text(
+            "SELECT c.relname FROM pg_inherits i "
+            "JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent "
+            "WHERE p.relname = :table"
+        ),
+        {"table": table}
+    ).scalars()
+    partitions = [(name, parse_partition_name(table, name)) for name in names]
+    return sorted((name, month) for name, month in partitions if month is not None)
+
+def create_month_partition(connection: Connection, table: str, month: date):
+    name = partition_name(table, month)
+    start = datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+    end_month = add_months(month, 1)
+    end = datetime(end_month.year, end_month.month, 1, tzinfo=timezone.utc)
+    connection.execute(text(
+        f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+    ))
+
+def ensure_partitions(connection: Connection, months_ahead: int = PARTITION_PREMAKE_MONTHS) -> List[str]:
+    """
+    Create the partitions for the current month and the next `months_ahead`
+    on every partitioned table. A no-op on SQLite.
+
+    Returns:
+        list: Names of the partitions created
+    """
+    created = []
+    this_month = month_start(datetime.now(timezone.utc))
+    for model in PARTITIONED_MODELS:
+        table = model.__tablename__
+        if not is_partitioned(connection, table):
+            continue
+        existing = {month for _, month in list_partitions(connection, table)}
+        for offset in range(months_ahead + 1):
+            month = add_months(this_month, offset)
+            if month in existing:
+                continue
+            try:
+                with connection.begin_nested():
+                    create_month_partition(connection, table, month)
+                created.append(partition_name(table, month))
+            except DBAPIError as e:
+                # Rows for that month already sit in the default partition
+                logger.error(f"Could not create partition {partition_name(table, month)}: {e}")
+    if created:
+        logger.info(f"Created partitions {created}")
+    return created
+
+def _partition_table(connection: Connection, table: Table):
+    """
+    Rebuild a plain table as one range-partitioned by month on created_at.
+
+    Postgres requires the partition key in the primary key, so the key
+    becomes (id, created_at); ids still come from the original sequence.
+    """
+    name = table.name
+    logger.info(f"Partitioning {name} by month")
+    connection.execute(text(f"UPDATE {name} SET created_at = now() WHERE created_at IS NULL"))
+    connection.execute(text(f"ALTER TABLE {name} RENAME TO {name}__old"))
+    connection.execute(text(
+        f"CREATE TABLE {name} (LIKE {name}__old INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)"
+    ))
+    connection.execute(text(f"CREATE TABLE {name}_default PARTITION OF {name} DEFAULT"))
+
+    first = connection.execute(text(f"SELECT min(created_at) FROM {name}__old")).scalar()
+    this_month = month_start(datetime.now(timezone.utc))
+    month = month_start(first) if first is not None else this_month
+    while month <= add_months(this_month, PARTITION_PREMAKE_MONTHS):
+        create_month_partition(connection, name, month)
+        month = add_months(month, 1)
+
+    connection.execute(text(f"INSERT INTO {name} SELECT * FROM {name}__old"))
+    sequence = connection.execute(text(f"SELECT pg_get_serial_sequence('{name}__old', 'id')")).scalar()
+    if sequence:
+        # Keep the id sequence alive when the old table goes
+        connection.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {name}.id"))
+    connection.execute(text(f"DROP TABLE {name}__old"))
+    connection.execute(text(f"ALTER TABLE {name} ALTER COLUMN created_at SET NOT NULL"))
+    connection.execute(text(f"ALTER TABLE {name} ADD CONSTRAINT {name}_pkey PRIMARY KEY (id, created_at)"))
+    for index in table.indexes:
+        index.create(connection)
+
+def partition_tables(connection: Connection):
+    """
+    Migration: partition documents, inspections and sanctions by month on
+    Postgres. SQLite keeps plain tables; archival deletes by date range there.
+    """
+    if connection.dialect.name != "postgresql":
+        return
+    for model in PARTITIONED_MODELS:
+        if not is_partitioned(connection, model.__tablename__):
+            _partition_table(connection, model.__table__)
+
+async def maintain_partitions() -> List[str]:
+    async with get_engine().begin() as connection:
+        return await connection.run_sync(ensure_partitions)
@@ -0,0 +1,72 @@
+import os
+from datetime import date, time, timedelta, timezone
+from sqlalchemy import Column, Integer, String, Date, DateTime, Index
+from app import db
+
+# Pay per item counted by /stipendio
+DOCUMENT_PAY = 2000
+INSPECTION_PAY = 3000
+
+# Payroll weeks start on this weekday (0 = Monday ... 6 = Sunday), at 00:00 UTC
+PAYROLL_WEEK_START = int(os.environ.get("PAYROLL_WEEK_START", 0)) % 7
+# Time of day (UTC, HH:MM) the weekly payroll job runs and closes finished weeks
+PAYROLL_CLOSE_TIME = time.fromisoformat(os.environ.get("PAYROLL_CLOSE_TIME", "00:15")).replace(tzinfo=timezone.utc)
+# Channel the weekly report is posted to; 0 keeps the reports in the database only
+PAYROLL_CHANNEL_ID = int(os.environ.get("PAYROLL_CHANNEL_ID", 0))
+
+def payroll_week_start(day: date) -> date:
+    """
+    First day of the payroll week `day` falls in.
+    """
+    return day - timedelta(days=(day.weekday() - PAYROLL_WEEK_START) % 7)
+
+class AuthorDailyCount(db.Model):
+    """
+    Per-author, per-day (UTC) upload counters, bumped on every insert so
+    payroll never has to scan the documents and inspections tables.
+    """
+    __tablename__ = 'author_daily_counts'
+    __table_args__ = (
+        Index('ix_author_daily_counts_day', 'day'),
+    )
+
+    author_id = Column(String(100), primary_key=True)
+    day = Column(Date, primary_key=True)
+    author_name = Column(String(100), nullable=False)
+    documents = Column(Integer, nullable=False, default=0)
+    inspections = Column(Integer, nullable=False, default=0)
+    # Of the above, how many were copies of earlier uploads (see models.duplicates)
+    duplicate_documents = Column(Integer, nullable=False, default=0)
+    duplicate_inspections = Column(Integer, nullable=False, default=0)
+
+class PayrollWeek(db.Model):
+    """
+    A closed payroll week. Written once by the weekly job, together with
+    its PayrollEntry rows; the pay rates in force when it closed are kept
+    so later rate changes do not rewrite past payrolls. Only uploads dated
+    in the week but applied after it closed (journal replays) are added
+    to its entries, clearing posted_at so the corrected report is posted.
+    """
+    __tablename__ = 'payroll_weeks'
+
+    week_start = Column(Date, primary_key=True)
+    week_end = Column(Date, nullable=False)
+    document_pay = Column(Integer, nullable=False)
+    inspection_pay = Column(Integer, nullable=False)
+    closed_at = Column(DateTime(timezone=True), nullable=False)
+    # Set once the report has been posted to PAYROLL_CHANNEL_ID
+    posted_at = Column(DateTime(timezone=True))
+
+class PayrollEntry(db.Model):
+    """
+    One author's totals for a closed payroll week (see PayrollWeek).
+    """
+    __tablename__ = 'payroll_entries'
+
+    week_start = Column(Date, primary_key=True)
+    author_id = Column(String(100), primary_key=True)
+    author_name = Column(String(100), nullable=False)
+    documents = Column(Integer, nullable=False)
+    inspections = Column(Integer, nullable=False)
+    duplicate_documents = Column(Integer, nullable=False)
+    duplicate_inspections = Column(Integer, nullable=False)
@@ -0,0 +1,1142 @@
+import asyncio
+import base64
+import logging
+import re
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Awaitable, Callable, List, NamedTuple, Optional, Sequence, Tuple, Union
+from sqlalchemy import Date, DateTime, Integer, Select, String, delete, event, literal, select, func, text, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.ext.asyncio import AsyncSession
+from utils.activity_index import activity_names
+from utils.blob_store import BlobRef, get_blob_store
+from utils.cache import read_cache
+from utils.database import session_scope
+from utils.journal import JournalEntry, get_journal
+from utils.paginator import Page
+from utils.write_batcher import WriteOp, run_write
+from models.document import Document
+from models.activity import Inspection, Sanction
+from models.payroll import DOCUMENT_PAY, INSPECTION_PAY, AuthorDailyCount, PayrollEntry, PayrollWeek, payroll_week_start
+from models.search import SEARCH_LANGUAGE, SearchEntry
+from models.timeline import TimelineEvent, timeline_values
+from models.summary import SUMMARY_COUNTERS, ActivitySummary, event_weight
+from models.duplicates import Fingerprint, add_fingerprints, find_inspection_duplicate
+from models.journal import AppliedJournalEntry
+from models.archival import archived_activity_names, archived_page, has_archived, record_key, stream_archived
+
+logger = logging.getLogger(__name__)
+
+TEXT_MIME_TYPE = "text/plain; charset=utf-8"
+PAGE_SIZE = 5
+# Rough per-row overhead of a cached ORM object, on top of its text fields
+CACHED_ROW_BYTES = 512
+# Only the beginning of large text inspections is indexed for search
+SEARCH_BODY_LIMIT = 100_000
+# Rows fetched per round trip when streaming a whole activity
+STREAM_BATCH_SIZE = 200
+
+async def load_content(row: Union[Document, Inspection]) -> bytes:
+    """
+    Return the payload of a document or inspection.
+
+    Rows written before the blob store existed still carry the bytes inline,
+    everything else is read from the store by hash.
+    """
+    if row.content_hash:
+        # Blobs are immutable, so they are cached by hash and never invalidated
+        key = ("blob", row.content_hash)
+        content = read_cache.get(key)
+        if content is None:
+            content = await get_blob_store().read_async(row.content_hash)
+            read_cache.put(key, content, len(content))
+        return content
+
+    # content is deferred, so fetch the inline bytes explicitly
+    model = type(row)
+    async with session_scope() as session:
+        return await session.scalar(select(model.content).where(model.id == row.id))
+
+def dialect_insert(session: AsyncSession):
+    """
+    Return the dialect-specific insert() so callers can use ON CONFLICT upserts.
+    """
+    if session.get_bind().dialect.name == "postgresql":
+        return postgresql.insert
+    return sqlite.insert
+
+# Advisory lock class serializing a payroll week's close with late writes into it
+PAYROLL_LOCK_CLASS = 0x70617972
+
+async def _lock_payroll_week(session: AsyncSession, week_start: date):
+    # SQLite already runs one write transaction at a time
+    if session.get_bind().dialect.name == "postgresql":
+        await session.execute(
+            text("SELECT pg_advisory_xact_lock(CAST(:lock_class AS integer), CAST(:week AS integer))"),
+            {"lock_class": PAYROLL_LOCK_CLASS, "week": week_start.toordinal()}
+        )
+
+async def _amend_closed_week(session: AsyncSession, author_id: str, author_name: str, day: date, counts: dict):
+    """
+    Add a write dated in an already closed payroll week to that week's
+    frozen totals, and queue its report to be posted again.
+
+    Journal entries are replayed whenever their process gets to them, in
+    any process of a cluster, so the weekly job cannot wait for all of
+    them; whichever process applies a late one reconciles it here.
+    """
+    week_start = payroll_week_start(day)
+    await _lock_payroll_week(session, week_start)
+    closed = await session.scalar(select(PayrollWeek.week_start).where(PayrollWeek.week_start == week_start))
+    if closed is None:
+        return
+
+    insert = dialect_insert(session)
+    stmt = insert(PayrollEntry).values(week_start=week_start, author_id=author_id, author_name=author_name, **counts)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[PayrollEntry.week_start, PayrollEntry.author_id],
+        set_={name: getattr(PayrollEntry, name) + getattr(stmt.excluded, name) for name in counts}
+    )
+    await session.execute(stmt)
+    await session.execute(update(PayrollWeek).where(PayrollWeek.week_start == week_start).values(posted_at=None))
+    # Cached totals of the week are stale once this commits
+    event.listen(
+        session.sync_session, "after_commit",
+        lambda _: read_cache.invalidate_tag(("payroll_week", week_start)), once=True
+    )
+    logger.warning(f"Added a late write by {author_id} on {day} to the closed payroll week {week_start}")
+
+async def bump_author_day(
+    session: AsyncSession,
+    author_id: str,
+    author_name: str,
+    day: date,
+    documents: int = 0,
+    inspections: int = 0,
+    duplicate_documents: int = 0,
+    duplicate_inspections: int = 0
+):
+    """
+    Add to an author's daily counters inside the caller's transaction.
+    A day in an earlier payroll week (a late journal replay) also amends
+    that week if it has been closed already.
+    """
+    insert = dialect_insert(session)
+    stmt = insert(AuthorDailyCount).values(
+        author_id=author_id,
+        day=day,
+        author_name=author_name,
+        documents=documents,
+        inspections=inspections,
+        duplicate_documents=duplicate_documents,
+        duplicate_inspections=duplicate_inspections
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AuthorDailyCount.author_id, AuthorDailyCount.day],
+        set_={
+            "author_name": stmt.excluded.author_name,
+            "documents": AuthorDailyCount.documents + stmt.excluded.documents,
+            "inspections": AuthorDailyCount.inspections + stmt.excluded.inspections,
+            "duplicate_documents": AuthorDailyCount.duplicate_documents + stmt.excluded.duplicate_documents,
+            "duplicate_inspections": AuthorDailyCount.duplicate_inspections + stmt.excluded.duplicate_inspections,
+        }
+    )
+    await session.execute(stmt)
+
+    if payroll_week_start(day) < payroll_week_start(datetime.now(timezone.utc).date()):
+        counts = {
+            "documents": documents,
+            "inspections": inspections,
+            "duplicate_documents": duplicate_documents,
+            "duplicate_inspections": duplicate_inspections,
+        }
+        await _amend_closed_week(session, author_id, author_name, day, counts)
+
+async def bump_activity(session: AsyncSession, activity_name: str, kind: str, at: datetime, count: int = 1):
+    """
+    Add `count` events of `kind` at `at` to an activity's summary inside
+    the caller's transaction.
+    """
+    insert = dialect_insert(session)
+    counter = SUMMARY_COUNTERS[kind]
+    last = f"last_{kind}_at"
+    values = {
+        "activity_name": activity_name,
+        "documents": 0,
+        "inspections": 0,
+        "sanctions": 0,
+        "last_event_at": at,
+        "heat": event_weight(at) * count,
+    }
+    values.update({counter: count, last: at})
+    stmt = insert(ActivitySummary).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ActivitySummary.activity_name],
+        set_={
+            counter: getattr(ActivitySummary, counter) + count,
+            last: at,
+            "last_event_at": at,
+            "heat": ActivitySummary.heat + stmt.excluded.heat,
+        }
+    )
+    await session.execute(stmt)
+
+def document_search_text(context: str, content: bytes) -> str:
+    return f"{context}\n{content.decode('utf-8', errors='ignore')}"
+
+def sanction_search_text(reason: str, sanction_text: str) -> str:
+    return f"{reason}\n{sanction_text}"
+
+async def inspection_search_text(ref: BlobRef, mime_type: Optional[str]) -> str:
+    """
+    Searchable text of an inspection: the start of the file for text
+    attachments, nothing for binary ones.
+    """
+    if not mime_type or not mime_type.startswith("text/"):
+        return ""
+
+    def read_prefix() -> bytes:
+        with get_blob_store().open(ref.sha256) as view:
+            return bytes(view[:SEARCH_BODY_LIMIT])
+
+    prefix = await asyncio.to_thread(read_prefix)
+    return prefix.decode("utf-8", errors="ignore")
+
+async def keyset_page(
+    session: AsyncSession,
+    query: Select,
+    columns: Sequence,
+    after: Optional[Tuple] = None,
+    before: Optional[Tuple] = None,
+    limit: int = PAGE_SIZE,
+    descending: bool = False
+) -> Page:
+    """
+    Fetch one page of `query` ordered by `columns`, relative to a cursor.
+
+    Args:
+        session (AsyncSession): Session to run the query in
+        query (Select): Filtered select of ORM entities, without ordering
+        columns (Sequence): Ordered key columns, the last one must be unique
+        after (Tuple): Key of the last row of the previous page, for "next"
+        before (Tuple): Key of the first row of the next page, for "previous"
+        limit (int): Page size
+        descending (bool): Walk the keys from the largest down
+
+    Returns:
+        Page: At most `limit` rows in key order
+    """
+    key = tuple_(*columns)
+    forward = [column.desc() if descending else column for column in columns]
+    backward = [column if descending else column.desc() for column in columns]
+    if before is not None:
+        bound = key > tuple_(*before) if descending else key < tuple_(*before)
+        query = query.where(bound).order_by(*backward)
+    else:
+        if after is not None:
+            query = query.where(key < tuple_(*after) if descending else key > tuple_(*after))
+        query = query.order_by(*forward)
+
+    # One extra row tells us whether there is another page in this direction
+    rows = list(await session.scalars(query.limit(limit + 1)))
+    more = len(rows) > limit
+    rows = rows[:limit]
+
+    if before is not None:
+        rows.reverse()
+        has_prev, has_next = more, True
+    else:
+        has_prev, has_next = after is not None, more
+
+    def row_key(row: Any) -> Tuple:
+        return tuple(getattr(row, column.key) for column in columns)
+
+    return Page(
+        items=rows,
+        has_prev=has_prev,
+        has_next=has_next,
+        first_key=row_key(rows[0]) if rows else None,
+        last_key=row_key(rows[-1]) if rows else None
+    )
+
+async def merge_archived_page(
+    fetch_archived: Callable[[Optional[Tuple], Optional[Tuple], int], Awaitable[List[Any]]],
+    fetch_live: Callable[[Optional[Tuple], Optional[Tuple], int], Awaitable[Page]],
+    after: Optional[Tuple] = None,
+    before: Optional[Tuple] = None,
+    limit: int = PAGE_SIZE
+) -> Page:
+    """
+    keyset_page over archived and live rows together.
+
+    Archival moves whole months, oldest first, but a row that arrives in a
+    month while it is being archived stays live (see archival._drop_month),
+    so the two sources can overlap in time. Each is read up to a page next
+    to the cursor and the candidates are merged by (created_at, id).
+
+    Args:
+        fetch_archived (Callable): Archived rows next to the cursor in
+            ascending (created_at, id) order, called as
+            fetch_archived(after, before, limit) (see archival.archived_page)
+        fetch_live (Callable): keyset_page over the live rows, called as
+            fetch_live(after, before, limit)
+    """
+    if before is None:
+        archived = await fetch_archived(after, None, limit + 1)
+        live = await fetch_live(after, None, limit)
+        merged = sorted(archived + live.items, key=record_key)
+        items = merged[:limit]
+        # Rows left over, or live rows past the ones fetched, are the next page
+        has_next = len(merged) > limit or live.has_next
+        has_prev = after is not None
+    else:
+        archived = await fetch_archived(None, before, limit + 1)
+        live = await fetch_live(None, before, limit)
+        merged = sorted(archived + live.items, key=record_key)
+        items = merged[max(0, len(merged) - limit):]
+        has_prev = len(merged) > limit or live.has_prev
+        has_next = True
+
+    return Page(
+        items=items,
+        has_prev=has_prev,
+        has_next=has_next,
+        first_key=(items[0].created_at, items[0].id) if items else None,
+        last_key=(items[-1].created_at, items[-1].id) if items else None
+    )
+
+class InvalidSubmission(ValueError):
+    """
+    A submission the database would refuse, caught before it is saved or
+    journaled. The message is meant for the user.
+    """
+
+# What each validated column is called in InvalidSubmission messages
+FIELD_LABELS = {
+    "name": "il nome dell'attività",
+    "activity_name": "il nome dell'attività",
+    "context": "il contesto",
+    "reason": "il motivo",
+    "sanction_text": "la sanzione",
+    "author_id": "l'ID dell'autore",
+    "author_name": "il nome dell'autore",
+    "mime_type": "il tipo del file",
+}
+
+def check_columns(model, **values):
+    """
+    Raise InvalidSubmission unless every value fits its column of `model`:
+    present and not blank if the column is NOT NULL, and no longer than a
+    String column allows.
+    """
+    for key, value in values.items():
+        column = model.__table__.c[key]
+        label = FIELD_LABELS.get(key, key)
+        if value is None:
+            if column.nullable:
+                continue
+            raise InvalidSubmission(f"Manca {label}.")
+        if not column.nullable and not str(value).strip():
+            raise InvalidSubmission(f"Manca {label}.")
+        length = getattr(column.type, "length", None)
+        if length is not None and len(value) > length:
+            raise InvalidSubmission(f"{label[0].upper()}{label[1:]} supera i {length} caratteri.")
+
+def check_documents(documents: List[dict], name: str, author_id: str, author_name: str):
+    if not documents:
+        raise InvalidSubmission("Nessun documento da salvare.")
+    check_columns(Document, name=name, author_id=author_id, author_name=author_name)
+    for doc in documents:
+        if not isinstance(doc.get('content'), bytes):
+            raise InvalidSubmission("Manca il contenuto del documento.")
+        check_columns(Document, context=doc.get('context'))
+
+def _after_write(activity_name: str):
+    read_cache.invalidate_tag(activity_name)
+    activity_names.add(activity_name)
+
+async def prepare_documents(
+    documents: List[dict],
+    name: str,
+    author_id: str,
+    author_name: str,
+    created_at: Optional[datetime] = None
+) -> WriteOp:
+    """
+    Store the payloads of a batch of documents and return the write that
+    inserts them, for add_documents or the journal replay to run.
+
+    Args:
+        created_at (datetime): When the documents were submitted, now by default
+    """
+    store = get_blob_store()
+    refs = [await store.put_async(doc['content']) for doc in documents]
+    fingerprints = [Fingerprint.of(doc['content']) for doc in documents]
+    now = created_at or datetime.now(timezone.utc)
+    staged: List[Document] = []
+
+    def stage(session: AsyncSession):
+        staged[:] = [
+            Document(
+                name=name,
+                content_hash=ref.sha256,
+                content_size=ref.size,
+                mime_type=TEXT_MIME_TYPE,
+                context=doc['context'],
+                author_id=author_id,
+                author_name=author_name,
+                created_at=now
+            )
+            for doc, ref in zip(documents, refs)
+        ]
+        session.add_all(staged)
+
+    async def finish(session: AsyncSession) -> List[Document]:
+        rows = list(staged)
+        session.add_all(
+            SearchEntry(
+                kind="document",
+                source_id=row.id,
+                activity_name=name,
+                body=document_search_text(doc['context'], doc['content']),
+                created_at=now
+            )
+            for doc, row in zip(documents, rows)
+        )
+        session.add_all(TimelineEvent(**timeline_values("document", row)) for row in rows)
+        duplicates = await add_fingerprints(session, rows, fingerprints)
+        await bump_author_day(
+            session, author_id, author_name, now.date(),
+            documents=len(rows), duplicate_documents=duplicates
+        )
+        await bump_activity(session, name, "document", now, count=len(rows))
+        return rows
+
+    return WriteOp(stage, finish, rows=len(documents))
+
+async def add_documents(documents: List[dict], name: str, author_id: str, author_name: str) -> List[Document]:
+    """
+    Insert a batch of documents in a single transaction.
+
+    Args:
+        documents (List[dict]): Items with 'content' (bytes) and 'context' (str)
+        name (str): The activity name the documents belong to
+        author_id (str): Discord ID of the uploader
+        author_name (str): Display name of the uploader
+
+    Returns:
+        List[Document]: The inserted rows
+    """
+    rows = await run_write(await prepare_documents(documents, name, author_id, author_name))
+    _after_write(name)
+    return rows
+
+async def prepare_inspection(
+    activity_name: str,
+    content: Union[bytes, BlobRef],
+    author_id: str,
+    author_name: str,
+    mime_type: Optional[str] = None,
+    created_at: Optional[datetime] = None
+) -> WriteOp:
+    """
+    The write that inserts an inspection (see add_inspection).
+
+    Args:
+        created_at (datetime): When the inspection was submitted, now by default
+    """
+    ref = content if isinstance(content, BlobRef) else await get_blob_store().put_async(content)
+    body = await inspection_search_text(ref, mime_type)
+    now = created_at or datetime.now(timezone.utc)
+    staged: List[Inspection] = []
+
+    def stage(session: AsyncSession):
+        staged[:] = [Inspection(
+            activity_name=activity_name,
+            content_hash=ref.sha256,
+            content_size=ref.size,
+            mime_type=mime_type or "application/octet-stream",
+            author_id=author_id,
+            author_name=author_name,
+            created_at=now
+        )]
+        session.add_all(staged)
+
+    async def finish(session: AsyncSession) -> Inspection:
+        inspection = staged[0]
+        if body:
+            session.add(SearchEntry(
+                kind="inspection",
+                source_id=inspection.id,
+                activity_name=activity_name,
+                body=body,
+                created_at=now
+            ))
+        session.add(TimelineEvent(**timeline_values("inspection", inspection)))
+        duplicate = await find_inspection_duplicate(session, ref.sha256, before_id=inspection.id) is not None
+        await bump_author_day(
+            session, author_id, author_name, now.date(),
+            inspections=1, duplicate_inspections=int(duplicate)
+        )
+        await bump_activity(session, activity_name, "inspection", now)
+        return inspection
+
+    return WriteOp(stage, finish)
+
+async def add_inspection(
+    activity_name: str,
+    content: Union[bytes, BlobRef],
+    author_id: str,
+    author_name: str,
+    mime_type: Optional[str] = None
+) -> Inspection:
+    """
+    Insert an inspection.
+
+    Args:
+        content (bytes | BlobRef): Raw payload, or a reference to a blob already
+            written to the store
+        mime_type (str): MIME type reported for the attachment, if any
+    """
+    inspection = await run_write(await prepare_inspection(activity_name, content, author_id, author_name, mime_type))
+    _after_write(activity_name)
+    return inspection
+
+def prepare_sanction(
+    activity_name: str,
+    reason: str,
+    sanction_text: str,
+    author_id: str,
+    author_name: str,
+    created_at: Optional[datetime] = None
+) -> WriteOp:
+    now = created_at or datetime.now(timezone.utc)
+    staged: List[Sanction] = []
+
+    def stage(session: AsyncSession):
+        staged[:] = [Sanction(
+            activity_name=activity_name,
+            reason=reason,
+            sanction_text=sanction_text,
+            author_id=author_id,
+            author_name=author_name,
+            created_at=now
+        )]
+        session.add_all(staged)
+
+    async def finish(session: AsyncSession) -> Sanction:
+        sanction = staged[0]
+        session.add(SearchEntry(
+            kind="sanction",
+            source_id=sanction.id,
+            activity_name=activity_name,
+            body=sanction_search_text(reason, sanction_text),
+            created_at=now
+        ))
+        session.add(TimelineEvent(**timeline_values("sanction", sanction)))
+        await bump_activity(session, activity_name, "sanction", now)
+        return sanction
+
+    return WriteOp(stage, finish)
+
+async def add_sanction(activity_name: str, reason: str, sanction_text: str, author_id: str, author_name: str) -> Sanction:
+    sanction = await run_write(prepare_sanction(activity_name, reason, sanction_text, author_id, author_name))
+    _after_write(activity_name)
+    return sanction
+
+async def submit_documents(documents: List[dict], name: str, author_id: str, author_name: str):
+    """
+    Save a batch of documents for good. With the write journal running they
+    are journaled and this returns as soon as they are on local disk, the
+    database write following in the background; otherwise add_documents.
+
+    Raises InvalidSubmission, before anything is saved, for values the
+    database would refuse: a journaled entry has already been acknowledged.
+    """
+    check_documents(documents, name, author_id, author_name)
+    journal = get_journal()
+    if journal is None:
+        await add_documents(documents, name, author_id, author_name)
+        return
+    await journal.append("documents", {
+        "name": name,
+        "author_id": author_id,
+        "author_name": author_name,
+        "documents": [
+            {"content": base64.b64encode(doc['content']).decode("ascii"), "context": doc['context']}
+            for doc in documents
+        ],
+    })
+
+async def submit_inspection(
+    activity_name: str,
+    content: BlobRef,
+    author_id: str,
+    author_name: str,
+    mime_type: Optional[str] = None
+):
+    """
+    Like submit_documents, for an inspection whose payload is already in the blob store.
+    """
+    check_columns(
+        Inspection, activity_name=activity_name, author_id=author_id, author_name=author_name, mime_type=mime_type
+    )
+    journal = get_journal()
+    if journal is None:
+        await add_inspection(activity_name, content, author_id, author_name, mime_type)
+        return
+    await journal.append("inspection", {
+        "activity_name": activity_name,
+        "sha256": content.sha256,
+        "size": content.size,
+        "author_id": author_id,
+        "author_name": author_name,
+        "mime_type": mime_type,
+    })
+
+async def submit_sanction(activity_name: str, reason: str, sanction_text: str, author_id: str, author_name: str):
+    """
+    Like submit_documents, for a sanction.
+    """
+    check_columns(
+        Sanction, activity_name=activity_name, reason=reason, sanction_text=sanction_text,
+        author_id=author_id, author_name=author_name
+    )
+    journal = get_journal()
+    if journal is None:
+        await add_sanction(activity_name, reason, sanction_text, author_id, author_name)
+        return
+    await journal.append("sanction", {
+        "activity_name": activity_name,
+        "reason": reason,
+        "sanction_text": sanction_text,
+        "author_id": author_id,
+        "author_name": author_name,
+    })
+
+async def _journal_write(entry: JournalEntry) -> Tuple[WriteOp, str]:
+    """
+    The write for a journal entry, recording it as applied in the same
+    transaction, and the activity it touches.
+    """
+    data = entry.data
+    if entry.kind == "documents":
+        activity_name = data["name"]
+        documents = [
+            {"content": base64.b64decode(doc["content"]), "context": doc["context"]}
+            for doc in data["documents"]
+        ]
+        op = await prepare_documents(
+            documents, activity_name, data["author_id"], data["author_name"], entry.created_at
+        )
+    elif entry.kind == "inspection":
+        activity_name = data["activity_name"]
+        op = await prepare_inspection(
+            activity_name, BlobRef(data["sha256"], data["size"]), data["author_id"], data["author_name"],
+            data["mime_type"], entry.created_at
+        )
+    elif entry.kind == "sanction":
+        activity_name = data["activity_name"]
+        op = prepare_sanction(
+            activity_name, data["reason"], data["sanction_text"], data["author_id"], data["author_name"],
+            entry.created_at
+        )
+    else:
+        raise ValueError(f"Unknown journal entry kind: {entry.kind}")
+
+    async def finish(session: AsyncSession):
+        result = await op.finish(session)
+        session.add(AppliedJournalEntry(entry_id=entry.entry_id, applied_at=datetime.now(timezone.utc)))
+        return result
+
+    return WriteOp(op.stage, finish, op.rows), activity_name
+
+async def apply_journal_entries(entries: List[JournalEntry]) -> int:
+    """
+    Journal replay callback: write `entries` in order in one transaction,
+    skipping those an earlier replay already applied.
+
+    Returns:
+        int: How many entries were written
+    """
+    async with session_scope() as session:
+        applied = set(await session.scalars(
+            select(AppliedJournalEntry.entry_id)
+            .where(AppliedJournalEntry.entry_id.in_([entry.entry_id for entry in entries]))
+        ))
+    writes = [await _journal_write(entry) for entry in entries if entry.entry_id not in applied]
+    if not writes:
+        return 0
+
+    async with session_scope() as session:
+        for op, _ in writes:
+            op.stage(session)
+        await session.flush()
+        for op, _ in writes:
+            await op.finish(session)
+    for _, activity_name in writes:
+        _after_write(activity_name)
+    return len(writes)
+
+async def prune_applied_journal_entries(older_than: timedelta) -> int:
+    """
+    Forget replay markers of entries long since checkpointed.
+
+    Returns:
+        int: Number of markers deleted
+    """
+    async with session_scope() as session:
+        result = await session.execute(
+            delete(AppliedJournalEntry)
+            .where(AppliedJournalEntry.applied_at < datetime.now(timezone.utc) - older_than)
+        )
+        return result.rowcount
+
+async def get_activity_names() -> List[str]:
+    """
+    Every distinct activity name used by documents, inspections or sanctions.
+    """
+    async with session_scope() as session:
+        result = await session.scalars(
+            select(Document.name).union(
+                select(Inspection.activity_name),
+                select(Sanction.activity_name)
+            )
+        )
+        names = set(result)
+    return sorted(names | archived_activity_names())
+
+async def get_documents_page(
+    name: str,
+    after: Optional[Tuple] = None,
+    before: Optional[Tuple] = None,
+    limit: int = PAGE_SIZE
+) -> Page:
+    """
+    One page of an activity's documents, oldest first, keyed on (created_at, id).
+
+    Payloads are not loaded; call load_content for the rows actually shown.
+    Pages are cached per activity until the next insert for that activity.
+    """
+    key = ("documents", name, after, before, limit)
+    page = read_cache.get(key)
+    if page is not None:
+        return page
+
+    generation = read_cache.generation(name)
+
+    async def fetch_archived(after: Optional[Tuple], before: Optional[Tuple], limit: int) -> List[Document]:
+        return await archived_page(Document, name, after=after, before=before, limit=limit)
+
+    async def fetch_live(after: Optional[Tuple], before: Optional[Tuple], limit: int) -> Page:
+        async with session_scope() as session:
+            return await keyset_page(
+                session,
+                select(Document).where(Document.name == name),
+                (Document.created_at, Document.id),
+                after=after,
+                before=before,
+                limit=limit
+            )
+
+    if has_archived(Document, name):
+        page = await merge_archived_page(fetch_archived, fetch_live, after, before, limit)
+    else:
+        page = await fetch_live(after, before, limit)
+
+    size = sum(CACHED_ROW_BYTES + len(doc.context) + len(doc.author_name) for doc in page.items)
+    read_cache.put(key, page, size, tag=name, generation=generation)
+    return page
+
+async def get_timeline_page(
+    name: str,
+    kind: Optional[str] = None,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    after: Optional[Tuple] = None,
+    before: Optional[Tuple] = None,
+    limit: int = PAGE_SIZE
+) -> Page:
+    """
+    One page of an activity's timeline, oldest first, keyed on (created_at, id).
+
+    Args:
+        kind (str): Only events of this kind ("document", "inspection", "sanction")
+        since (datetime): Only events at or after this time
+        until (datetime): Only events before this time
+
+    Every page is a single range scan of one timeline index, archived
+    history included. Pages are cached per activity until the next insert.
+    """
+    key = ("timeline", name, kind, since, until, after, before, limit)
+    page = read_cache.get(key)
+    if page is not None:
+        return page
+
+    generation = read_cache.generation(name)
+    query = select(TimelineEvent).where(TimelineEvent.activity_name == name)
+    if kind is not None:
+        query = query.where(TimelineEvent.kind == kind)
+    if since is not None:
+        query = query.where(TimelineEvent.created_at >= since)
+    if until is not None:
+        query = query.where(TimelineEvent.created_at < until)
+
+    async with session_scope() as session:
+        page = await keyset_page(
+            session,
+            query,
+            (TimelineEvent.created_at, TimelineEvent.id),
+            after=after,
+            before=before,
+            limit=limit
+        )
+
+    size = sum(CACHED_ROW_BYTES + len(event.summary or "") + len(event.author_name) for event in page.items)
+    read_cache.put(key, page, size, tag=name, generation=generation)
+    return page
+
+# Dashboard sort orders: key columns, walked from the largest down
+SUMMARY_SORTS = {
+    "recent": (ActivitySummary.heat, ActivitySummary.activity_name),
+    "sanctions": (ActivitySummary.sanctions, ActivitySummary.activity_name),
+    "documents": (ActivitySummary.documents, ActivitySummary.activity_name),
+    "last_event": (ActivitySummary.last_event_at, ActivitySummary.activity_name),
+}
+
+async def get_activity_summary_page(
+    sort: str = "recent",
+    after: Optional[Tuple] = None,
+    before: Optional[Tuple] = None,
+    limit: int = PAGE_SIZE
+) -> Page:
+    """
+    One page of activity summaries, in descending `sort` order (see
+    SUMMARY_SORTS). A single range scan of that order's index, however
+    many activities or events there are.
+    """
+    async with session_scope() as session:
+        return await keyset_page(
+            session,
+            select(ActivitySummary),
+            SUMMARY_SORTS[sort],
+            after=after,
+            before=before,
+            limit=limit,
+            descending=True
+        )
+
+async def stream_activity(
+    name: str,
+    batch_size: int = STREAM_BATCH_SIZE
+) -> AsyncIterator[Union[Document, Inspection, Sanction]]:
+    """
+    Every document, inspection and sanction of an activity, in that order
+    and oldest first within each kind, archived rows included.
+
+    Rows come from a server-side cursor `batch_size` at a time, so memory
+    does not grow with the size of the activity. Payloads are not loaded;
+    the session stays open until the iteration finishes or is closed.
+    """
+    sources = (
+        (Document, Document.name),
+        (Inspection, Inspection.activity_name),
+        (Sanction, Sanction.activity_name),
+    )
+    async with session_scope() as session:
+        for model, column in sources:
+            # Archived months are older than anything still in the database
+            async for row in stream_archived(model, name, batch_size):
+                yield row
+            result = await session.stream_scalars(
+                select(model)
+                .where(column == name)
+                .order_by(model.created_at, model.id)
+                .execution_options(yield_per=batch_size)
+            )
+            async for row in result:
+                yield row
+
+class AuthorTotals(NamedTuple):
+    author_id: str
+    author_name: str
+    documents: int
+    inspections: int
+
+def _payroll_counts(exclude_duplicates: bool, model=AuthorDailyCount) -> Tuple:
+    # AuthorDailyCount and PayrollEntry share the counter columns
+    documents = model.documents
+    inspections = model.inspections
+    if exclude_duplicates:
+        documents = documents - model.duplicate_documents
+        inspections = inspections - model.duplicate_inspections
+    return documents, inspections
+
+async def get_author_totals(
+    author_id: str,
+    start_day: date,
+    end_day: date,
+    exclude_duplicates: bool = False
+) -> Tuple[int, int]:
+    """
+    Sum an author's document and inspection counters over [start_day, end_day].
+
+    Args:
+        exclude_duplicates (bool): Leave out uploads flagged as copies of earlier ones
+
+    Returns:
+        Tuple[int, int]: (documents, inspections)
+    """
+    documents, inspections = _payroll_counts(exclude_duplicates)
+    async with session_scope() as session:
+        row = (await session.execute(
+            select(
+                func.coalesce(func.sum(documents), 0),
+                func.coalesce(func.sum(inspections), 0)
+            ).where(
+                AuthorDailyCount.author_id == author_id,
+                AuthorDailyCount.day >= start_day,
+                AuthorDailyCount.day <= end_day
+            )
+        )).one()
+        return int(row[0]), int(row[1])
+
+async def get_payroll_totals(
+    start_day: date,
+    end_day: date,
+    sort: str = "total",
+    exclude_duplicates: bool = False
+) -> List[AuthorTotals]:
+    """
+    Every author's totals over [start_day, end_day] in a single grouped query.
+
+    Args:
+        sort (str): One of "total", "documents", "inspections" (descending) or "name"
+        exclude_duplicates (bool): Leave out uploads flagged as copies of earlier ones
+    """
+    documents, inspections = (func.sum(count) for count in _payroll_counts(exclude_duplicates))
+    name = func.max(AuthorDailyCount.author_name)
+    ordering = _payroll_ordering(sort, documents, inspections, name, DOCUMENT_PAY, INSPECTION_PAY)
+
+    async with session_scope() as session:
+        result = await session.execute(
+            select(AuthorDailyCount.author_id, name, documents, inspections)
+            .where(AuthorDailyCount.day >= start_day, AuthorDailyCount.day <= end_day)
+            .group_by(AuthorDailyCount.author_id)
+            .order_by(ordering, AuthorDailyCount.author_id)
+        )
+        return [AuthorTotals(*row) for row in result]
+
+def _payroll_ordering(sort: str, documents, inspections, name, document_pay: int, inspection_pay: int):
+    orderings = {
+        "total": (documents * document_pay + inspections * inspection_pay).desc(),
+        "documents": documents.desc(),
+        "inspections": inspections.desc(),
+        "name": name,
+    }
+    return orderings[sort]
+
+async def close_payroll_week(week_start: date) -> bool:
+    """
+    Freeze every author's totals for the payroll week starting on
+    week_start, in one grouped pass over the daily rollup, together with
+    the pay rates in force. Writes dated in the week that are applied
+    later (journal replays) are added to it by bump_author_day.
+
+    Returns:
+        bool: False if the week had already been closed
+    """
+    async with session_scope() as session:
+        # Taken first, so a late write either is in the snapshot or sees the closed week
+        await _lock_payroll_week(session, week_start)
+        if await session.get(PayrollWeek, week_start) is not None:
+            return False
+        week_end = week_start + timedelta(days=6)
+        session.add(PayrollWeek(
+            week_start=week_start,
+            week_end=week_end,
+            document_pay=DOCUMENT_PAY,
+            inspection_pay=INSPECTION_PAY,
+            closed_at=datetime.now(timezone.utc)
+        ))
+        await session.execute(
+            PayrollEntry.__table__.insert().from_select(
+                ["week_start", "author_id", "author_name", "documents", "inspections",
+                 "duplicate_documents", "duplicate_inspections"],
+                select(
+                    literal(week_start, Date),
+                    AuthorDailyCount.author_id,
+                    func.max(AuthorDailyCount.author_name),
+                    func.sum(AuthorDailyCount.documents),
+                    func.sum(AuthorDailyCount.inspections),
+                    func.sum(AuthorDailyCount.duplicate_documents),
+                    func.sum(AuthorDailyCount.duplicate_inspections)
+                )
+                .where(AuthorDailyCount.day >= week_start, AuthorDailyCount.day <= week_end)
+                .group_by(AuthorDailyCount.author_id)
+            )
+        )
+    logger.info(f"Closed payroll week {week_start} - {week_end}")
+    return True
+
+async def get_payroll_week(week_start: date) -> Optional[PayrollWeek]:
+    """
+    The closed payroll week starting on week_start, None while it is open.
+    """
+    key = ("payroll_week", week_start)
+    week = read_cache.get(key)
+    if week is None:
+        async with session_scope() as session:
+            week = await session.get(PayrollWeek, week_start)
+        # Closed weeks never change, so only open ones are looked up again
+        if week is not None:
+            read_cache.put(key, week, CACHED_ROW_BYTES)
+    return week
+
+async def get_last_closed_payroll_week() -> Optional[date]:
+    async with session_scope() as session:
+        return await session.scalar(select(func.max(PayrollWeek.week_start)))
+
+async def get_unposted_payroll_weeks() -> List[PayrollWeek]:
+    async with session_scope() as session:
+        return list(await session.scalars(
+            select(PayrollWeek).where(PayrollWeek.posted_at.is_(None)).order_by(PayrollWeek.week_start)
+        ))
+
+async def mark_payroll_week_posted(week_start: date):
+    async with session_scope() as session:
+        await session.execute(
+            update(PayrollWeek)
+            .where(PayrollWeek.week_start == week_start)
+            .values(posted_at=datetime.now(timezone.utc))
+        )
+
+async def get_closed_author_totals(
+    author_id: str,
+    week: PayrollWeek,
+    exclude_duplicates: bool = False
+) -> Tuple[int, int]:
+    """
+    An author's totals for a closed payroll week: a primary-key lookup,
+    cached until a late write amends the week (see _amend_closed_week).
+
+    Returns:
+        Tuple[int, int]: (documents, inspections), zero if the author uploaded nothing that week
+    """
+    key = ("payroll_entry", week.week_start, author_id)
+    counts = read_cache.get(key)
+    if counts is None:
+        tag = ("payroll_week", week.week_start)
+        generation = read_cache.generation(tag)
+        async with session_scope() as session:
+            entry = await session.get(PayrollEntry, (week.week_start, author_id))
+        counts = (0, 0, 0, 0)
+        if entry is not None:
+            counts = (entry.documents, entry.inspections, entry.duplicate_documents, entry.duplicate_inspections)
+        read_cache.put(key, counts, CACHED_ROW_BYTES, tag=tag, generation=generation)
+    documents, inspections, duplicate_documents, duplicate_inspections = counts
+    if exclude_duplicates:
+        return documents - duplicate_documents, inspections - duplicate_inspections
+    return documents, inspections
+
+async def get_closed_payroll_totals(
+    week: PayrollWeek,
+    sort: str = "total",
+    exclude_duplicates: bool = False
+) -> List[AuthorTotals]:
+    """
+    Every author's totals for a closed payroll week, like get_payroll_totals
+    but read from the frozen entries and ordered by the week's pay rates.
+    """
+    documents, inspections = _payroll_counts(exclude_duplicates, PayrollEntry)
+    ordering = _payroll_ordering(
+        sort, documents, inspections, PayrollEntry.author_name, week.document_pay, week.inspection_pay
+    )
+    async with session_scope() as session:
+        result = await session.execute(
+            select(PayrollEntry.author_id, PayrollEntry.author_name, documents, inspections)
+            .where(PayrollEntry.week_start == week.week_start)
+            .order_by(ordering, PayrollEntry.author_id)
+        )
+        return [AuthorTotals(*row) for row in result]
+
+class SearchHit(NamedTuple):
+    kind: str
+    source_id: int
+    activity_name: str
+    created_at: datetime
+    snippet: str
+
+_SEARCH_TERM = re.compile(r"\w+", re.UNICODE)
+
+def search_terms(query: str) -> List[str]:
+    """The words of a /cerca query; empty for blank or punctuation-only input."""
+    return _SEARCH_TERM.findall(query)
+
+def _fts5_query(terms: List[str]) -> str:
+    # Quote every term so user input is never parsed as FTS5 operators
+    return " ".join(f'"{term}"' for term in terms)
+
+_SEARCH_COLUMNS = dict(
+    kind=String, source_id=Integer, activity_name=String,
+    created_at=DateTime(timezone=True), snippet=String
+)
+# Built once so every search reuses the same compiled statement (and, on
+# asyncpg, the same server-side prepared statement)
+_PG_SEARCH_SQL = text(f"""
+    SELECT e.kind, e.source_id, e.activity_name, e.created_at,
+           ts_headline('{SEARCH_LANGUAGE}', e.body, q,
+                       'StartSel=**, StopSel=**, MaxWords=30, MinWords=10') AS snippet
+    FROM search_entries e, websearch_to_tsquery('{SEARCH_LANGUAGE}', :query) q
+    WHERE e.body_tsv @@ q
+    ORDER BY ts_rank(e.body_tsv, q) DESC, e.id DESC
+    LIMIT :limit OFFSET :offset
+""").columns(**_SEARCH_COLUMNS)
+_SQLITE_SEARCH_SQL = text("""
+    SELECT e.kind, e.source_id, e.activity_name, e.created_at,
+           snippet(search_entries_fts, 0, '**', '**', '…', 16) AS snippet
+    FROM search_entries_fts
+    JOIN search_entries e ON e.id = search_entries_fts.rowid
+    WHERE search_entries_fts MATCH :query
+    ORDER BY bm25(search_entries_fts), e.id DESC
+    LIMIT :limit OFFSET :offset
+""").columns(**_SEARCH_COLUMNS)
+
+async def search_page(
+    query: str,
+    after: Optional[int] = None,
+    before: Optional[int] = None,
+    limit: int = PAGE_SIZE
+) -> Page:
+    """
+    Ranked full-text search across documents, inspections and sanctions.
+
+    Results are ordered by relevance, so the cursors are result positions
+    (as with list_page) rather than row keys. A query without words
+    (see search_terms) finds nothing, without a database round trip.
+    """
+    terms = search_terms(query)
+    if not terms:
+        return Page()
+    if before is not None:
+        start = max(0, before - limit)
+    elif after is not None:
+        start = after + 1
+    else:
+        start = 0
+
+    async with session_scope() as session:
+        if session.get_bind().dialect.name == "postgresql":
+            sql, params = _PG_SEARCH_SQL, {"query": query}
+        else:
+            sql, params = _SQLITE_SEARCH_SQL, {"query": _fts5_query(terms)}
+        result = await session.execute(sql, {**params, "limit": limit + 1, "offset": start})
+        hits = [SearchHit(*row) for row in result]
+
+    chunk = hits[:limit]
+    return Page(
+        items=chunk,
+        has_prev=start > 0,
+        has_next=len(hits) > limit,
+        first_key=start if chunk else None,
+        last_key=start + len(chunk) - 1 if chunk else None
+    )
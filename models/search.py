@@ -0,0 +1,49 @@
+from sqlalchemy import Column, Integer, String, Text, DateTime, DDL, UniqueConstraint, event
+from app import db
+
+# Text search configuration used for stemming on Postgres
+SEARCH_LANGUAGE = 'italian'
+
+class SearchEntry(db.Model):
+    """
+    One searchable text per document, inspection or sanction.
+
+    The full-text index itself is dialect specific and created alongside the
+    table: a generated tsvector column with a GIN index on Postgres, an
+    external-content FTS5 table kept in sync by triggers on SQLite.
+    """
+    __tablename__ = 'search_entries'
+    __table_args__ = (
+        UniqueConstraint('kind', 'source_id', name='uq_search_entries_kind_source_id'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(20), nullable=False)
+    source_id = Column(Integer, nullable=False)
+    activity_name = Column(String(100), nullable=False)
+    body = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+for statement in (
+    f"ALTER TABLE search_entries ADD COLUMN body_tsv tsvector "
+    f"GENERATED ALWAYS AS (to_tsvector('{SEARCH_LANGUAGE}', activity_name || ' ' || body)) STORED",
+    "CREATE INDEX ix_search_entries_body_tsv ON search_entries USING GIN (body_tsv)",
+):
+    event.listen(SearchEntry.__table__, 'after_create', DDL(statement).execute_if(dialect='postgresql'))
+
+for statement in (
+    "CREATE VIRTUAL TABLE search_entries_fts USING fts5("
+    "body, activity_name, content='search_entries', content_rowid='id')",
+    "CREATE TRIGGER search_entries_ai AFTER INSERT ON search_entries BEGIN "
+    "INSERT INTO search_entries_fts(rowid, body, activity_name) VALUES (new.id, new.body, new.activity_name); END",
+    "CREATE TRIGGER search_entries_ad AFTER DELETE ON search_entries BEGIN "
+    "INSERT INTO search_entries_fts(search_entries_fts, rowid, body, activity_name) "
+    "VALUES ('delete', old.id, old.body, old.activity_name); END",
+):
+    event.listen(SearchEntry.__table__, 'after_create', DDL(statement).execute_if(dialect='sqlite'))
+
+event.listen(
+    SearchEntry.__table__,
+    'before_drop',
+    DDL("DROP TABLE IF EXISTS search_entries_fts").execute_if(dialect='sqlite')
+)
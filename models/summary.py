@@ -0,0 +1,102 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import Column, Integer, String, DateTime, Float, Index, delete, insert, select
+from sqlalchemy.engine import Connection
+from app import db
+from models.timeline import TimelineEvent
+
+logger = logging.getLogger(__name__)
+
+# Recent volume counts an event fully when new, half after this long, a quarter after twice as long...
+RECENT_VOLUME_HALF_LIFE = timedelta(days=7)
+# Weights are stored relative to this instant so that old and new rows compare
+# without ever being rewritten. A double overflows after ~1000 half-lives (about
+# 19 years); moving the epoch forward and running tools.rebuild_activity_summary
+# resets the scale.
+RECENT_VOLUME_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+def _as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+def event_weight(at: datetime) -> float:
+    """
+    What one event at `at` adds to an activity's heat.
+    """
+    return 2.0 ** ((_as_utc(at) - RECENT_VOLUME_EPOCH) / RECENT_VOLUME_HALF_LIFE)
+
+def recent_volume(heat: float, now: datetime = None) -> float:
+    """
+    Events weighted by age (see RECENT_VOLUME_HALF_LIFE), as of `now`.
+    """
+    now = now or datetime.now(timezone.utc)
+    return heat * 2.0 ** (-((now - RECENT_VOLUME_EPOCH) / RECENT_VOLUME_HALF_LIFE))
+
+class ActivitySummary(db.Model):
+    """
+    Per-activity counters, bumped in the same transaction as every insert
+    so the dashboard never aggregates the source tables.
+
+    `heat` is the sum of event_weight over the activity's events: since
+    every row decays at the same rate, ordering by it is ordering by recent
+    volume at any moment, and an insert only has to add to one row.
+    """
+    __tablename__ = 'activity_summary'
+    __table_args__ = (
+        # Keyset pagination for /dashboard, one index per sort order
+        Index('ix_activity_summary_heat', 'heat', 'activity_name'),
+        Index('ix_activity_summary_sanctions', 'sanctions', 'activity_name'),
+        Index('ix_activity_summary_documents', 'documents', 'activity_name'),
+        Index('ix_activity_summary_last_event_at', 'last_event_at', 'activity_name'),
+    )
+
+    activity_name = Column(String(100), primary_key=True)
+    documents = Column(Integer, nullable=False, default=0)
+    inspections = Column(Integer, nullable=False, default=0)
+    sanctions = Column(Integer, nullable=False, default=0)
+    last_document_at = Column(DateTime(timezone=True))
+    last_inspection_at = Column(DateTime(timezone=True))
+    last_sanction_at = Column(DateTime(timezone=True))
+    last_event_at = Column(DateTime(timezone=True), nullable=False)
+    heat = Column(Float, nullable=False, default=0.0)
+
+SUMMARY_COUNTERS = {"document": "documents", "inspection": "inspections", "sanction": "sanctions"}
+
+def rebuild_activity_summary(connection: Connection, batch_size: int = 5000) -> int:
+    """
+    Recompute activity_summary from the timeline, which also covers archived
+    rows, inside the caller's transaction.
+
+    Returns:
+        int: Number of activities
+    """
+    summaries = defaultdict(lambda: {
+        "documents": 0, "inspections": 0, "sanctions": 0,
+        "last_document_at": None, "last_inspection_at": None, "last_sanction_at": None,
+        "last_event_at": None, "heat": 0.0,
+    })
+    result = connection.execute(
+        select(TimelineEvent.activity_name, TimelineEvent.kind, TimelineEvent.created_at)
+        .execution_options(yield_per=batch_size)
+    )
+    for activity_name, kind, created_at in result:
+        created_at = _as_utc(created_at)
+        summary = summaries[activity_name]
+        counter = SUMMARY_COUNTERS[kind]
+        summary[counter] += 1
+        last = f"last_{kind}_at"
+        if summary[last] is None or created_at > summary[last]:
+            summary[last] = created_at
+        if summary["last_event_at"] is None or created_at > summary["last_event_at"]:
+            summary["last_event_at"] = created_at
+        summary["heat"] += event_weight(created_at)
+
+    connection.execute(delete(ActivitySummary))
+    items = list(summaries.items())
+    for start in range(0, len(items), batch_size):
+        connection.execute(
+            insert(ActivitySummary),
+            [{"activity_name": name, **values} for name, values in items[start:start + batch_size]]
+        )
+    logger.info(f"Rebuilt the summary of {len(items)} activities")
+    return len(items)
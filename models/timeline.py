@@ -0,0 +1,55 @@
+from datetime import datetime, timezone
+from sqlalchemy import Column, Integer, String, DateTime, Index, UniqueConstraint
+from app import db
+
+# Longest summary kept on a timeline row
+TIMELINE_SUMMARY_LENGTH = 200
+
+class TimelineEvent(db.Model):
+    """
+    One row per document, inspection or sanction, written in the same
+    transaction as the row it points to (kind, source_id).
+
+    Append-only: rows are never updated, and they stay when archival moves
+    their source to the cold archive, so an activity's whole history pages
+    from this table alone. The summary is copied from the source so a page
+    renders without touching the source tables.
+    """
+    __tablename__ = 'timeline_events'
+    __table_args__ = (
+        UniqueConstraint('kind', 'source_id', name='uq_timeline_events_kind_source_id'),
+        # Keyset pagination for /storico, with and without a kind filter
+        Index('ix_timeline_events_activity_created_at_id', 'activity_name', 'created_at', 'id'),
+        Index('ix_timeline_events_activity_kind_created_at_id', 'activity_name', 'kind', 'created_at', 'id'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(String(20), nullable=False)
+    source_id = Column(Integer, nullable=False)
+    activity_name = Column(String(100), nullable=False)
+    author_id = Column(String(100), nullable=False)
+    author_name = Column(String(100), nullable=False)
+    summary = Column(String(TIMELINE_SUMMARY_LENGTH))
+    created_at = Column(DateTime(timezone=True), nullable=False)
+
+def timeline_values(kind: str, row) -> dict:
+    """
+    Column values of the timeline event for `row`, a document, inspection
+    or sanction (an ORM instance or any row with the same attributes).
+    """
+    if kind == "document":
+        activity_name, summary = row.name, row.context
+    elif kind == "inspection":
+        activity_name, summary = row.activity_name, row.mime_type
+    else:
+        activity_name, summary = row.activity_name, row.reason
+    return {
+        "kind": kind,
+        "source_id": row.id,
+        "activity_name": activity_name,
+        "author_id": row.author_id,
+        "author_name": row.author_name,
+        "summary": summary[:TIMELINE_SUMMARY_LENGTH] if summary else None,
+        # Rows from before created_at had a server default may still lack one
+        "created_at": row.created_at or datetime.now(timezone.utc),
+    }
@@ -0,0 +1,23 @@
+from sqlalchemy import LargeBinary
+from sqlalchemy.types import TypeDecorator
+from utils.compression import compress, decompress
+
+class CompressedBinary(TypeDecorator):
+    """
+    LargeBinary that compresses on write and decompresses on read.
+
+    Values are stored as self-describing frames (see utils.compression), so
+    rows written before the column was compressed still read back unchanged.
+    """
+    impl = LargeBinary
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return compress(bytes(value))
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return decompress(bytes(value))
@@ -0,0 +1,43 @@
+import asyncio
+import os
+import tempfile
+import pytest
+
+# Point every store at a scratch directory before any module reads its settings
+_root = tempfile.mkdtemp(prefix="docbot-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_root}/test.db")
+os.environ.setdefault("BLOB_STORE_PATH", os.path.join(_root, "blobs"))
+os.environ.setdefault("ARCHIVE_PATH", os.path.join(_root, "archive"))
+os.environ.setdefault("DRAFT_STORE_PATH", os.path.join(_root, "drafts"))
+
+@pytest.fixture
+def run_db(tmp_path, monkeypatch):
+    """
+    Runs an async scenario against a freshly migrated (unless migrate=False)
+    SQLite database, with the blob store and cold archive under tmp_path. Each call gets its own
+    event loop, and the engine is disposed of before it closes.
+    """
+    from models.migrations import migrate_database
+    from utils import cold_archive
+    from utils.blob_store import LocalBlobStore, set_blob_store
+    from utils.cache import read_cache
+    from utils.database import configure_engine, dispose_engine
+
+    monkeypatch.setattr(cold_archive, "_archive", cold_archive.ColdArchive(str(tmp_path / "archive")))
+    set_blob_store(LocalBlobStore(str(tmp_path / "blobs")))
+    read_cache.clear()
+    url = f"sqlite:///{tmp_path / 'test.db'}"
+
+    def run(scenario, migrate: bool = True):
+        async def main():
+            configure_engine(url)
+            try:
+                if migrate:
+                    await migrate_database()
+                return await scenario()
+            finally:
+                await dispose_engine()
+        return asyncio.run(main())
+
+    yield run
+    set_blob_store(None)
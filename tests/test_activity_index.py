@@ -0,0 +1,20 @@
+from utils.activity_index import PrefixIndex
+
+def test_search_is_case_insensitive_and_sorted():
+    index = PrefixIndex(["Pattuglia Nord", "pattuglia sud", "Controllo"])
+    assert index.search("PATT") == ["Pattuglia Nord", "pattuglia sud"]
+    assert index.search("c") == ["Controllo"]
+    assert index.search("x") == []
+
+def test_names_differing_only_by_case_are_all_kept():
+    index = PrefixIndex(["Rapina", "rapina"])
+    index.add("RAPINA")
+    index.add("rapina")
+    assert len(index) == 3
+    assert index.search("rap") == ["RAPINA", "Rapina", "rapina"]
+    assert "rapina" in index
+    assert "RaPiNa" not in index
+
+def test_limit_counts_names_not_keys():
+    index = PrefixIndex(["Aa", "aa", "AA", "ab"])
+    assert index.search("a", limit=2) == ["AA", "Aa"]
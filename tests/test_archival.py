@@ -0,0 +1,74 @@
+from datetime import datetime, timezone
+from sqlalchemy import func, insert, select
+import models.archival as archival
+from models.activity import Sanction
+from models.backfills import rebuild_author_daily_counts
+from models.partitions import add_months, month_start
+from models.payroll import AuthorDailyCount
+from models.repository import prepare_documents, prepare_sanction
+from utils.database import session_scope
+from utils.write_batcher import run_write
+
+OLD_MONTH = add_months(month_start(datetime.now(timezone.utc)), -24)
+OLD_AT = datetime(OLD_MONTH.year, OLD_MONTH.month, 10, tzinfo=timezone.utc)
+
+async def live_sanctions() -> int:
+    async with session_scope() as session:
+        return await session.scalar(select(func.count()).select_from(Sanction))
+
+def test_archiving_a_month_moves_its_rows(run_db):
+    async def scenario():
+        for index in range(3):
+            await run_write(prepare_sanction("Vecchia", f"motivo {index}", "multa", "1", "Utente", OLD_AT))
+        archived = await archival.archive_old_records()
+        return archived, await live_sanctions(), await archival.archived_rows(Sanction, "Vecchia")
+
+    archived, live, rows = run_db(scenario)
+    assert archived["sanctions"] == 3
+    assert live == 0
+    assert [row.reason for row in rows] == ["motivo 0", "motivo 1", "motivo 2"]
+
+def test_row_arriving_during_archival_is_kept_for_the_next_run(run_db, monkeypatch):
+    drop_month = archival._drop_month
+
+    def late_replay(connection, model, month, archived_ids):
+        # A journal entry replayed between the archive scan and the drop
+        connection.execute(insert(Sanction).values(
+            activity_name="Vecchia", reason="in ritardo", sanction_text="multa",
+            author_id="2", author_name="Altro", created_at=OLD_AT
+        ))
+        drop_month(connection, model, month, archived_ids)
+
+    async def scenario():
+        for index in range(2):
+            await run_write(prepare_sanction("Vecchia", f"motivo {index}", "multa", "1", "Utente", OLD_AT))
+        monkeypatch.setattr(archival, "_drop_month", late_replay)
+        first = await archival.archive_month(Sanction, OLD_MONTH)
+        left = await live_sanctions()
+        monkeypatch.setattr(archival, "_drop_month", drop_month)
+        second = await archival.archive_old_records()
+        rows = await archival.archived_rows(Sanction, "Vecchia")
+        return first, left, second, await live_sanctions(), rows
+
+    first, left, second, live, rows = run_db(scenario)
+    assert (first, left) == (2, 1)
+    assert second["sanctions"] == 1
+    assert live == 0
+    assert sorted(row.reason for row in rows) == ["in ritardo", "motivo 0", "motivo 1"]
+
+def test_rollup_rebuild_keeps_archived_days(run_db):
+    async def rollups():
+        async with session_scope() as session:
+            return [(row.author_id, row.day, row.documents) for row in await session.scalars(select(AuthorDailyCount))]
+
+    async def scenario():
+        documents = [{"content": f"vecchio {index}".encode(), "context": "vecchio"} for index in range(2)]
+        await run_write(await prepare_documents(documents, "Vecchia", "1", "Utente", OLD_AT))
+        before = await rollups()
+        await archival.archive_old_records()
+        await rebuild_author_daily_counts()
+        return before, await rollups()
+
+    before, after = run_db(scenario)
+    assert before == [("1", OLD_AT.date(), 2)]
+    assert after == before
@@ -0,0 +1,23 @@
+import pytest
+
+from utils.cluster import build_plan, split_pool_budget
+
+@pytest.mark.parametrize("budget, weights", [
+    (20, [4, 4, 4]),
+    (5, [16, 1, 1, 1, 1]),
+    (3, [100, 1, 1]),
+    (7, [1, 1, 1, 1, 1, 1, 1]),
+])
+def test_pool_budget_is_never_exceeded(budget, weights):
+    sizes = split_pool_budget(budget, weights)
+    assert sum(sizes) == budget
+    assert min(sizes) >= 1
+
+def test_pool_budget_follows_shard_counts():
+    assert split_pool_budget(20, [8, 4, 4, 4]) == [8, 4, 4, 4]
+
+def test_pool_budget_smaller_than_processes_is_rejected():
+    with pytest.raises(ValueError):
+        split_pool_budget(2, [1, 1, 1])
+    with pytest.raises(ValueError):
+        build_plan(shard_count=8, processes=4, pool_budget=3)
@@ -0,0 +1,72 @@
+import asyncio
+import os
+import pytest
+import utils.drafts as drafts
+from utils.drafts import DraftLimitExceeded, DraftStore
+
+def run(scenario):
+    return asyncio.run(scenario())
+
+def test_draft_is_reopened_and_survives_a_restart(tmp_path):
+    async def scenario():
+        store = DraftStore(str(tmp_path))
+        draft = await store.open("1", "Pattuglia")
+        await store.add_document("1", draft.draft_id, b"primo", "contesto 1")
+        await store.add_document("1", draft.draft_id, b"secondo", "contesto 2")
+        again = await store.open("1", "Pattuglia")
+
+        # A new store, as after a restart, reads everything back from disk
+        restarted = DraftStore(str(tmp_path))
+        reloaded = await restarted.get("1", draft.draft_id)
+        return draft, again, await restarted.load_documents(reloaded)
+
+    draft, again, documents = run(scenario)
+    assert again.draft_id == draft.draft_id
+    assert documents == [{"content": b"primo", "context": "contesto 1"}, {"content": b"secondo", "context": "contesto 2"}]
+
+def test_payloads_evicted_from_memory_are_read_from_disk(tmp_path):
+    async def scenario():
+        store = DraftStore(str(tmp_path), memory_max_bytes=10)
+        draft = await store.open("1", "Pattuglia")
+        for index in range(3):
+            draft = await store.add_document("1", draft.draft_id, bytes([index]) * 8, f"doc {index}")
+        return store, await store.load_documents(draft)
+
+    store, documents = run(scenario)
+    assert store.memory.stats()["bytes"] <= 10
+    assert [doc["content"] for doc in documents] == [b"\x00" * 8, b"\x01" * 8, b"\x02" * 8]
+
+def test_limits(tmp_path, monkeypatch):
+    monkeypatch.setattr(drafts, "DRAFT_MAX_PER_USER", 2)
+    monkeypatch.setattr(drafts, "DRAFT_MAX_DOCUMENTS", 1)
+
+    async def scenario():
+        store = DraftStore(str(tmp_path))
+        first = await store.open("1", "Uno")
+        await store.open("1", "Due")
+        with pytest.raises(DraftLimitExceeded):
+            await store.open("1", "Tre")
+        # Other users have their own allowance
+        await store.open("2", "Tre")
+        await store.add_document("1", first.draft_id, b"x", "c")
+        with pytest.raises(DraftLimitExceeded):
+            await store.add_document("1", first.draft_id, b"y", "c")
+
+    run(scenario)
+
+def test_discarded_and_expired_drafts_are_gone(tmp_path):
+    async def scenario():
+        store = DraftStore(str(tmp_path), ttl=60)
+        submitted = await store.open("1", "Inviata")
+        await store.add_document("1", submitted.draft_id, b"x", "c")
+        await store.discard(submitted)
+        with pytest.raises(KeyError):
+            await store.add_document("1", submitted.draft_id, b"y", "c")
+
+        stale = await store.open("2", "Vecchia")
+        expired_store = DraftStore(str(tmp_path), ttl=-1)
+        assert await expired_store.get("2", stale.draft_id) is None
+        return await expired_store.purge_expired()
+
+    assert run(scenario) == 1
+    assert os.listdir(tmp_path) == []
@@ -0,0 +1,101 @@
+from datetime import datetime, timezone
+import models.duplicates as duplicates
+from models.duplicates import (
+    DocumentFingerprint,
+    Fingerprint,
+    Upload,
+    _stored_match,
+    find_document_duplicates,
+    fingerprint_values,
+    match_documents,
+)
+from models.repository import add_documents
+from utils.database import session_scope
+from utils.simhash import BAND_BITS
+
+NOW = datetime(2026, 1, 1, tzinfo=timezone.utc)
+TARGET = 0x0123_4567_89AB_CDEF
+
+def stored(document_id: int, simhash: int, activity: str = "Pattuglia", author: str = "1", content_hash: str = None):
+    return DocumentFingerprint(
+        document_id=document_id,
+        activity_name=activity,
+        author_id=author,
+        created_at=NOW,
+        **fingerprint_values(Fingerprint(content_hash or f"hash-{document_id}", simhash))
+    )
+
+async def add_rows(rows):
+    async with session_scope() as session:
+        session.add_all(rows)
+
+async def lookup(fingerprint: Fingerprint, upload: Upload = Upload()):
+    async with session_scope() as session:
+        return await _stored_match(session, fingerprint, upload)
+
+def test_recent_near_duplicate_is_found_behind_many_band_collisions(run_db):
+    # Share the lowest band with the target, differ everywhere else
+    low_band = TARGET & ((1 << BAND_BITS) - 1)
+    unrelated = [stored(i, low_band | (~TARGET & ~((1 << BAND_BITS) - 1) & (1 << 64) - 1)) for i in range(1, 201)]
+    near_copy = stored(500, TARGET ^ 0b101)
+
+    async def scenario():
+        await add_rows(unrelated + [near_copy])
+        return await lookup(Fingerprint("new", TARGET))
+
+    match = run_db(scenario)
+    assert match is not None
+    assert (match.document_id, match.distance, match.exact) == (500, 2, False)
+
+def test_far_fingerprints_sharing_a_band_do_not_match(run_db):
+    async def scenario():
+        await add_rows([stored(1, TARGET ^ (0b1111 << 40))])
+        return await lookup(Fingerprint("new", TARGET))
+
+    assert run_db(scenario) is None
+
+def test_exact_match_prefers_the_original(run_db):
+    async def scenario():
+        await add_rows([stored(7, None, content_hash="same"), stored(9, None, content_hash="same")])
+        return await lookup(Fingerprint("same", None))
+
+    match = run_db(scenario)
+    assert (match.document_id, match.exact) == (7, True)
+
+def test_scope_limits_candidates(run_db, monkeypatch):
+    monkeypatch.setattr(duplicates, "DUPLICATE_SCOPE", "activity")
+
+    async def scenario():
+        await add_rows([stored(1, TARGET, activity="Altra"), stored(2, TARGET ^ 1, activity="Pattuglia")])
+        elsewhere = await lookup(Fingerprint("new", TARGET), Upload("Nuova", "1"))
+        here = await lookup(Fingerprint("new", TARGET), Upload("Pattuglia", "1"))
+        older = await lookup(Fingerprint("new", TARGET), Upload("Pattuglia", "1", before_id=2))
+        return elsewhere, here, older
+
+    elsewhere, here, older = run_db(scenario)
+    assert elsewhere is None
+    assert here.document_id == 2
+    assert older is None
+
+def test_batch_items_match_earlier_items_of_the_batch(run_db):
+    async def scenario():
+        async with session_scope() as session:
+            return await match_documents(session, [
+                Fingerprint("a", TARGET), Fingerprint("b", TARGET ^ 1), Fingerprint("c", ~TARGET & (1 << 64) - 1)
+            ])
+
+    first, second, third = run_db(scenario)
+    assert first is None and third is None
+    assert (second.batch_index, second.distance) == (0, 1)
+
+def test_edited_copy_of_a_saved_document_is_flagged(run_db):
+    text = " ".join(f"parola{i}" for i in range(150))
+    edited = text.replace("parola75", "modificata")
+
+    async def scenario():
+        await add_documents([{"content": text.encode(), "context": "c"}], "Pattuglia", "1", "Utente")
+        return await find_document_duplicates([edited.encode(), b"testo del tutto diverso da ogni altro caricato finora qui"])
+
+    copy, original = run_db(scenario)
+    assert copy is not None and not copy.exact and copy.activity_name == "Pattuglia"
+    assert original is None
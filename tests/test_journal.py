@@ -0,0 +1,212 @@
+import asyncio
+import json
+import os
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.exc import IntegrityError, OperationalError
+import utils.journal as journal_module
+from models.activity import Sanction
+from models.journal import AppliedJournalEntry
+from models.repository import InvalidSubmission, apply_journal_entries, submit_documents, submit_sanction
+from tools.replay_journal import retry_rejected
+from utils.database import session_scope
+from utils.journal import REJECTED_FILE, Journal, read_rejected
+
+def sanction(reason: str) -> dict:
+    return {"activity_name": "Pattuglia", "reason": reason, "sanction_text": "multa", "author_id": "1", "author_name": "Utente"}
+
+async def count(model) -> int:
+    async with session_scope() as session:
+        return await session.scalar(select(func.count()).select_from(model))
+
+async def fill(path, reasons, **options) -> Journal:
+    journal = Journal(str(path), **options)
+    journal.open()
+    for reason in reasons:
+        await journal.append("sanction", sanction(reason))
+    return journal
+
+def test_entries_survive_reopening(tmp_path):
+    async def scenario():
+        journal = await fill(tmp_path, ["uno", "due"])
+        await journal.close()
+        reopened = Journal(str(tmp_path))
+        reopened.open()
+        entries = [entry for entry, _ in reopened._read_batch()]
+        await reopened.close()
+        return reopened, entries
+
+    journal, entries = asyncio.run(scenario())
+    assert journal.pending == 2
+    assert [(entry.seq, entry.data["reason"]) for entry in entries] == [(1, "uno"), (2, "due")]
+
+@pytest.mark.parametrize("damage", ["torn", "corrupt"])
+def test_damaged_last_record_is_cut_on_open(tmp_path, damage):
+    async def scenario():
+        journal = await fill(tmp_path, ["uno", "due"])
+        await journal.close()
+        segment = journal._segment_path(journal._segments()[-1])
+        with open(segment, "r+b") as f:
+            data = f.read()
+            if damage == "torn":
+                f.write(b"\x00\x00\x01\x00parziale")
+            else:
+                # Flip a byte of the last payload so its CRC no longer matches
+                f.seek(len(data) - 2)
+                f.write(bytes([data[-2] ^ 0xFF]))
+        reopened = Journal(str(tmp_path))
+        reopened.open()
+        size = os.path.getsize(segment)
+        entries = [entry.data["reason"] for entry, _ in reopened._read_batch()]
+        await reopened.append("sanction", sanction("tre"))
+        after = [entry.data["reason"] for entry, _ in reopened._read_batch()]
+        await reopened.close()
+        return damage, len(data), size, entries, after
+
+    damage, original, size, entries, after = asyncio.run(scenario())
+    if damage == "torn":
+        assert size == original and entries == ["uno", "due"] and after == ["uno", "due", "tre"]
+    else:
+        assert size < original and entries == ["uno"] and after == ["uno", "tre"]
+
+def test_second_process_cannot_open_a_journal_in_use(tmp_path):
+    journal = Journal(str(tmp_path))
+    journal.open()
+    with pytest.raises(RuntimeError):
+        Journal(str(tmp_path)).open()
+    asyncio.run(journal.close())
+
+def test_replay_applies_each_entry_once(run_db, tmp_path):
+    async def scenario():
+        journal = await fill(tmp_path / "journal", ["uno", "due", "tre"])
+        # A crash after the database committed two entries but before the checkpoint
+        await apply_journal_entries([entry for entry, _ in journal._read_batch()][:2])
+        await journal.close()
+
+        reopened = Journal(str(tmp_path / "journal"))
+        reopened.open()
+        reopened.start(apply_journal_entries)
+        await reopened.drain()
+        await reopened.close()
+        return reopened, await count(Sanction), await count(AppliedJournalEntry)
+
+    journal, sanctions, markers = run_db(scenario)
+    assert (journal.applied, journal.skipped, journal.rejected) == (1, 2, 0)
+    assert (sanctions, markers) == (3, 3)
+    assert journal.pending == 0
+
+def test_segments_roll_and_applied_ones_are_deleted(run_db, tmp_path):
+    async def scenario():
+        journal = await fill(tmp_path, [f"motivo {i}" for i in range(12)], segment_bytes=300, replay_batch=4)
+        rolled = len(journal._segments())
+        journal.start(apply_journal_entries)
+        await journal.drain()
+        left = len(journal._segments())
+        await journal.close()
+        return rolled, left, await count(Sanction)
+
+    rolled, left, sanctions = run_db(scenario)
+    assert rolled > 2
+    # Only the segment the replay cursor is in can outlive the checkpoint
+    assert left <= 2 < rolled
+    assert sanctions == 12
+
+def test_transient_failures_are_retried_not_rejected(run_db, tmp_path, monkeypatch):
+    monkeypatch.setattr(asyncio, "sleep", _fast_sleep)
+    failures = {"left": 2}
+
+    async def flaky(entries):
+        if failures["left"]:
+            failures["left"] -= 1
+            raise OperationalError("INSERT", {}, Exception("database is down"))
+        return await apply_journal_entries(entries)
+
+    async def scenario():
+        journal = await fill(tmp_path, ["uno"])
+        journal.start(flaky)
+        await journal.drain()
+        await journal.close()
+        return journal, await count(Sanction)
+
+    journal, sanctions = run_db(scenario)
+    assert (journal.retries, journal.rejected, journal.applied) == (2, 0, 1)
+    assert sanctions == 1
+
+_real_sleep = asyncio.sleep
+
+async def _fast_sleep(delay, *args, **kwargs):
+    await _real_sleep(min(delay, 0.01), *args, **kwargs)
+
+def test_rejected_entry_is_kept_whole_and_can_be_applied_again(run_db, tmp_path):
+    async def refuse_poison(entries):
+        if any(entry.data["reason"] == "rifiutata" for entry in entries):
+            raise IntegrityError("INSERT", {}, Exception("value too long"))
+        return await apply_journal_entries(entries)
+
+    async def scenario():
+        # One segment per entry, so the rejected entry's segment is deleted
+        journal = await fill(tmp_path, ["prima", "rifiutata", "dopo"], segment_bytes=1)
+        journal.start(refuse_poison)
+        await journal.drain()
+        await journal.close()
+        stats = journal.stats()
+        records = read_rejected(str(tmp_path))
+        segments_left = journal._segments()
+        applied_before = await count(Sanction)
+
+        # The operator has fixed the cause: --rejected applies it again
+        reopened = Journal(str(tmp_path))
+        reopened.open()
+        await retry_rejected(reopened)
+        await reopened.close()
+        return stats, records, segments_left, applied_before, await count(Sanction)
+
+    stats, records, segments_left, applied_before, applied_after = run_db(scenario)
+    assert (stats["applied"], stats["rejected"], stats["pending"]) == (2, 1, 0)
+    [record] = records
+    assert record["data"] == sanction("rifiutata")
+    assert record["at"] and record["id"] and "IntegrityError" in record["error"]
+    # The segment holding the entry is gone, so the reject file is the only copy
+    assert all(segment > record["seq"] for segment in segments_left)
+    assert (applied_before, applied_after) == (2, 3)
+    assert not os.path.exists(tmp_path / REJECTED_FILE)
+
+def test_entry_that_still_fails_stays_rejected(run_db, tmp_path):
+    async def scenario():
+        journal = await fill(tmp_path, [])
+        await journal.append("sconosciuto", {"x": 1})
+        journal.start(apply_journal_entries)
+        await journal.drain()
+        await retry_rejected(journal)
+        await journal.close()
+        return read_rejected(str(tmp_path))
+
+    [record] = run_db(scenario)
+    assert record["kind"] == "sconosciuto" and "ValueError" in record["error"]
+
+def test_invalid_submissions_are_refused_before_journaling(run_db, tmp_path, monkeypatch):
+    journal = Journal(str(tmp_path))
+    monkeypatch.setattr(journal_module, "_journal", journal)
+
+    async def scenario():
+        journal.open()
+        errors = []
+        for call in (
+            lambda: submit_sanction("Pattuglia", "x" * 1001, "multa", "1", "Utente"),
+            lambda: submit_sanction("a" * 101, "motivo", "multa", "1", "Utente"),
+            lambda: submit_sanction("Pattuglia", "motivo", "  ", "1", "Utente"),
+            lambda: submit_documents([{"content": b"testo", "context": None}], "Pattuglia", "1", "Utente"),
+            lambda: submit_documents([], "Pattuglia", "1", "Utente"),
+        ):
+            with pytest.raises(InvalidSubmission) as error:
+                await call()
+            errors.append(str(error.value))
+        await submit_sanction("Pattuglia", "x" * 1000, "multa", "1", "Utente")
+        await journal.close()
+        return errors
+
+    errors = run_db(scenario)
+    assert errors[0] == "Il motivo supera i 1000 caratteri."
+    assert errors[1] == "Il nome dell'attività supera i 100 caratteri."
+    assert errors[2] == "Manca la sanzione."
+    assert journal.durable_seq == 1
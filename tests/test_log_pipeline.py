@@ -0,0 +1,22 @@
+import logging
+
+from utils.log_pipeline import DebugSampler
+
+def _record(msg, *args, lineno=1):
+    return logging.LogRecord("cogs.test", logging.DEBUG, __file__, lineno, msg, args, None)
+
+def test_sampler_buckets_by_template_not_formatted_message():
+    sampler = DebugSampler(rate=1, burst=2)
+    passed = [sampler.filter(_record("Generated filename: %s", f"doc{i}")) for i in range(5)]
+    assert passed == [True, True, False, False, False]
+    assert len(sampler._buckets) == 1
+
+def test_sampler_tracks_a_bounded_number_of_sites():
+    sampler = DebugSampler(rate=1, burst=1, max_sites=8)
+    for i in range(100):
+        assert sampler.filter(_record(f"Spooled doc{i}"))
+    assert len(sampler._buckets) == 8
+
+    # The most recently used sites are the ones kept
+    assert not sampler.filter(_record("Spooled doc99"))
+    assert sampler.filter(_record("Spooled doc0"))
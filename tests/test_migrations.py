@@ -0,0 +1,84 @@
+import sqlite3
+from sqlalchemy import inspect, select
+from models.document import Document
+from models.migrations import LATEST_VERSION, migrate_database
+from models.duplicates import DocumentFingerprint
+from models.payroll import AuthorDailyCount
+from models.repository import add_documents, get_timeline_page, load_content, search_page
+from models.summary import ActivitySummary
+from utils.database import get_engine, session_scope
+
+# The schema before any migration existed, as db.create_all() made it
+BASELINE_SCHEMA = """
+CREATE TABLE documents (
+    id INTEGER PRIMARY KEY, name VARCHAR(100) NOT NULL, content BLOB NOT NULL,
+    context VARCHAR(1000) NOT NULL, author_id VARCHAR(100) NOT NULL,
+    author_name VARCHAR(100) NOT NULL, created_at DATETIME DEFAULT (CURRENT_TIMESTAMP)
+);
+CREATE INDEX ix_documents_name ON documents (name);
+CREATE TABLE inspections (
+    id INTEGER PRIMARY KEY, activity_name VARCHAR(100) NOT NULL, content BLOB NOT NULL,
+    author_id VARCHAR(100) NOT NULL, author_name VARCHAR(100) NOT NULL,
+    created_at DATETIME DEFAULT (CURRENT_TIMESTAMP)
+);
+CREATE INDEX ix_inspections_activity_name ON inspections (activity_name);
+CREATE TABLE sanctions (
+    id INTEGER PRIMARY KEY, activity_name VARCHAR(100) NOT NULL, reason VARCHAR(1000) NOT NULL,
+    sanction_text VARCHAR(1000) NOT NULL, author_id VARCHAR(100) NOT NULL,
+    author_name VARCHAR(100) NOT NULL, created_at DATETIME DEFAULT (CURRENT_TIMESTAMP)
+);
+CREATE INDEX ix_sanctions_activity_name ON sanctions (activity_name);
+INSERT INTO documents (name, content, context, author_id, author_name, created_at)
+    VALUES ('Pattuglia', X'7465737461', 'vecchio', '1', 'Utente', '2024-03-01 10:00:00');
+INSERT INTO inspections (activity_name, content, author_id, author_name, created_at)
+    VALUES ('Pattuglia', X'706466', '2', 'Ispettore', '2024-03-02 10:00:00');
+INSERT INTO sanctions (activity_name, reason, sanction_text, author_id, author_name, created_at)
+    VALUES ('Pattuglia', 'ritardo', 'multa', '3', 'Capo', '2024-03-03 10:00:00');
+"""
+
+def test_fresh_database_migrates_once(run_db):
+    async def scenario():
+        return await migrate_database(), await migrate_database()
+
+    first, second = run_db(scenario, migrate=False)
+    assert first == list(range(1, LATEST_VERSION + 1))
+    assert second == []
+
+def test_baseline_database_is_upgraded_in_place(run_db, tmp_path):
+    with sqlite3.connect(tmp_path / "test.db") as connection:
+        connection.executescript(BASELINE_SCHEMA)
+
+    async def scenario():
+        applied = await migrate_database()
+        async with get_engine().connect() as connection:
+            columns = await connection.run_sync(
+                lambda sync: {column["name"]: column for column in inspect(sync).get_columns("documents")}
+            )
+        async with session_scope() as session:
+            legacy = await session.scalar(select(Document))
+            summary = await session.get(ActivitySummary, "Pattuglia")
+        content = await load_content(legacy)
+        async with session_scope() as session:
+            rollups = [(row.author_id, row.documents, row.inspections) for row in await session.scalars(
+                select(AuthorDailyCount).order_by(AuthorDailyCount.author_id)
+            )]
+            fingerprinted = await session.get(DocumentFingerprint, legacy.id)
+        found = await search_page("ritardo")
+        await add_documents([{"content": b"nuovo", "context": "nuovo"}], "Pattuglia", "1", "Utente")
+        timeline = await get_timeline_page("Pattuglia", limit=10)
+        backfilled = (rollups, fingerprinted is not None, [hit.kind for hit in found.items])
+        return applied, columns, content, summary, [event.kind for event in timeline.items], backfilled
+
+    applied, columns, content, summary, kinds, backfilled = run_db(scenario, migrate=False)
+    assert applied == list(range(1, LATEST_VERSION + 1))
+    assert columns["content"]["nullable"]
+    assert {"content_hash", "content_size", "mime_type"} <= set(columns)
+    # Inline payloads from before the blob store are still readable
+    assert content == b"testa"
+    assert (summary.documents, summary.inspections, summary.sanctions) == (1, 1, 1)
+    assert kinds == ["document", "inspection", "sanction", "document"]
+    # Tables added after the baseline are filled from the rows already there
+    rollups, fingerprinted, found = backfilled
+    assert rollups == [("1", 1, 0), ("2", 0, 1)]
+    assert fingerprinted
+    assert found == ["sanction"]
@@ -0,0 +1,110 @@
+from datetime import datetime, timedelta, timezone
+from models.archival import archive_old_records
+from models.partitions import add_months, month_start
+from models.repository import get_documents_page, prepare_documents
+from utils.write_batcher import run_write
+
+NOW = datetime.now(timezone.utc).replace(microsecond=0)
+OLD_MONTH = add_months(month_start(NOW), -24)
+OLD_AT = datetime(OLD_MONTH.year, OLD_MONTH.month, 3, tzinfo=timezone.utc)
+
+async def seed():
+    """Seven documents in a month old enough to archive, six recent ones; some share a timestamp."""
+    times = [OLD_AT + timedelta(hours=i // 2) for i in range(7)] + [NOW - timedelta(hours=6 - i // 2) for i in range(6)]
+    for index, created_at in enumerate(times):
+        documents = [{"content": f"documento {index}".encode(), "context": f"doc {index:02d}"}]
+        await run_write(await prepare_documents(documents, "Pattuglia", "1", "Utente", created_at))
+    return [f"doc {index:02d}" for index in range(len(times))]
+
+async def walk_forward(limit: int):
+    pages, after = [], None
+    while True:
+        page = await get_documents_page("Pattuglia", after=after, limit=limit)
+        pages.append([doc.context for doc in page.items])
+        if not page.has_next:
+            return pages
+        after = page.last_key
+
+async def walk_backward(limit: int):
+    pages = []
+    page = await get_documents_page("Pattuglia", before=(NOW + timedelta(days=1), 0), limit=limit)
+    while True:
+        pages.insert(0, [doc.context for doc in page.items])
+        if not page.has_prev:
+            return pages
+        page = await get_documents_page("Pattuglia", before=page.first_key, limit=limit)
+
+def test_keyset_pages_cover_every_document_once(run_db):
+    async def scenario():
+        expected = await seed()
+        return expected, await walk_forward(5), await walk_backward(5)
+
+    expected, forward, backward = run_db(scenario)
+    assert [len(page) for page in forward] == [5, 5, 3]
+    assert sum(forward, []) == expected
+    assert sum(backward, []) == expected
+
+def test_pages_merge_archived_and_live_documents(run_db):
+    async def scenario():
+        expected = await seed()
+        archived = await archive_old_records()
+        return expected, archived, await walk_forward(4), await walk_backward(4)
+
+    expected, archived, forward, backward = run_db(scenario)
+    assert archived["documents"] == 7
+    # Pages that straddle the archive boundary mix both sources
+    assert forward[1] == ["doc 04", "doc 05", "doc 06", "doc 07"]
+    assert sum(forward, []) == expected
+    assert sum(backward, []) == expected
+
+def test_archive_pages_read_only_the_months_they_need(run_db, monkeypatch):
+    from utils.cold_archive import ColdArchive
+
+    months = [add_months(OLD_MONTH, offset) for offset in range(4)]
+
+    async def scenario():
+        expected = []
+        for index, month in enumerate(months):
+            for day in (2, 9, 16):
+                created_at = datetime(month.year, month.month, day, tzinfo=timezone.utc)
+                documents = [{"content": b"vecchio", "context": f"m{index} g{day:02d}"}]
+                await run_write(await prepare_documents(documents, "Pattuglia", "1", "Utente", created_at))
+                expected.append(f"m{index} g{day:02d}")
+        await archive_old_records()
+
+        read = []
+        iter_month = ColdArchive.iter_month
+        monkeypatch.setattr(ColdArchive, "iter_month", lambda self, table, month, *args: read.append(month) or iter_month(self, table, month, *args))
+
+        first = await get_documents_page("Pattuglia", limit=2)
+        first_read, read[:] = list(read), []
+        second = await get_documents_page("Pattuglia", after=first.last_key, limit=2)
+        second_read, read[:] = list(read), []
+        previous = await get_documents_page("Pattuglia", before=second.first_key, limit=2)
+        return expected, first, first_read, second, second_read, previous, list(read), await walk_forward(5)
+
+    expected, first, first_read, second, second_read, previous, previous_read, forward = run_db(scenario)
+    assert [doc.context for doc in first.items] == ["m0 g02", "m0 g09"]
+    assert first_read == [f"{months[0]:%Y-%m}"]
+    assert [doc.context for doc in second.items] == ["m0 g16", "m1 g02"]
+    assert second_read == [f"{months[0]:%Y-%m}", f"{months[1]:%Y-%m}"]
+    assert [doc.context for doc in previous.items] == ["m0 g02", "m0 g09"] and not previous.has_prev
+    assert previous_read == [f"{months[0]:%Y-%m}"]
+    assert sum(forward, []) == expected
+
+def test_pages_merge_late_live_rows_older_than_archived_ones(run_db):
+    async def scenario():
+        expected = await seed()
+        await archive_old_records()
+        # Arrived after its month was archived, so it stays live while
+        # sorting between (and before) archived rows
+        for context, created_at in (("tardivo 1", OLD_AT + timedelta(minutes=30)), ("tardivo 0", OLD_AT - timedelta(hours=1))):
+            documents = [{"content": context.encode(), "context": context}]
+            await run_write(await prepare_documents(documents, "Pattuglia", "1", "Utente", created_at))
+        return expected, await walk_forward(3), await walk_backward(3)
+
+    expected, forward, backward = run_db(scenario)
+    expected = ["tardivo 0"] + expected[:2] + ["tardivo 1"] + expected[2:]
+    assert forward[0] == ["tardivo 0", "doc 00", "doc 01"]
+    assert sum(forward, []) == expected
+    assert sum(backward, []) == expected
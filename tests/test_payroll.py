@@ -0,0 +1,59 @@
+import base64
+import uuid
+from datetime import datetime, time, timedelta, timezone
+from models.payroll import PayrollWeek, payroll_week_start
+from models.repository import (
+    apply_journal_entries,
+    close_payroll_week,
+    get_closed_author_totals,
+    get_unposted_payroll_weeks,
+    mark_payroll_week_posted,
+    prepare_documents,
+)
+from utils.database import session_scope
+from utils.journal import JournalEntry
+from utils.write_batcher import run_write
+
+LAST_WEEK = payroll_week_start(datetime.now(timezone.utc).date()) - timedelta(days=7)
+IN_LAST_WEEK = datetime.combine(LAST_WEEK + timedelta(days=2), time(12), tzinfo=timezone.utc)
+
+def journaled_documents(count: int, created_at: datetime) -> JournalEntry:
+    documents = [
+        {"content": base64.b64encode(f"tardivo {index}".encode()).decode(), "context": f"tardivo {index}"}
+        for index in range(count)
+    ]
+    data = {"name": "Pattuglia", "documents": documents, "author_id": "1", "author_name": "Utente"}
+    return JournalEntry("documents", data, uuid.uuid4().hex, created_at)
+
+def test_journal_entry_replayed_after_its_week_closed_is_counted(run_db):
+    async def week() -> PayrollWeek:
+        async with session_scope() as session:
+            return await session.get(PayrollWeek, LAST_WEEK)
+
+    async def scenario():
+        documents = [{"content": b"in tempo", "context": "in tempo"}]
+        await run_write(await prepare_documents(documents, "Pattuglia", "1", "Utente", IN_LAST_WEEK))
+        await close_payroll_week(LAST_WEEK)
+        await mark_payroll_week_posted(LAST_WEEK)
+        closed = await get_closed_author_totals("1", await week())
+
+        # Another process's journal catches up after the week was closed
+        await apply_journal_entries([journaled_documents(2, IN_LAST_WEEK)])
+        amended = await get_closed_author_totals("1", await week())
+        return closed, amended, [week.week_start for week in await get_unposted_payroll_weeks()]
+
+    closed, amended, unposted = run_db(scenario)
+    assert closed == (1, 0)
+    assert amended == (3, 0)
+    # The corrected report goes out on the next run of the weekly job
+    assert unposted == [LAST_WEEK]
+
+def test_writes_into_open_weeks_leave_closed_ones_alone(run_db):
+    async def scenario():
+        await close_payroll_week(LAST_WEEK)
+        async with session_scope() as session:
+            week = await session.get(PayrollWeek, LAST_WEEK)
+        await apply_journal_entries([journaled_documents(1, datetime.now(timezone.utc))])
+        return await get_closed_author_totals("1", week)
+
+    assert run_db(scenario) == (0, 0)
@@ -0,0 +1,21 @@
+import pytest
+from models.repository import add_sanction, search_page, search_terms
+
+@pytest.mark.parametrize("query", ["", "   ", "...", "?! -- \"\"", "*"])
+def test_queries_without_words_find_nothing(run_db, query):
+    async def scenario():
+        return await search_page(query)
+
+    assert search_terms(query) == []
+    page = run_db(scenario)
+    assert page.items == [] and not page.has_next
+
+def test_search_finds_words_and_ignores_punctuation(run_db):
+    async def scenario():
+        await add_sanction("Pattuglia", "Ritardo al turno di notte", "multa", "1", "Utente")
+        await add_sanction("Pattuglia", "Divisa non in ordine", "richiamo", "1", "Utente")
+        return await search_page('"ritardo"!! (notte)')
+
+    page = run_db(scenario)
+    assert [hit.kind for hit in page.items] == ["sanction"]
+    assert "Ritardo" in page.items[0].snippet
@@ -0,0 +1,146 @@
+import asyncio
+import io
+import aiohttp
+import discord
+import pytest
+from utils.send_scheduler import (
+    MAX_EMBEDS,
+    MAX_UPLOAD_BYTES,
+    SendScheduler,
+    pack_messages,
+    route_key,
+    route_key_from_path,
+)
+
+class FakeChannel:
+    """Records every send; fails those for which `fail(kwargs)` is true."""
+
+    def __init__(self, channel_id: int = 1, fail=lambda kwargs: False):
+        self.id = channel_id
+        self.fail = fail
+        self.sent = []
+
+    async def send(self, **kwargs):
+        await asyncio.sleep(0)
+        if self.fail(kwargs):
+            raise discord.HTTPException(FakeResponse(413), "Request entity too large")
+        # Read the files like discord.py does, so a retry must rewind them
+        kwargs["payloads"] = [file.fp.read() for file in kwargs["files"]]
+        self.sent.append(kwargs)
+        return len(self.sent)
+
+class FakeResponse:
+    def __init__(self, status: int):
+        self.status = status
+        self.reason = "fake"
+
+def embed(text: str) -> discord.Embed:
+    return discord.Embed(title=text)
+
+def text_file(payload: bytes, name: str = "doc.txt") -> discord.File:
+    return discord.File(io.BytesIO(payload), filename=name)
+
+def test_pack_keeps_embeds_with_their_files_within_limits():
+    embeds = [embed(f"doc {i}") for i in range(MAX_EMBEDS + 3)]
+    files = [text_file(b"x" * 10, f"{i}.txt") for i in range(MAX_EMBEDS + 3)]
+    messages = pack_messages(embeds, files, content="intestazione")
+    assert [len(m.embeds) for m in messages] == [MAX_EMBEDS, 3]
+    assert [len(m.files) for m in messages] == [MAX_EMBEDS, 3]
+    assert messages[0].content == "intestazione"
+    assert messages[1].files[0].filename == f"{MAX_EMBEDS}.txt"
+
+def test_pack_splits_on_upload_bytes():
+    half = MAX_UPLOAD_BYTES // 2 + 1
+    messages = pack_messages(files=[text_file(b"a" * half), text_file(b"b" * half)])
+    assert [m.upload_bytes for m in messages] == [half, half]
+
+def test_pack_measures_files_from_their_current_position():
+    fp = io.BytesIO(b"header" + b"z" * 100)
+    fp.seek(6)
+    [message] = pack_messages(files=[discord.File(fp, filename="tail.txt")])
+    assert message.upload_bytes == 100
+
+def test_concurrent_requests_are_merged():
+    async def scenario():
+        scheduler = SendScheduler()
+        channel = FakeChannel()
+        results = await asyncio.gather(*(
+            scheduler.send(channel, embeds=[embed(f"utente {i}")], files=[text_file(b"ok")])
+            for i in range(3)
+        ))
+        await scheduler.close()
+        return channel, results
+
+    channel, results = asyncio.run(scenario())
+    assert len(channel.sent) == 1
+    assert len(channel.sent[0]["embeds"]) == 3
+    assert results == [[1], [1], [1]]
+
+def test_failed_merged_send_is_retried_per_request():
+    async def scenario():
+        scheduler = SendScheduler()
+        # Refuse any message carrying the oversized file, as Discord would with a 413
+        channel = FakeChannel(fail=lambda kwargs: any(file.filename == "big.txt" for file in kwargs["files"]))
+        results = await asyncio.gather(
+            scheduler.send(channel, embeds=[embed("a")], files=[text_file(b"primo", "a.txt")]),
+            scheduler.send(channel, embeds=[embed("b")], files=[text_file(b"troppo", "big.txt")]),
+            scheduler.send(channel, embeds=[embed("c")], files=[text_file(b"terzo", "c.txt")]),
+            return_exceptions=True
+        )
+        await scheduler.close()
+        return channel, results
+
+    channel, results = asyncio.run(scenario())
+    assert results[0] == [1] and results[2] == [2]
+    assert isinstance(results[1], discord.HTTPException)
+    # The files were rewound after the failed merged attempt
+    assert [sent["payloads"] for sent in channel.sent] == [[b"primo"], [b"terzo"]]
+
+def test_lone_failure_is_not_retried():
+    async def scenario():
+        scheduler = SendScheduler()
+        channel = FakeChannel(fail=lambda kwargs: True)
+        with pytest.raises(discord.HTTPException):
+            await scheduler.send(channel, content="ciao")
+        await scheduler.close()
+        return channel
+
+    assert asyncio.run(scenario()).sent == []
+
+def test_followups_are_keyed_per_interaction_token():
+    async def scenario():
+        async with aiohttp.ClientSession() as session:
+            first = discord.Webhook.partial(42, "token-one", session=session)
+            second = discord.Webhook.partial(42, "token-two", session=session)
+            return route_key(first), route_key(second)
+
+    first, second = asyncio.run(scenario())
+    assert first != second
+    assert first == route_key_from_path("/api/v10/webhooks/42/token-one")
+    assert first == route_key_from_path("/api/v10/webhooks/42/token-one/messages/@original")
+    assert "token-one" not in first[1]
+
+def test_channel_paths_map_to_channel_keys():
+    assert route_key_from_path("/api/v10/channels/123/messages") == ("channels", "123")
+    assert route_key(FakeChannel(123)) == ("channels", "123")
+    assert route_key_from_path("/api/v10/users/@me") is None
+
+def test_close_fails_queued_and_in_flight_requests():
+    class HangingChannel(FakeChannel):
+        async def send(self, **kwargs):
+            await asyncio.sleep(3600)
+
+    async def scenario():
+        scheduler = SendScheduler()
+        channel = HangingChannel()
+        # Different content keeps them from merging: one in flight, one queued
+        sends = [
+            asyncio.ensure_future(scheduler.send(channel, content=f"messaggio {i}", coalesce=False))
+            for i in range(2)
+        ]
+        await asyncio.sleep(0.05)
+        await scheduler.close()
+        return await asyncio.wait_for(asyncio.gather(*sends, return_exceptions=True), 1)
+
+    results = asyncio.run(scenario())
+    assert [type(result) for result in results] == [RuntimeError, RuntimeError]
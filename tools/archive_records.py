@@ -0,0 +1,33 @@
+"""
+Move months older than ARCHIVE_AFTER_MONTHS to the cold archive (see
+models/archival.py) and create the upcoming monthly partitions.
+
+The maintenance cog does this on a timer; run it by hand to archive
+ahead of time or with a different age.
+
+    python -m tools.archive_records
+    python -m tools.archive_records --months 6
+"""
+import argparse
+import asyncio
+import logging
+from models.archival import ARCHIVE_AFTER_MONTHS, archive_old_records
+from models.partitions import maintain_partitions
+from utils.database import dispose_engine
+
+logger = logging.getLogger(__name__)
+
+async def main(months: int):
+    created = await maintain_partitions()
+    if created:
+        logger.info(f"Created partitions {created}")
+    archived = await archive_old_records(months)
+    logger.info(f"Archived {archived}" if archived else "Nothing old enough to archive")
+    await dispose_engine()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Archive old documents, inspections and sanctions")
+    parser.add_argument("--months", type=int, default=ARCHIVE_AFTER_MONTHS, help="Months to keep in the database")
+    args = parser.parse_args()
+    asyncio.run(main(args.months))
@@ -0,0 +1,82 @@
+"""
+Backfill compression for payloads written before it was enabled.
+
+Legacy inline rows are re-encoded through the CompressedBinary column type
+in committed keyset batches, then every raw blob in the local blob store
+small enough to be compressed is rewritten in compressed form. Values
+already compressed are skipped, so the tool can be re-run.
+
+    python -m tools.compress_payloads --batch-size 500
+"""
+import argparse
+import asyncio
+import logging
+import os
+from sqlalchemy import LargeBinary, select, type_coerce, update
+from utils.blob_store import COMPRESSED_SUFFIX, LocalBlobStore, get_blob_store
+from utils.compression import is_compressed
+from utils.database import dispose_engine, session_scope
+from models.repository import Document
+from models.activity import Inspection
+
+logger = logging.getLogger(__name__)
+
+async def compress_rows(model, batch_size: int) -> int:
+    # Read the stored bytes as they are, bypassing the decompressing column type
+    raw_content = type_coerce(model.__table__.c.content, LargeBinary)
+    compressed = 0
+    last_id = 0
+    while True:
+        async with session_scope() as session:
+            batch = (await session.execute(
+                select(model.id, raw_content)
+                .where(model.id > last_id, model.content.is_not(None))
+                .order_by(model.id)
+                .limit(batch_size)
+            )).all()
+            if not batch:
+                break
+
+            updates = [
+                {"id": row_id, "content": content}
+                for row_id, content in batch
+                if content and not is_compressed(content)
+            ]
+            if updates:
+                await session.execute(update(model), updates)
+
+        last_id = batch[-1][0]
+        compressed += len(updates)
+        logger.info(f"{model.__tablename__}: compressed {compressed} rows (last id {last_id})")
+    return compressed
+
+def compress_blobs(store: LocalBlobStore) -> int:
+    compressed = 0
+    for directory, _, filenames in os.walk(store.root):
+        for filename in filenames:
+            if filename.startswith(".") or filename.endswith(COMPRESSED_SUFFIX):
+                continue
+            if store.compress_existing(filename):
+                compressed += 1
+                if compressed % 1000 == 0:
+                    logger.info(f"Compressed {compressed} blobs")
+    return compressed
+
+async def main(batch_size: int):
+    for model in (Document, Inspection):
+        total = await compress_rows(model, batch_size)
+        logger.info(f"{model.__tablename__}: {total} inline payloads compressed")
+
+    store = get_blob_store()
+    if isinstance(store, LocalBlobStore):
+        total = await asyncio.to_thread(compress_blobs, store)
+        logger.info(f"{total} blobs compressed")
+
+    await dispose_engine()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Compress existing document and inspection payloads")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size))
@@ -0,0 +1,34 @@
+"""
+Apply pending schema migrations (see models/migrations.py).
+
+The bot also runs this at startup, so calling it by hand is only needed to
+upgrade ahead of a deploy or to check where a database stands.
+
+    python -m tools.migrate
+    python -m tools.migrate --status
+"""
+import argparse
+import asyncio
+import logging
+from models.migrations import LATEST_VERSION, current_version, migrate_database
+from utils.database import dispose_engine, get_engine
+
+logger = logging.getLogger(__name__)
+
+async def main(status_only: bool):
+    if status_only:
+        async with get_engine().begin() as connection:
+            version = await connection.run_sync(current_version)
+        logger.info(f"Schema version {version}, latest {LATEST_VERSION}")
+    else:
+        applied = await migrate_database()
+        logger.info(f"Applied migrations {applied}" if applied else "Schema already up to date")
+
+    await dispose_engine()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Apply pending schema migrations")
+    parser.add_argument("--status", action="store_true", help="Only report the current version")
+    args = parser.parse_args()
+    asyncio.run(main(args.status))
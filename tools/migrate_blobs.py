@@ -0,0 +1,89 @@
+"""
+Move inline LargeBinary payloads out of the database into the blob store.
+
+Rows are processed in primary-key order, one committed batch at a time, so
+the tool can be interrupted and re-run safely: anything that already has a
+content_hash is skipped.
+
+    python -m tools.migrate_blobs --batch-size 500
+"""
+import argparse
+import asyncio
+import logging
+from sqlalchemy import select, update
+from utils.blob_store import get_blob_store
+from utils.database import dispose_engine, session_scope
+from models.repository import TEXT_MIME_TYPE
+from models.document import Document
+from models.activity import Inspection
+from models.migrations import migrate_database
+
+logger = logging.getLogger(__name__)
+
+def _guess_mime_type(content: bytes) -> str:
+    try:
+        content.decode("utf-8")
+        return TEXT_MIME_TYPE
+    except UnicodeDecodeError:
+        return "application/octet-stream"
+
+async def migrate_table(model, batch_size: int) -> int:
+    """
+    Move every inline payload of one model into the blob store.
+
+    Returns:
+        int: Number of rows migrated
+    """
+    store = get_blob_store()
+
+    migrated = 0
+    last_id = 0
+    while True:
+        async with session_scope() as session:
+            batch = (await session.execute(
+                select(model.id, model.content)
+                .where(
+                    model.id > last_id,
+                    model.content_hash.is_(None),
+                    model.content.is_not(None)
+                )
+                .order_by(model.id)
+                .limit(batch_size)
+            )).all()
+            if not batch:
+                break
+
+            updates = []
+            for row_id, content in batch:
+                ref = await store.put_async(content)
+                updates.append({
+                    "id": row_id,
+                    "content": None,
+                    "content_hash": ref.sha256,
+                    "content_size": ref.size,
+                    "mime_type": TEXT_MIME_TYPE if model is Document else _guess_mime_type(content)
+                })
+            await session.execute(update(model), updates)
+
+        last_id = batch[-1][0]
+        migrated += len(batch)
+        logger.info(f"{model.__tablename__}: migrated {migrated} rows (last id {last_id})")
+
+    return migrated
+
+async def main(batch_size: int):
+    # Adds the blob columns and makes content nullable if that has not happened yet
+    await migrate_database()
+
+    for model in (Document, Inspection):
+        total = await migrate_table(model, batch_size)
+        logger.info(f"{model.__tablename__}: done, {total} rows moved to the blob store")
+
+    await dispose_engine()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Move inline payloads into the blob store")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size))
@@ -0,0 +1,25 @@
+"""
+Recompute activity_summary from scratch.
+
+The table is kept up to date on every insert; rebuild it after restoring
+data by hand, after moving RECENT_VOLUME_EPOCH, or whenever the counters
+are in doubt. It is read from the timeline, so archived rows are counted,
+and rewritten in a single transaction.
+
+    python -m tools.rebuild_activity_summary
+"""
+import asyncio
+import logging
+from utils.database import dispose_engine, get_engine
+from models.summary import rebuild_activity_summary
+
+logger = logging.getLogger(__name__)
+
+async def rebuild():
+    async with get_engine().begin() as connection:
+        await connection.run_sync(rebuild_activity_summary)
+    await dispose_engine()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(rebuild())
@@ -0,0 +1,30 @@
+"""
+Fingerprint documents that have no duplicate-detection fingerprint yet.
+
+New documents are fingerprinted on insert, and migration 11 backfills
+documents uploaded before duplicate detection existed when upgrading. This
+tool does the same by hand, oldest first, so each copy is flagged against
+the original rather than the other way round. It works in committed batches
+and can be re-run. Run tools.rebuild_rollups afterwards so payroll picks up
+the duplicates it found.
+
+    python -m tools.rebuild_fingerprints --batch-size 500
+"""
+import argparse
+import asyncio
+import logging
+from utils.database import dispose_engine
+from models.backfills import fingerprint_documents
+
+logger = logging.getLogger(__name__)
+
+async def main(batch_size: int):
+    await fingerprint_documents(batch_size)
+    await dispose_engine()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Backfill duplicate-detection fingerprints")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size))
@@ -0,0 +1,25 @@
+"""
+Recompute author_daily_counts from the timeline and the document fingerprints.
+
+Run once by migration 12 when upgrading, and safe to run again at any time:
+the table is rebuilt in a single transaction. Counts come from tables that
+outlive archival, so archived days keep their totals. Duplicate counts come
+from the document fingerprints (see tools.rebuild_fingerprints) and from
+inspections whose payload was uploaded before.
+
+    python -m tools.rebuild_rollups
+"""
+import asyncio
+import logging
+from utils.database import dispose_engine
+from models.backfills import rebuild_author_daily_counts
+
+logger = logging.getLogger(__name__)
+
+async def rebuild():
+    await rebuild_author_daily_counts()
+    await dispose_engine()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(rebuild())
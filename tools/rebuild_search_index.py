@@ -0,0 +1,27 @@
+"""
+Index documents, inspections and sanctions that have no search entry yet.
+
+New rows are indexed on insert, and migration 13 backfills rows written
+before /cerca existed when upgrading. This tool does the same by hand, in
+committed batches, and can be re-run.
+
+    python -m tools.rebuild_search_index --batch-size 500
+"""
+import argparse
+import asyncio
+import logging
+from utils.database import dispose_engine
+from models.backfills import index_search_entries
+
+logger = logging.getLogger(__name__)
+
+async def main(batch_size: int):
+    await index_search_entries(batch_size)
+    await dispose_engine()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Backfill the full-text search index")
+    parser.add_argument("--batch-size", type=int, default=500)
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size))
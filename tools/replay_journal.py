@@ -0,0 +1,57 @@
+"""
+Apply a write journal to the database and exit.
+
+The bot replays its own journal when it starts; this is for journals no
+running process owns, such as a cluster's directory left behind when the
+number of clusters goes down, or to drain one while the bot is stopped.
+Entries the database refuses are kept whole in the journal's
+rejected.jsonl; once the cause is fixed, --rejected applies them again and
+keeps only those that still fail.
+
+    python -m tools.replay_journal data/journal/cluster-3
+    python -m tools.replay_journal --rejected data/journal
+"""
+import argparse
+import asyncio
+import logging
+from utils.database import dispose_engine
+from utils.journal import Journal, JournalEntry, read_rejected, write_rejected
+from models.repository import apply_journal_entries
+
+logger = logging.getLogger(__name__)
+
+async def retry_rejected(journal: Journal):
+    records = read_rejected(journal.path)
+    still_rejected = []
+    for record in records:
+        entry = JournalEntry.from_record(record)
+        try:
+            await apply_journal_entries([entry])
+            logger.info(f"Applied rejected entry {entry.seq} ({entry.kind})")
+        except Exception as e:
+            logger.error(f"Entry {entry.seq} ({entry.kind}) still rejected: {e}")
+            still_rejected.append({**record, "error": repr(e)})
+    write_rejected(journal.path, still_rejected)
+    logger.info(f"{len(records) - len(still_rejected)} of {len(records)} rejected entries applied")
+
+async def main(path: str, rejected: bool):
+    # Holding the journal's lock keeps a running bot from using it meanwhile
+    journal = Journal(path)
+    journal.open()
+    if rejected:
+        await retry_rejected(journal)
+    else:
+        logger.info(f"Replaying {journal.pending} entries from {path}")
+        journal.start(apply_journal_entries)
+        await journal.drain()
+        logger.info(f"Journal {path} drained: {journal.stats()}")
+    await journal.close()
+    await dispose_engine()
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser(description="Apply a write journal to the database")
+    parser.add_argument("path", help="journal directory")
+    parser.add_argument("--rejected", action="store_true", help="apply the entries in rejected.jsonl again")
+    args = parser.parse_args()
+    asyncio.run(main(args.path, args.rejected))
@@ -0,0 +1,75 @@
+import bisect
+import logging
+from typing import Dict, Iterable, List
+import discord
+from discord import app_commands
+
+logger = logging.getLogger(__name__)
+
+class PrefixIndex:
+    """
+    Case-insensitive prefix lookup over a set of names.
+
+    Keys are kept casefolded in a sorted list, so a lookup is one bisect
+    followed by a walk over the matching run; no database round trip.
+    Names that differ only by case share a key and are all returned.
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        self._keys: List[str] = []
+        self._names: Dict[str, List[str]] = {}
+        self._count = 0
+        self.update(names)
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._names.get(name.casefold(), ())
+
+    def _insert(self, name: str) -> bool:
+        """Add `name` under its key; False if it was already there."""
+        key = name.casefold()
+        names = self._names.setdefault(key, [])
+        if name in names:
+            return False
+        bisect.insort(names, name)
+        self._count += 1
+        return True
+
+    def add(self, name: str):
+        new_key = name.casefold() not in self._names
+        if self._insert(name) and new_key:
+            bisect.insort(self._keys, name.casefold())
+
+    def update(self, names: Iterable[str]):
+        keys = len(self._names)
+        for name in names:
+            self._insert(name)
+        if len(self._names) != keys:
+            self._keys = sorted(self._names)
+
+    def search(self, prefix: str, limit: int = 25) -> List[str]:
+        """
+        Return up to `limit` names starting with `prefix`, in alphabetical order.
+        """
+        key = prefix.casefold()
+        start = bisect.bisect_left(self._keys, key)
+        results = []
+        for candidate in self._keys[start:start + limit]:
+            if not candidate.startswith(key):
+                break
+            results.extend(self._names[candidate])
+            if len(results) >= limit:
+                return results[:limit]
+        return results
+
+# Distinct activity names across documents, inspections and sanctions,
+# warmed in DocBot.setup_hook and extended by every insert
+activity_names = PrefixIndex()
+
+async def activity_autocomplete(interaction: discord.Interaction, current: str) -> List[app_commands.Choice[str]]:
+    return [
+        app_commands.Choice(name=name, value=name)
+        for name in activity_names.search(current)
+    ]
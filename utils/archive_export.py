@@ -0,0 +1,316 @@
+import asyncio
+import json
+import logging
+import mimetypes
+import os
+import tarfile
+import tempfile
+import time
+import zipfile
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import AsyncIterator, Iterator, List, Optional
+from models.activity import Inspection, Sanction
+from models.document import Document
+from models.repository import load_content, stream_activity
+from utils.blob_store import get_blob_store
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("zip", "tar.gz")
+MANIFEST_NAME = "manifest.json"
+CHUNK_SIZE = 1024 * 1024
+# Parts up to this size stay in memory, larger ones roll over to a temp file
+SPOOL_THRESHOLD = int(os.environ.get("EXPORT_SPOOL_THRESHOLD", 1024 * 1024))
+# Headroom left under the upload limit for archive headers, compressor
+# buffers and the multipart envelope
+PART_MARGIN = 256 * 1024
+
+class _ChunkReader:
+    """
+    Minimal file-like reader over an iterator of byte chunks, so tarfile
+    can copy a payload without it ever being joined in memory.
+    """
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self.chunks = chunks
+        self.pending = b""
+
+    def read(self, size: int = -1) -> bytes:
+        while size < 0 or len(self.pending) < size:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                break
+            self.pending += chunk
+        if size < 0:
+            size = len(self.pending)
+        data, self.pending = self.pending[:size], self.pending[size:]
+        return data
+
+def _view_chunks(view: memoryview) -> Iterator[bytes]:
+    for start in range(0, len(view), CHUNK_SIZE):
+        yield bytes(view[start:start + CHUNK_SIZE])
+
+@dataclass
+class ArchivePart:
+    """One finished archive, rewound and ready to upload. Close it when done."""
+    number: int
+    filename: str
+    file: tempfile.SpooledTemporaryFile
+    size: int
+    records: int
+
+    def close(self):
+        self.file.close()
+
+@dataclass
+class ExportStats:
+    documents: int = 0
+    inspections: int = 0
+    sanctions: int = 0
+    payload_bytes: int = 0
+    parts: int = 0
+
+    @property
+    def records(self) -> int:
+        return self.documents + self.inspections + self.sanctions
+
+def _spool() -> tempfile.SpooledTemporaryFile:
+    return tempfile.SpooledTemporaryFile(max_size=SPOOL_THRESHOLD)
+
+@dataclass
+class _PartWriter:
+    """
+    An archive being filled. The manifest records of its entries are
+    spooled as serialized JSON next to it, not kept as objects.
+    """
+    number: int
+    fmt: str
+    file: tempfile.SpooledTemporaryFile = field(default_factory=_spool)
+    manifest: tempfile.SpooledTemporaryFile = field(default_factory=_spool)
+    records: int = 0
+    entries: int = 0
+
+    def __post_init__(self):
+        if self.fmt == "zip":
+            self.archive = zipfile.ZipFile(self.file, "w", compression=zipfile.ZIP_DEFLATED)
+        else:
+            self.archive = tarfile.open(fileobj=self.file, mode="w:gz")
+
+    @property
+    def size(self) -> int:
+        return self.file.tell()
+
+    @property
+    def manifest_bytes(self) -> int:
+        return self.manifest.tell()
+
+    def add_record(self, record: dict):
+        separator = b",\n  " if self.records else b"\n  "
+        self.manifest.write(separator + json.dumps(record, ensure_ascii=False).encode("utf-8"))
+        self.records += 1
+
+    def write(self, name: str, size: int, chunks: Iterator[bytes]):
+        self.entries += 1
+        if self.fmt == "zip":
+            with self.archive.open(name, "w", force_zip64=size > zipfile.ZIP64_LIMIT) as target:
+                for chunk in chunks:
+                    target.write(chunk)
+        else:
+            info = tarfile.TarInfo(name)
+            info.size = size
+            info.mtime = int(time.time())
+            self.archive.addfile(info, _ChunkReader(chunks))
+
+    def finish(self, header: dict) -> int:
+        """
+        Write manifest.json (`header` plus the spooled records) and close
+        the archive.
+
+        Returns:
+            int: Size of the finished archive in bytes
+        """
+        head = json.dumps(header, ensure_ascii=False)[:-1].encode("utf-8") + b', "records": ['
+        tail = b"\n]}\n" if self.records else b"]}\n"
+        records_bytes = self.manifest_bytes
+        self.manifest.seek(0)
+
+        def chunks() -> Iterator[bytes]:
+            yield head
+            while chunk := self.manifest.read(CHUNK_SIZE):
+                yield chunk
+            yield tail
+
+        self.write(MANIFEST_NAME, len(head) + records_bytes + len(tail), chunks())
+        self.manifest.close()
+        self.archive.close()
+        size = self.file.tell()
+        self.file.seek(0)
+        return size
+
+def _sanitize(value: str) -> str:
+    return "".join(c for c in value if c.isalnum() or c in "._-")
+
+def _entry_name(row) -> str:
+    if isinstance(row, Document):
+        return f"documenti/{row.id}_{_sanitize(row.context[:30].replace(' ', '_'))}.txt"
+    extension = mimetypes.guess_extension((row.mime_type or "").split(";")[0].strip()) or ".bin"
+    return f"ispezioni/{row.id}{extension}"
+
+def _record(row) -> dict:
+    record = {
+        "id": row.id,
+        "author_id": row.author_id,
+        "author_name": row.author_name,
+        "created_at": row.created_at.isoformat() if row.created_at else None,
+    }
+    if isinstance(row, Document):
+        record.update(kind="document", context=row.context, mime_type=row.mime_type)
+    elif isinstance(row, Inspection):
+        record.update(kind="inspection", mime_type=row.mime_type)
+    else:
+        record.update(kind="sanction", reason=row.reason, sanction_text=row.sanction_text)
+    return record
+
+class ActivityExporter:
+    """
+    Builds the archive of an activity's full history as a sequence of parts.
+
+    Rows are read through `stream_activity` and each payload is written
+    straight from the blob store into the current part, a spooled temp
+    file, so memory stays flat however large the activity is. A new part
+    is started whenever the next entry would push the current one over
+    `part_limit`; payloads too big for any part are split into numbered
+    chunks (`name.001`, `name.002`, ...) that are concatenated to restore
+    the original file.
+
+    Every part is a complete archive with its own manifest.json listing
+    the records it holds; the manifest of the last part also carries the
+    totals and the number of parts.
+    """
+
+    def __init__(self, activity: str, fmt: str = "zip", part_limit: int = 10 * 1024 * 1024):
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown archive format {fmt!r}")
+        self.activity = activity
+        self.fmt = fmt
+        self.budget = max(part_limit - PART_MARGIN, PART_MARGIN)
+        # Largest piece of a payload stored as one entry, leaving room for the manifest
+        self.chunk_limit = self.budget // 2
+        self.generated_at = datetime.now(timezone.utc)
+        self.stats = ExportStats()
+        self._part: Optional[_PartWriter] = None
+
+    def _filename(self, number: int) -> str:
+        stamp = self.generated_at.strftime("%Y%m%d_%H%M%S")
+        return f"{_sanitize(self.activity)}_{stamp}_parte{number:03d}.{self.fmt}"
+
+    def _manifest(self, part: _PartWriter, last: bool) -> dict:
+        manifest = {
+            "activity": self.activity,
+            "generated_at": self.generated_at.isoformat(),
+            "format": self.fmt,
+            "part": part.number,
+            "last_part": last,
+        }
+        if last:
+            manifest["parts"] = part.number
+            manifest["totals"] = {
+                "documents": self.stats.documents,
+                "inspections": self.stats.inspections,
+                "sanctions": self.stats.sanctions,
+                "payload_bytes": self.stats.payload_bytes,
+            }
+        return manifest
+
+    def _close_part(self, last: bool) -> ArchivePart:
+        part = self._part
+        self._part = None
+        size = part.finish(self._manifest(part, last))
+        self.stats.parts = part.number
+        logger.debug(
+            "Finished export part %d of %s: %d bytes, %d records",
+            part.number, self.activity, size, part.records
+        )
+        return ArchivePart(part.number, self._filename(part.number), part.file, size, part.records)
+
+    def _room_for(self, size: int) -> bool:
+        return self._part.size + size + self._part.manifest_bytes + 1024 <= self.budget
+
+    def _add(self, record: dict, name: Optional[str], view: Optional[memoryview]) -> List[ArchivePart]:
+        """
+        Write one record (and its payload, if any) and return the parts it
+        filled up. Runs in a worker thread.
+        """
+        finished = []
+        if self._part is None:
+            self._part = _PartWriter(1, self.fmt)
+
+        if view is None:
+            if not self._room_for(0) and self._part.entries:
+                finished.append(self._close_part(last=False))
+                self._part = _PartWriter(finished[-1].number + 1, self.fmt)
+            self._part.add_record(record)
+            return finished
+
+        record["size"] = len(view)
+        pieces = [(name, view)]
+        if len(view) > self.chunk_limit:
+            pieces = [
+                (f"{name}.{index:03d}", view[start:start + self.chunk_limit])
+                for index, start in enumerate(range(0, len(view), self.chunk_limit), 1)
+            ]
+            record["chunks"] = [piece_name for piece_name, _ in pieces]
+
+        for index, (piece_name, piece) in enumerate(pieces):
+            if not self._room_for(len(piece)) and self._part.entries:
+                finished.append(self._close_part(last=False))
+                self._part = _PartWriter(finished[-1].number + 1, self.fmt)
+            self._part.write(piece_name, len(piece), _view_chunks(piece))
+            if index == 0:
+                self._part.add_record(record)
+        return finished
+
+    def _add_blob(self, record: dict, name: str, sha256: str) -> List[ArchivePart]:
+        with get_blob_store().open(sha256) as view:
+            return self._add(record, name, view)
+
+    def _finish(self) -> ArchivePart:
+        if self._part is None:
+            self._part = _PartWriter(1, self.fmt)
+        return self._close_part(last=True)
+
+    async def parts(self) -> AsyncIterator[ArchivePart]:
+        """
+        Yield the finished parts in order, the last one after every row has
+        been read. The database cursor stays open while the caller handles
+        a part, so upload it promptly.
+        """
+        try:
+            async for row in stream_activity(self.activity):
+                record = _record(row)
+                if isinstance(row, Sanction):
+                    self.stats.sanctions += 1
+                    finished = await asyncio.to_thread(self._add, record, None, None)
+                else:
+                    if isinstance(row, Document):
+                        self.stats.documents += 1
+                    else:
+                        self.stats.inspections += 1
+                    name = _entry_name(row)
+                    record.update(file=name, sha256=row.content_hash)
+                    if row.content_hash:
+                        finished = await asyncio.to_thread(self._add_blob, record, name, row.content_hash)
+                    else:
+                        # Legacy inline payload, bounded by the old column size
+                        content = await load_content(row)
+                        finished = await asyncio.to_thread(self._add, record, name, memoryview(content))
+                    self.stats.payload_bytes += record["size"]
+                for part in finished:
+                    yield part
+            yield await asyncio.to_thread(self._finish)
+        finally:
+            if self._part is not None:
+                self._part.manifest.close()
+                self._part.file.close()
+                self._part = None
@@ -0,0 +1,244 @@
+import asyncio
+import hashlib
+import mmap
+import os
+import tempfile
+import logging
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import BinaryIO, Dict, Iterator, NamedTuple, Optional, Type
+from utils.compression import compress, decompress
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+COMPRESSED_SUFFIX = ".z"
+# Blobs larger than this are kept raw so they can be served straight from mmap
+BLOB_COMPRESS_MAX_BYTES = int(os.environ.get("BLOB_COMPRESS_MAX_BYTES", 4 * 1024 * 1024))
+
+class BlobRef(NamedTuple):
+    sha256: str
+    size: int
+
+class BlobNotFound(KeyError):
+    pass
+
+class BlobStore(ABC):
+    """
+    Content-addressed storage for document and inspection payloads.
+
+    Blobs are identified by the hex SHA-256 of their bytes, so storing the
+    same payload twice is a no-op and the database only keeps the hash.
+    """
+
+    @abstractmethod
+    def put(self, data: bytes) -> BlobRef:
+        ...
+
+    @abstractmethod
+    def put_file(self, fileobj: BinaryIO, sha256: Optional[str] = None) -> BlobRef:
+        ...
+
+    @abstractmethod
+    def exists(self, sha256: str) -> bool:
+        ...
+
+    @abstractmethod
+    @contextmanager
+    def open(self, sha256: str) -> Iterator[memoryview]:
+        ...
+
+    def read(self, sha256: str) -> bytes:
+        with self.open(sha256) as view:
+            return bytes(view)
+
+    async def put_async(self, data: bytes) -> BlobRef:
+        return await asyncio.to_thread(self.put, data)
+
+    async def put_file_async(self, fileobj: BinaryIO, sha256: Optional[str] = None) -> BlobRef:
+        return await asyncio.to_thread(self.put_file, fileobj, sha256)
+
+    async def read_async(self, sha256: str) -> bytes:
+        return await asyncio.to_thread(self.read, sha256)
+
+class LocalBlobStore(BlobStore):
+    """
+    Blob store backed by a local directory.
+
+    Files live under `root/ab/cd/abcd...` (two levels of two hex characters)
+    so no single directory grows past a few thousand entries. Writes go to a
+    temporary file in the target directory and are renamed into place, which
+    keeps concurrent writers of the same blob safe.
+
+    Blobs up to `compress_max_bytes` are stored compressed (with a `.z`
+    suffix) when that saves space; larger or incompressible blobs stay raw
+    and are read through mmap without copying.
+    """
+
+    def __init__(self, root: str, shard_depth: int = 2, compress_max_bytes: int = BLOB_COMPRESS_MAX_BYTES):
+        self.root = root
+        self.shard_depth = shard_depth
+        self.compress_max_bytes = compress_max_bytes
+        os.makedirs(root, exist_ok=True)
+
+    def path_for(self, sha256: str) -> str:
+        shards = [sha256[i * 2:i * 2 + 2] for i in range(self.shard_depth)]
+        return os.path.join(self.root, *shards, sha256)
+
+    def compressed_path_for(self, sha256: str) -> str:
+        return self.path_for(sha256) + COMPRESSED_SUFFIX
+
+    def exists(self, sha256: str) -> bool:
+        return os.path.exists(self.path_for(sha256)) or os.path.exists(self.compressed_path_for(sha256))
+
+    def put(self, data: bytes) -> BlobRef:
+        sha256 = hashlib.sha256(data).hexdigest()
+        if not self.exists(sha256):
+            self._store_bytes(sha256, data)
+        return BlobRef(sha256, len(data))
+
+    def put_file(self, fileobj: BinaryIO, sha256: Optional[str] = None) -> BlobRef:
+        """
+        Store the remaining contents of a file object.
+
+        Args:
+            fileobj (BinaryIO): Seekable source positioned at the start of the payload
+            sha256 (str): Digest if the caller already computed it while reading,
+                which lets duplicates be skipped without touching the data
+
+        Returns:
+            BlobRef: The hash and size of the stored blob
+        """
+        if sha256 and self.exists(sha256):
+            start = fileobj.tell()
+            size = fileobj.seek(0, os.SEEK_END) - start
+            fileobj.seek(start)
+            return BlobRef(sha256, size)
+
+        digest = hashlib.sha256()
+        size = 0
+        fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".incoming-")
+        try:
+            with os.fdopen(fd, "wb") as target:
+                while chunk := fileobj.read(CHUNK_SIZE):
+                    digest.update(chunk)
+                    target.write(chunk)
+                    size += len(chunk)
+                target.flush()
+                os.fsync(target.fileno())
+
+            actual = digest.hexdigest()
+            if sha256 and sha256 != actual:
+                raise ValueError(f"Blob digest mismatch: expected {sha256}, got {actual}")
+
+            if size <= self.compress_max_bytes:
+                with open(tmp_path, "rb") as handle:
+                    self._store_bytes(actual, handle.read())
+            else:
+                path = self.path_for(actual)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                os.replace(tmp_path, path)
+            return BlobRef(actual, size)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def compress_existing(self, sha256: str) -> bool:
+        """
+        Rewrite a raw blob in compressed form if that saves space.
+
+        Returns:
+            bool: True if the blob was compressed
+        """
+        path = self.path_for(sha256)
+        if not os.path.exists(path) or os.path.getsize(path) > self.compress_max_bytes:
+            return False
+
+        with open(path, "rb") as handle:
+            data = handle.read()
+        frame = compress(data)
+        if frame is data:
+            return False
+
+        # Write the compressed copy before removing the raw one so readers always find a file
+        self._write_atomic(self.compressed_path_for(sha256), frame)
+        os.unlink(path)
+        return True
+
+    def _store_bytes(self, sha256: str, data: bytes):
+        frame = compress(data) if len(data) <= self.compress_max_bytes else data
+        if frame is data:
+            self._write_atomic(self.path_for(sha256), data)
+        else:
+            self._write_atomic(self.compressed_path_for(sha256), frame)
+
+    def _write_atomic(self, path: str, data: bytes):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".incoming-")
+        try:
+            with os.fdopen(fd, "wb") as target:
+                target.write(data)
+                target.flush()
+                os.fsync(target.fileno())
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    @contextmanager
+    def open(self, sha256: str) -> Iterator[memoryview]:
+        """
+        Map a blob read-only and yield a memoryview over it.
+
+        Raw blobs are mapped without copying; compressed ones are decoded
+        into memory first. The view is only valid inside the with block;
+        copy it (or use read) if the bytes need to outlive it.
+        """
+        path = self.path_for(sha256)
+        try:
+            handle = open(path, "rb")
+        except FileNotFoundError:
+            try:
+                with open(self.compressed_path_for(sha256), "rb") as compressed:
+                    data = decompress(compressed.read())
+            except FileNotFoundError:
+                raise BlobNotFound(sha256) from None
+            yield memoryview(data)
+            return
+
+        with handle:
+            if os.fstat(handle.fileno()).st_size == 0:
+                yield memoryview(b"")
+                return
+            with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                view = memoryview(mapped)
+                try:
+                    yield view
+                finally:
+                    view.release()
+
+BACKENDS: Dict[str, Type[BlobStore]] = {
+    "local": LocalBlobStore,
+}
+
+_store: Optional[BlobStore] = None
+
+def get_blob_store() -> BlobStore:
+    """
+    Return the process-wide blob store configured from the environment.
+
+    BLOB_STORE_BACKEND selects an entry of BACKENDS (default "local") and
+    BLOB_STORE_PATH is passed to it as the storage root.
+    """
+    global _store
+    if _store is None:
+        backend = os.environ.get("BLOB_STORE_BACKEND", "local")
+        root = os.environ.get("BLOB_STORE_PATH", os.path.join("data", "blobs"))
+        _store = BACKENDS[backend](root)
+        logger.info(f"Using {backend} blob store at {root}")
+    return _store
+
+def set_blob_store(store: BlobStore):
+    global _store
+    _store = store
@@ -0,0 +1,139 @@
+import os
+import time
+import logging
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, NamedTuple, Optional, Set
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+READ_CACHE_MAX_BYTES = int(os.environ.get("READ_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+READ_CACHE_TTL = float(os.environ.get("READ_CACHE_TTL", 300))
+
+class _Entry(NamedTuple):
+    value: Any
+    size: int
+    expires: float
+    tag: Optional[Hashable]
+
+class ByteLRUCache:
+    """
+    LRU cache bounded by the total size of its values rather than their count.
+
+    Entries can carry a tag (the activity name) so every entry derived from
+    one activity can be dropped at once when it changes. Each tag also has a
+    generation number: a reader takes it before querying and passes it to
+    put, and the put is ignored if the tag was invalidated in between, so a
+    slow read can never re-insert data that a write already made stale.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.current_bytes = 0
+        self._entries: "OrderedDict[Hashable, _Entry]" = OrderedDict()
+        self._tags: Dict[Hashable, Set[Hashable]] = {}
+        self._generations: Dict[Hashable, int] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def generation(self, tag: Hashable) -> int:
+        return self._generations.get(tag, 0)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry.expires < time.monotonic():
+            self._remove(key)
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry.value
+
+    def put(self, key: Hashable, value: Any, size: int, tag: Optional[Hashable] = None, generation: Optional[int] = None):
+        """
+        Store `value`, accounting it as `size` bytes.
+
+        Args:
+            tag (Hashable): Group to invalidate the entry with
+            generation (int): Tag generation read before the value was loaded
+        """
+        if tag is not None and generation is not None and generation != self.generation(tag):
+            return
+        if size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key)
+        while self.current_bytes + size > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self.evictions += 1
+
+        self._entries[key] = _Entry(value, size, time.monotonic() + self.ttl, tag)
+        self.current_bytes += size
+        if tag is not None:
+            self._tags.setdefault(tag, set()).add(key)
+
+    def invalidate_tag(self, tag: Hashable):
+        self._generations[tag] = self.generation(tag) + 1
+        for key in self._tags.pop(tag, set()):
+            if key in self._entries:
+                self._remove(key, untag=False)
+                self.invalidations += 1
+
+    def clear(self):
+        self._entries.clear()
+        self._tags.clear()
+        self.current_bytes = 0
+
+    def _remove(self, key: Hashable, untag: bool = True):
+        entry = self._entries.pop(key)
+        self.current_bytes -= entry.size
+        if untag and entry.tag is not None:
+            keys = self._tags.get(entry.tag)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._tags[entry.tag]
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "invalidations": self.invalidations,
+        }
+
+# Shared by the activity read paths in models.repository
+read_cache = ByteLRUCache(READ_CACHE_MAX_BYTES, READ_CACHE_TTL)
+
+REGISTRY.gauge(
+    "docbot_read_cache_bytes", "Bytes held by the activity read cache",
+    callback=lambda: read_cache.current_bytes
+)
+REGISTRY.counter(
+    "docbot_read_cache_events_total", "Activity read cache hits, misses, evictions, expirations and invalidations",
+    ["event"],
+    callback=lambda: {
+        (event,): value
+        for event, value in read_cache.stats().items()
+        if event in ("hits", "misses", "evictions", "expirations", "invalidations")
+    }
+)
@@ -0,0 +1,237 @@
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from dataclasses import dataclass
+from multiprocessing.connection import wait
+from typing import Callable, Dict, List, Optional
+
+import aiohttp
+
+logger = logging.getLogger(__name__)
+
+# Total connections all workers may hold open against the database
+DB_POOL_BUDGET = int(os.getenv("DB_POOL_BUDGET", "20"))
+
+# Restart delay after a crash, doubled per consecutive crash up to the maximum
+RESTART_BACKOFF = float(os.getenv("CLUSTER_RESTART_BACKOFF", "1"))
+RESTART_BACKOFF_MAX = float(os.getenv("CLUSTER_RESTART_BACKOFF_MAX", "60"))
+# A worker that stayed up this long is considered healthy again
+STABLE_AFTER = float(os.getenv("CLUSTER_STABLE_AFTER", "60"))
+
+@dataclass(frozen=True)
+class ClusterSpec:
+    cluster_id: int
+    shard_ids: List[int]
+    shard_count: int
+    pool_size: int
+
+def plan_shards(shard_count: int, processes: int) -> List[List[int]]:
+    """
+    Split shards 0..shard_count-1 into contiguous, evenly sized ranges.
+
+    Args:
+        shard_count: Total number of shards
+        processes: Number of worker processes (capped at shard_count)
+
+    Returns:
+        list: One list of shard ids per process
+    """
+    processes = max(1, min(processes, shard_count))
+    base, extra = divmod(shard_count, processes)
+    ranges = []
+    start = 0
+    for index in range(processes):
+        size = base + (1 if index < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return ranges
+
+def split_pool_budget(budget: int, weights: List[int]) -> List[int]:
+    """
+    Share a connection budget across processes in proportion to their
+    shard counts. Every process gets at least one connection.
+
+    Args:
+        budget: Total connections available
+        weights: Shards run by each process
+
+    Returns:
+        list: Pool size per process, summing to exactly `budget`
+
+    Raises:
+        ValueError: The budget cannot give every process a connection
+    """
+    if budget < len(weights):
+        raise ValueError(f"DB_POOL_BUDGET {budget} is smaller than the {len(weights)} processes sharing it")
+
+    total = sum(weights)
+    sizes = [max(1, budget * weight // total) for weight in weights]
+    # Raising small shares to one may overshoot; take it back from the largest
+    while sum(sizes) > budget:
+        largest = max(range(len(sizes)), key=lambda i: sizes[i])
+        sizes[largest] -= 1
+    # Hand out what the rounding left over, largest shard ranges first
+    leftover = budget - sum(sizes)
+    for index in sorted(range(len(weights)), key=lambda i: -weights[i]):
+        if leftover <= 0:
+            break
+        sizes[index] += 1
+        leftover -= 1
+    return sizes
+
+def build_plan(shard_count: int, processes: int, pool_budget: int = DB_POOL_BUDGET) -> List[ClusterSpec]:
+    ranges = plan_shards(shard_count, processes)
+    pools = split_pool_budget(pool_budget, [len(shard_ids) for shard_ids in ranges])
+    return [
+        ClusterSpec(cluster_id=index, shard_ids=shard_ids, shard_count=shard_count, pool_size=pool_size)
+        for index, (shard_ids, pool_size) in enumerate(zip(ranges, pools))
+    ]
+
+async def fetch_recommended_shards(token: str, api_base: str = "https://discord.com/api/v10") -> int:
+    """
+    Ask Discord (GET /gateway/bot) how many shards the bot should run.
+    """
+    async with aiohttp.ClientSession() as session:
+        async with session.get(f"{api_base}/gateway/bot", headers={"Authorization": f"Bot {token}"}) as response:
+            response.raise_for_status()
+            data = await response.json()
+    return int(data["shards"])
+
+def run_cluster(spec: ClusterSpec, token: str):
+    """
+    Worker process entry point: run one DocBot over the shards in `spec`.
+    """
+    # Let the supervisor's terminate() shut the bot down gracefully
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+
+    # The pool size is read when the engine is configured, inside this process
+    os.environ["DB_POOL_SIZE"] = str(spec.pool_size)
+    os.environ["DB_MAX_OVERFLOW"] = "0"
+    # A journal belongs to one process; with fewer clusters after a restart, replay
+    # leftover directories with tools.replay_journal
+    journal_root = os.environ.get("JOURNAL_PATH", os.path.join("data", "journal"))
+    os.environ["JOURNAL_PATH"] = os.path.join(journal_root, f"cluster-{spec.cluster_id}")
+    metrics_port = os.getenv("METRICS_PORT")
+
+    from utils.log_pipeline import configure_logging
+    configure_logging()
+
+    if metrics_port:
+        from main import start_metrics_server
+        start_metrics_server(int(metrics_port) + spec.cluster_id)
+
+    from bot import DocBot
+    logger.info(f"Cluster {spec.cluster_id} starting shards {spec.shard_ids} of {spec.shard_count} (pool {spec.pool_size})")
+    bot = DocBot(shard_ids=spec.shard_ids, shard_count=spec.shard_count)
+    bot.run(token, log_handler=None)
+
+class Supervisor:
+    """
+    Run one process per ClusterSpec and restart any that exit while the
+    supervisor is running, with exponential backoff per cluster.
+    """
+
+    def __init__(
+        self,
+        specs: List[ClusterSpec],
+        token: str,
+        target: Callable = run_cluster,
+        backoff: float = RESTART_BACKOFF,
+        max_backoff: float = RESTART_BACKOFF_MAX,
+        stable_after: float = STABLE_AFTER,
+    ):
+        self.specs = {spec.cluster_id: spec for spec in specs}
+        self.token = token
+        self.target = target
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.stable_after = stable_after
+        self.processes: Dict[int, multiprocessing.Process] = {}
+        self.restarts: Dict[int, int] = {cluster_id: 0 for cluster_id in self.specs}
+        self._started_at: Dict[int, float] = {}
+        self._crashes: Dict[int, int] = {cluster_id: 0 for cluster_id in self.specs}
+        self._pending: Dict[int, float] = {}
+        self._context = multiprocessing.get_context("spawn")
+        self._stopping = False
+
+    def _spawn(self, cluster_id: int):
+        spec = self.specs[cluster_id]
+        process = self._context.Process(
+            target=self.target, args=(spec, self.token), name=f"docbot-cluster-{cluster_id}"
+        )
+        process.start()
+        self.processes[cluster_id] = process
+        self._started_at[cluster_id] = time.monotonic()
+        logger.info(f"Started cluster {cluster_id} (pid {process.pid}) with shards {spec.shard_ids}")
+
+    def _handle_exit(self, cluster_id: int):
+        process = self.processes.pop(cluster_id)
+        process.join()
+        uptime = time.monotonic() - self._started_at.pop(cluster_id)
+        if uptime >= self.stable_after:
+            self._crashes[cluster_id] = 0
+        delay = min(self.max_backoff, self.backoff * 2 ** self._crashes[cluster_id])
+        self._crashes[cluster_id] += 1
+        self._pending[cluster_id] = time.monotonic() + delay
+        logger.warning(
+            f"Cluster {cluster_id} (pid {process.pid}) exited with code {process.exitcode} "
+            f"after {uptime:.1f}s; restarting in {delay:.1f}s"
+        )
+
+    def start(self):
+        for cluster_id in self.specs:
+            self._spawn(cluster_id)
+
+    def poll(self, timeout: float = 1.0):
+        """
+        Wait up to `timeout` for a worker to exit, then restart the ones
+        whose backoff has elapsed.
+        """
+        sentinels = {process.sentinel: cluster_id for cluster_id, process in self.processes.items()}
+        if self._pending:
+            timeout = max(0.0, min(timeout, min(self._pending.values()) - time.monotonic()))
+        for sentinel in wait(list(sentinels), timeout):
+            self._handle_exit(sentinels[sentinel])
+
+        if self._stopping:
+            return
+        now = time.monotonic()
+        for cluster_id, due in list(self._pending.items()):
+            if due <= now:
+                del self._pending[cluster_id]
+                self.restarts[cluster_id] += 1
+                self._spawn(cluster_id)
+
+    def run(self):
+        """
+        Start every cluster and supervise until SIGINT/SIGTERM.
+        """
+        def request_stop(signum, frame):
+            self._stopping = True
+
+        signal.signal(signal.SIGINT, request_stop)
+        signal.signal(signal.SIGTERM, request_stop)
+
+        self.start()
+        while not self._stopping:
+            self.poll()
+        self.stop()
+
+    def stop(self, timeout: float = 30.0):
+        """
+        Ask every worker to shut down, killing the ones that do not exit
+        within `timeout` seconds.
+        """
+        self._stopping = True
+        self._pending.clear()
+        for process in self.processes.values():
+            process.terminate()
+        deadline = time.monotonic() + timeout
+        for process in self.processes.values():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                process.kill()
+                process.join()
+        self.processes.clear()
@@ -0,0 +1,186 @@
+import gzip
+import json
+import logging
+import os
+import tempfile
+import threading
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_PATH = os.environ.get("ARCHIVE_PATH", os.path.join("data", "archive"))
+INDEX_FILE = "index.json"
+
+def _encode(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+class SliceWriter:
+    """
+    Streams one month of one table into a gzip'd JSON-lines file.
+
+    Nothing is visible to readers until commit() renames the file into
+    place and records it in the index; abort() throws the rows away.
+    """
+
+    def __init__(self, archive: "ColdArchive", table: str, month: date, activity_column: str):
+        self.archive = archive
+        self.table = table
+        self.month = month
+        self.activity_column = activity_column
+        directory = os.path.join(archive.root, table)
+        os.makedirs(directory, exist_ok=True)
+        fd, self.tmp_path = tempfile.mkstemp(dir=directory, prefix=".incoming-")
+        self._raw = os.fdopen(fd, "wb")
+        self._file = gzip.GzipFile(fileobj=self._raw, mode="wb")
+        self.rows = 0
+        self.min_id: Optional[int] = None
+        self.max_id: Optional[int] = None
+        self.activities: Dict[str, int] = {}
+
+    def write(self, rows: Iterable[Dict[str, Any]]):
+        for row in rows:
+            line = json.dumps({key: _encode(value) for key, value in row.items()}, ensure_ascii=False)
+            self._file.write(line.encode("utf-8") + b"\n")
+            self.rows += 1
+            self.min_id = row["id"] if self.min_id is None else min(self.min_id, row["id"])
+            self.max_id = row["id"] if self.max_id is None else max(self.max_id, row["id"])
+            activity = row[self.activity_column]
+            self.activities[activity] = self.activities.get(activity, 0) + 1
+
+    def commit(self) -> str:
+        """
+        Make the slice durable and visible.
+
+        Returns:
+            str: Path of the archive file, relative to the archive root
+        """
+        self._file.close()
+        self._raw.flush()
+        os.fsync(self._raw.fileno())
+        self._raw.close()
+        # A month can be archived more than once (a crash after writing, before deleting)
+        stamp = datetime.now().strftime("%Y%m%d%H%M%S%f")
+        name = os.path.join(self.table, f"{self.month:%Y-%m}-{stamp}.jsonl.gz")
+        os.replace(self.tmp_path, os.path.join(self.archive.root, name))
+        self.archive._record_slice(name, {
+            "table": self.table,
+            "month": f"{self.month:%Y-%m}",
+            "rows": self.rows,
+            "min_id": self.min_id,
+            "max_id": self.max_id,
+            "activities": self.activities,
+        })
+        return name
+
+    def abort(self):
+        self._file.close()
+        self._raw.close()
+        if os.path.exists(self.tmp_path):
+            os.unlink(self.tmp_path)
+
+class ColdArchive:
+    """
+    Old rows moved out of the database, one gzip'd JSON-lines file per
+    table and month under `root/<table>/`.
+
+    index.json lists every file with its row count, id range and the
+    activities it holds, so a reader can tell from the index alone
+    whether an activity has anything archived. Only the rows are archived;
+    payloads stay in the blob store, which is content-addressed and never
+    pruned. The index is rewritten atomically and re-read whenever another
+    process has changed it.
+    """
+
+    def __init__(self, root: str = ARCHIVE_PATH):
+        self.root = root
+        self._lock = threading.Lock()
+        self._index: Dict[str, dict] = {}
+        self._index_mtime: Optional[float] = None
+
+    def _index_path(self) -> str:
+        return os.path.join(self.root, INDEX_FILE)
+
+    def index(self) -> Dict[str, dict]:
+        with self._lock:
+            try:
+                mtime = os.stat(self._index_path()).st_mtime
+            except FileNotFoundError:
+                return {}
+            if mtime != self._index_mtime:
+                with open(self._index_path(), encoding="utf-8") as f:
+                    self._index = json.load(f)
+                self._index_mtime = mtime
+            return self._index
+
+    def _record_slice(self, name: str, entry: dict):
+        index = dict(self.index())
+        index[name] = entry
+        with self._lock:
+            os.makedirs(self.root, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=self.root, prefix=".index-")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(index, f, indent=2, ensure_ascii=False)
+            os.replace(tmp_path, self._index_path())
+            self._index = index
+            self._index_mtime = os.stat(self._index_path()).st_mtime
+
+    def open_slice(self, table: str, month: date, activity_column: str) -> SliceWriter:
+        return SliceWriter(self, table, month, activity_column)
+
+    def has_activity(self, table: str, activity: str) -> bool:
+        return any(
+            entry["table"] == table and activity in entry["activities"]
+            for entry in self.index().values()
+        )
+
+    def months(self, table: str, activity: Optional[str] = None) -> List[str]:
+        """
+        Months ("YYYY-MM") with archived rows of a table, optionally only
+        those holding rows of one activity, oldest first. Index only.
+        """
+        return sorted({
+            entry["month"] for entry in self.index().values()
+            if entry["table"] == table and (activity is None or activity in entry["activities"])
+        })
+
+    def iter_rows(self, table: str, activity: Optional[str] = None, activity_column: Optional[str] = None) -> Iterator[dict]:
+        """
+        Yield the archived rows of a table, oldest month first, optionally
+        only those of one activity. Rows archived twice are yielded once.
+        """
+        for month in self.months(table, activity):
+            yield from self.iter_month(table, month, activity, activity_column)
+
+    def iter_month(self, table: str, month: str, activity: Optional[str] = None, activity_column: Optional[str] = None) -> Iterator[dict]:
+        """
+        Like iter_rows, for the slices of a single month only. A row is
+        archived in the slice of its own month, so this is all of them.
+        """
+        files = sorted(
+            name for name, entry in self.index().items()
+            if entry["table"] == table and entry["month"] == month
+            and (activity is None or activity in entry["activities"])
+        )
+        seen = set()
+        for name in files:
+            with gzip.open(os.path.join(self.root, name), "rb") as f:
+                for line in f:
+                    row = json.loads(line)
+                    if activity is not None and row[activity_column] != activity:
+                        continue
+                    if row["id"] in seen:
+                        continue
+                    seen.add(row["id"])
+                    yield row
+
+_archive: Optional[ColdArchive] = None
+
+def get_cold_archive() -> ColdArchive:
+    global _archive
+    if _archive is None:
+        _archive = ColdArchive(ARCHIVE_PATH)
+        logger.info(f"Using cold archive at {ARCHIVE_PATH}")
+    return _archive
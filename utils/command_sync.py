@@ -0,0 +1,72 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import Optional
+from discord import app_commands
+
+logger = logging.getLogger(__name__)
+
+# "changed" syncs only when the command tree differs from the last sync,
+# "always" syncs on every ready (the old behaviour), "never" leaves it to an operator
+COMMAND_SYNC = os.getenv("COMMAND_SYNC", "changed")
+COMMAND_SYNC_STATE = os.getenv("COMMAND_SYNC_STATE", "data/command_sync.json")
+
+def tree_fingerprint(tree: app_commands.CommandTree) -> str:
+    """
+    Hash the global commands exactly as they would be sent to Discord.
+    """
+    payload = sorted(
+        (command.to_dict(tree) for command in tree.get_commands()),
+        key=lambda data: (data.get("type", 1), data["name"])
+    )
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+def _load_state(path: str) -> dict:
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+
+def _save_state(path: str, state: dict):
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".command_sync-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, path)
+
+async def sync_commands(
+    tree: app_commands.CommandTree,
+    application_id: int,
+    mode: str = COMMAND_SYNC,
+    state_path: str = COMMAND_SYNC_STATE,
+) -> Optional[int]:
+    """
+    Sync the global command tree if its fingerprint changed since the last
+    successful sync for this application.
+
+    Args:
+        tree: The bot's command tree
+        application_id: Fingerprints are stored per application
+        mode: "changed", "always" or "never"
+        state_path: JSON file holding the last synced fingerprints
+
+    Returns:
+        int: Number of commands synced, or None when the sync was skipped
+    """
+    if mode == "never":
+        return None
+
+    fingerprint = tree_fingerprint(tree)
+    state = _load_state(state_path)
+    if mode != "always" and state.get(str(application_id)) == fingerprint:
+        logger.info(f"Command tree unchanged ({fingerprint[:12]}), skipping sync")
+        return None
+
+    synced = await tree.sync()
+    state[str(application_id)] = fingerprint
+    _save_state(state_path, state)
+    return len(synced)
@@ -0,0 +1,89 @@
+import os
+import struct
+import zlib
+import logging
+from functools import lru_cache
+from typing import Optional
+
+try:
+    import zstandard
+except ImportError:  # optional dependency, zlib is always available
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Frame layout: MAGIC | algorithm (1 byte) | dictionary id (4 bytes, 0 = none) | payload
+MAGIC = b"\x89DBZ"
+HEADER = struct.Struct(">4sBI")
+ZLIB = 1
+ZSTD = 2
+
+COMPRESSION_LEVEL = int(os.environ.get("COMPRESSION_LEVEL", 6))
+COMPRESSION_DICT_DIR = os.environ.get("COMPRESSION_DICT_DIR", os.path.join("data", "dicts"))
+COMPRESSION_DICT_ID = int(os.environ.get("COMPRESSION_DICT_ID", 0))
+# Keep the compressed form only if it saves at least this fraction
+MIN_SAVING = 0.1
+
+def default_algorithm() -> int:
+    return ZSTD if zstandard is not None else ZLIB
+
+@lru_cache(maxsize=None)
+def load_dictionary(dict_id: int) -> bytes:
+    path = os.path.join(COMPRESSION_DICT_DIR, f"{dict_id}.dict")
+    with open(path, "rb") as handle:
+        return handle.read()
+
+def is_compressed(data: bytes) -> bool:
+    return len(data) >= HEADER.size and bytes(data[:4]) == MAGIC
+
+def compress(data: bytes, algorithm: Optional[int] = None, dict_id: Optional[int] = None) -> bytes:
+    """
+    Compress `data` into a self-describing frame.
+
+    Args:
+        data (bytes): Raw payload
+        algorithm (int): ZLIB or ZSTD, defaults to zstd when installed
+        dict_id (int): Trained dictionary to use, defaults to COMPRESSION_DICT_ID
+
+    Returns:
+        bytes: The frame, or `data` unchanged if compressing does not pay off
+    """
+    algorithm = algorithm or default_algorithm()
+    dict_id = COMPRESSION_DICT_ID if dict_id is None else dict_id
+    dictionary = load_dictionary(dict_id) if dict_id else None
+
+    if algorithm == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is not installed")
+        zdict = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        payload = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL, dict_data=zdict).compress(data)
+    else:
+        compressor = zlib.compressobj(COMPRESSION_LEVEL, zdict=dictionary) if dictionary else zlib.compressobj(COMPRESSION_LEVEL)
+        payload = compressor.compress(data) + compressor.flush()
+
+    frame = HEADER.pack(MAGIC, algorithm, dict_id) + payload
+    if len(frame) > len(data) * (1 - MIN_SAVING):
+        return data
+    return frame
+
+def decompress(data: bytes) -> bytes:
+    """
+    Decode a frame produced by compress; anything without the header is
+    returned as is, which keeps rows and blobs written before compression readable.
+    """
+    if not is_compressed(data):
+        return data
+
+    _, algorithm, dict_id = HEADER.unpack_from(data)
+    payload = memoryview(data)[HEADER.size:]
+    dictionary = load_dictionary(dict_id) if dict_id else None
+
+    if algorithm == ZSTD:
+        if zstandard is None:
+            raise RuntimeError("zstandard is required to read this payload")
+        zdict = zstandard.ZstdCompressionDict(dictionary) if dictionary else None
+        return zstandard.ZstdDecompressor(dict_data=zdict).decompressobj().decompress(payload)
+    if algorithm == ZLIB:
+        decompressor = zlib.decompressobj(zdict=dictionary) if dictionary else zlib.decompressobj()
+        return decompressor.decompress(payload) + decompressor.flush()
+    raise ValueError(f"Unknown compression algorithm {algorithm}")
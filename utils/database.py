@@ -0,0 +1,120 @@
+import os
+import time
+import logging
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import (
+    AsyncEngine,
+    AsyncSession,
+    async_sessionmaker,
+    create_async_engine,
+)
+from utils.metrics import DB_POOL_WAIT, instrument_engine
+from utils.pool import DB_POOL_WAITING, engine_options, install_pool_manager
+
+logger = logging.getLogger(__name__)
+
+_engine: Optional[AsyncEngine] = None
+_sessionmaker: Optional[async_sessionmaker] = None
+# Sessions blocked in acquire_connection right now
+_waiting = 0
+
+def async_database_url(url: str) -> str:
+    """
+    Translate a synchronous DATABASE_URL into its asyncio driver equivalent.
+
+    Args:
+        url (str): The URL used by Flask-SQLAlchemy (postgres://, postgresql://, sqlite://)
+
+    Returns:
+        str: The same database addressed through asyncpg or aiosqlite
+    """
+    if url.startswith("postgres://"):
+        url = "postgresql://" + url[len("postgres://"):]
+
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "postgresql":
+        query = dict(parsed.query)
+        # asyncpg does not understand libpq's sslmode, it expects ssl instead
+        if "sslmode" in query:
+            query["ssl"] = query.pop("sslmode")
+        parsed = parsed.set(drivername="postgresql+asyncpg", query=query)
+    elif parsed.get_backend_name() == "sqlite":
+        parsed = parsed.set(drivername="sqlite+aiosqlite")
+
+    return parsed.render_as_string(hide_password=False)
+
+def configure_engine(url: Optional[str] = None, **options) -> AsyncEngine:
+    """
+    Create the process-wide async engine and session factory.
+
+    Args:
+        url (str): Database URL, defaults to the DATABASE_URL environment variable
+        **options: Extra keyword arguments for create_async_engine
+
+    Returns:
+        AsyncEngine: The configured engine
+    """
+    global _engine, _sessionmaker
+
+    url = url or os.environ.get("DATABASE_URL")
+    if not url:
+        raise RuntimeError("DATABASE_URL is not set")
+
+    async_url = async_database_url(url)
+    # Sizing comes from DB_POOL_* (the cluster launcher splits DB_POOL_BUDGET across workers)
+    settings = engine_options(async_url)
+    settings.update(options)
+
+    _engine = create_async_engine(async_url, **settings)
+    instrument_engine(_engine)
+    install_pool_manager(_engine)
+    _sessionmaker = async_sessionmaker(_engine, expire_on_commit=False)
+    logger.info(f"Async database engine configured for {_engine.url.get_backend_name()}")
+    return _engine
+
+def get_engine() -> AsyncEngine:
+    if _engine is None:
+        configure_engine()
+    return _engine
+
+def get_sessionmaker() -> async_sessionmaker:
+    if _sessionmaker is None:
+        configure_engine()
+    return _sessionmaker
+
+@asynccontextmanager
+async def session_scope() -> AsyncIterator[AsyncSession]:
+    """
+    Open a session wrapped in a transaction.
+
+    The transaction is committed when the block exits normally and rolled
+    back if it raises, so callers never have to call commit or rollback.
+    """
+    async with get_sessionmaker()() as session:
+        async with session.begin():
+            await acquire_connection(session)
+            yield session
+
+async def acquire_connection(session: AsyncSession):
+    """
+    Check a connection out of the pool for `session`, recording the wait.
+    """
+    global _waiting
+    _waiting += 1
+    DB_POOL_WAITING.set(_waiting)
+    started = time.perf_counter()
+    try:
+        await session.connection()
+    finally:
+        _waiting -= 1
+        DB_POOL_WAITING.set(_waiting)
+    DB_POOL_WAIT.observe(time.perf_counter() - started)
+
+async def dispose_engine():
+    global _engine, _sessionmaker
+    if _engine is not None:
+        await _engine.dispose()
+    _engine = None
+    _sessionmaker = None
@@ -0,0 +1,243 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Dict, List, Optional
+from utils.cache import ByteLRUCache
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+DRAFT_STORE_PATH = os.environ.get("DRAFT_STORE_PATH", os.path.join("data", "drafts"))
+# Payload bytes kept in memory across every open draft; the rest is read back from disk
+DRAFT_MEMORY_MAX_BYTES = int(os.environ.get("DRAFT_MEMORY_MAX_BYTES", 8 * 1024 * 1024))
+# A draft untouched for this long is discarded by the janitor
+DRAFT_TTL = float(os.environ.get("DRAFT_TTL", 30 * 60))
+# How often the janitor looks for expired drafts
+DRAFT_JANITOR_INTERVAL = float(os.environ.get("DRAFT_JANITOR_INTERVAL", 5 * 60))
+DRAFT_MAX_DOCUMENTS = int(os.environ.get("DRAFT_MAX_DOCUMENTS", 10))
+DRAFT_MAX_PER_USER = int(os.environ.get("DRAFT_MAX_PER_USER", 5))
+
+META_FILE = "meta.json"
+
+class DraftLimitExceeded(Exception):
+    """Raised when a user has too many open drafts or a draft too many documents."""
+
+@dataclass
+class DraftDocument:
+    context: str
+    size: int
+
+@dataclass
+class Draft:
+    draft_id: str
+    user_id: str
+    activity: str
+    created_at: float
+    updated_at: float
+    documents: List[DraftDocument] = field(default_factory=list)
+
+    def expired(self, ttl: float, now: Optional[float] = None) -> bool:
+        return self.updated_at + ttl < (now if now is not None else time.time())
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Draft":
+        documents = [DraftDocument(**document) for document in data.pop("documents", [])]
+        return cls(documents=documents, **data)
+
+def draft_id_for(user_id: str, activity: str) -> str:
+    """
+    Stable id of the draft a user is building for one activity, short
+    enough to fit in a component custom_id.
+    """
+    return hashlib.sha256(f"{user_id}\0{activity}".encode()).hexdigest()[:24]
+
+class DraftStore:
+    """
+    Pending /documenti uploads, one directory per draft (under one per
+    user) holding meta.json and one file per document.
+
+    Every change is written through to disk so drafts survive a restart;
+    payloads are additionally kept in a byte-bounded LRU shared by all
+    drafts, so memory stays capped however many drafts are open. Disk I/O
+    runs in a worker thread, cache access stays on the event loop.
+    """
+
+    def __init__(self, root: str, memory_max_bytes: int = DRAFT_MEMORY_MAX_BYTES, ttl: float = DRAFT_TTL):
+        self.root = root
+        self.ttl = ttl
+        self.memory = ByteLRUCache(memory_max_bytes, ttl)
+        # Serializes read-modify-write of one draft's meta.json
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _dir(self, user_id: str, draft_id: str) -> str:
+        return os.path.join(self.root, user_id, draft_id)
+
+    def _document_path(self, user_id: str, draft_id: str, index: int) -> str:
+        return os.path.join(self._dir(user_id, draft_id), f"{index}.bin")
+
+    def _write_atomic(self, path: str, data: bytes):
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".incoming-")
+        try:
+            with os.fdopen(fd, "wb") as target:
+                target.write(data)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+    def _read_meta(self, user_id: str, draft_id: str) -> Optional[Draft]:
+        try:
+            with open(os.path.join(self._dir(user_id, draft_id), META_FILE), encoding="utf-8") as f:
+                return Draft.from_dict(json.load(f))
+        except (FileNotFoundError, json.JSONDecodeError, TypeError):
+            return None
+
+    def _write_meta(self, draft: Draft):
+        self._write_atomic(
+            os.path.join(self._dir(draft.user_id, draft.draft_id), META_FILE),
+            json.dumps(asdict(draft)).encode("utf-8")
+        )
+
+    def _list(self, user_id: str) -> List[Draft]:
+        try:
+            names = os.listdir(os.path.join(self.root, user_id))
+        except FileNotFoundError:
+            return []
+        drafts = (self._read_meta(user_id, name) for name in names)
+        return [draft for draft in drafts if draft is not None]
+
+    def _open(self, user_id: str, activity: str) -> Draft:
+        draft_id = draft_id_for(user_id, activity)
+        now = time.time()
+        draft = self._read_meta(user_id, draft_id)
+        if draft is not None and draft.expired(self.ttl, now):
+            self._remove(user_id, draft_id)
+            draft = None
+        if draft is None:
+            open_drafts = [other for other in self._list(user_id) if not other.expired(self.ttl, now)]
+            if len(open_drafts) >= DRAFT_MAX_PER_USER:
+                raise DraftLimitExceeded(f"{user_id} already has {len(open_drafts)} open drafts")
+            draft = Draft(draft_id, user_id, activity, created_at=now, updated_at=now)
+        else:
+            draft.updated_at = now
+        self._write_meta(draft)
+        return draft
+
+    def _add_document(self, user_id: str, draft_id: str, content: bytes, context: str) -> Draft:
+        draft = self._read_meta(user_id, draft_id)
+        if draft is None:
+            raise KeyError(draft_id)
+        if len(draft.documents) >= DRAFT_MAX_DOCUMENTS:
+            raise DraftLimitExceeded(f"Draft {draft_id} already has {len(draft.documents)} documents")
+        # Payload first: a crash in between leaves an orphan file, never a dangling entry
+        self._write_atomic(self._document_path(user_id, draft_id, len(draft.documents)), content)
+        draft.documents.append(DraftDocument(context=context, size=len(content)))
+        draft.updated_at = time.time()
+        self._write_meta(draft)
+        return draft
+
+    def _read_document(self, user_id: str, draft_id: str, index: int) -> bytes:
+        with open(self._document_path(user_id, draft_id, index), "rb") as f:
+            return f.read()
+
+    def _remove(self, user_id: str, draft_id: str):
+        shutil.rmtree(self._dir(user_id, draft_id), ignore_errors=True)
+
+    def _purge_expired(self) -> List[str]:
+        now = time.time()
+        try:
+            user_ids = os.listdir(self.root)
+        except FileNotFoundError:
+            return []
+        expired = []
+        for user_id in user_ids:
+            for draft in self._list(user_id):
+                if draft.expired(self.ttl, now):
+                    self._remove(user_id, draft.draft_id)
+                    expired.append(draft.draft_id)
+            try:
+                os.rmdir(os.path.join(self.root, user_id))
+            except OSError:
+                pass  # Still has open drafts
+        return expired
+
+    async def open(self, user_id: str, activity: str) -> Draft:
+        """
+        Return the user's draft for `activity`, creating it if needed.
+
+        Raises:
+            DraftLimitExceeded: The user already has DRAFT_MAX_PER_USER drafts open
+        """
+        return await asyncio.to_thread(self._open, user_id, activity)
+
+    async def get(self, user_id: str, draft_id: str) -> Optional[Draft]:
+        draft = await asyncio.to_thread(self._read_meta, user_id, draft_id)
+        if draft is None or draft.expired(self.ttl):
+            return None
+        return draft
+
+    async def add_document(self, user_id: str, draft_id: str, content: bytes, context: str) -> Draft:
+        """
+        Append a document to a draft.
+
+        Raises:
+            KeyError: The draft does not exist (expired or already submitted)
+            DraftLimitExceeded: The draft already holds DRAFT_MAX_DOCUMENTS documents
+        """
+        async with self._locks.setdefault(draft_id, asyncio.Lock()):
+            draft = await asyncio.to_thread(self._add_document, user_id, draft_id, content, context)
+        self.memory.put((draft_id, len(draft.documents) - 1), content, len(content), tag=draft_id)
+        return draft
+
+    async def load_documents(self, draft: Draft) -> List[Dict]:
+        """
+        Return the draft's documents as {'content', 'context'} dicts, the
+        shape add_documents expects.
+        """
+        documents = []
+        for index, document in enumerate(draft.documents):
+            content = self.memory.get((draft.draft_id, index))
+            if content is None:
+                content = await asyncio.to_thread(self._read_document, draft.user_id, draft.draft_id, index)
+            documents.append({"content": content, "context": document.context})
+        return documents
+
+    async def discard(self, draft: Draft):
+        self.memory.invalidate_tag(draft.draft_id)
+        async with self._locks.setdefault(draft.draft_id, asyncio.Lock()):
+            await asyncio.to_thread(self._remove, draft.user_id, draft.draft_id)
+        self._locks.pop(draft.draft_id, None)
+
+    async def purge_expired(self) -> int:
+        """
+        Delete every draft past its TTL.
+
+        Returns:
+            int: Number of drafts removed
+        """
+        expired = await asyncio.to_thread(self._purge_expired)
+        for draft_id in expired:
+            self.memory.invalidate_tag(draft_id)
+            self._locks.pop(draft_id, None)
+        return len(expired)
+
+_store: Optional[DraftStore] = None
+
+def get_draft_store() -> DraftStore:
+    global _store
+    if _store is None:
+        _store = DraftStore(DRAFT_STORE_PATH)
+        logger.info(f"Using draft store at {DRAFT_STORE_PATH}")
+        REGISTRY.gauge(
+            "docbot_draft_memory_bytes", "Draft payload bytes held in memory",
+            callback=lambda: _store.memory.current_bytes
+        )
+    return _store
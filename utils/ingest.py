@@ -0,0 +1,95 @@
+import hashlib
+import os
+import tempfile
+import logging
+from typing import Optional
+import aiohttp
+import discord
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+# Attachments up to this size stay in memory, larger ones roll over to a temp file
+SPOOL_THRESHOLD = int(os.environ.get("INGEST_SPOOL_THRESHOLD", 1024 * 1024))
+INSPECTION_MAX_BYTES = int(os.environ.get("INSPECTION_MAX_BYTES", 25 * 1024 * 1024))
+
+class AttachmentTooLarge(Exception):
+    def __init__(self, size: int, limit: int):
+        super().__init__(f"Attachment of {size} bytes exceeds the {limit} byte limit")
+        self.size = size
+        self.limit = limit
+
+class SpooledUpload:
+    """
+    An attachment downloaded into a SpooledTemporaryFile.
+
+    Holds the digest and size computed while streaming. The file is
+    rewound and ready to be read again; use as a context manager so the
+    temporary file is always released.
+    """
+
+    def __init__(self, file: tempfile.SpooledTemporaryFile, sha256: str, size: int, content_type: Optional[str]):
+        self.file = file
+        self.sha256 = sha256
+        self.size = size
+        self.content_type = content_type
+
+    def rewind(self):
+        self.file.seek(0)
+
+    def close(self):
+        self.file.close()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.close()
+
+async def spool_attachment(
+    session: aiohttp.ClientSession,
+    attachment: discord.Attachment,
+    max_size: int,
+    spool_threshold: int = SPOOL_THRESHOLD
+) -> SpooledUpload:
+    """
+    Stream an attachment from the CDN in chunks.
+
+    The declared size is checked before any byte is downloaded and the running
+    total is checked again for every chunk, so an oversize file is rejected as
+    soon as it crosses the limit rather than after it has been buffered.
+
+    Args:
+        session (aiohttp.ClientSession): Session used for the download
+        attachment (discord.Attachment): The attachment to fetch
+        max_size (int): Largest accepted payload in bytes
+        spool_threshold (int): Size above which the data is spooled to disk
+
+    Returns:
+        SpooledUpload: The downloaded payload with its SHA-256 and size
+
+    Raises:
+        AttachmentTooLarge: If the attachment is bigger than max_size
+    """
+    if attachment.size > max_size:
+        raise AttachmentTooLarge(attachment.size, max_size)
+
+    spool = tempfile.SpooledTemporaryFile(max_size=spool_threshold)
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        async with session.get(attachment.url) as response:
+            response.raise_for_status()
+            async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+                size += len(chunk)
+                if size > max_size:
+                    raise AttachmentTooLarge(size, max_size)
+                digest.update(chunk)
+                spool.write(chunk)
+    except BaseException:
+        spool.close()
+        raise
+
+    spool.seek(0)
+    logger.debug("Spooled %s: %d bytes, sha256 %s", attachment.filename, size, digest.hexdigest())
+    return SpooledUpload(spool, digest.hexdigest(), size, attachment.content_type)
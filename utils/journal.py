@@ -0,0 +1,529 @@
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import struct
+import time
+import uuid
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Iterator, List, Optional, Tuple
+from sqlalchemy import exc as sa_exc
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# "on": submissions are appended to the journal, fsynced and acknowledged,
+# then written to the database in the background. "off": committed to the
+# database before acknowledging, as before the journal existed.
+WRITE_JOURNAL = os.environ.get("WRITE_JOURNAL", "on")
+# A new segment file is started once the current one reaches this size
+JOURNAL_SEGMENT_BYTES = int(os.environ.get("JOURNAL_SEGMENT_BYTES", 16 * 1024 * 1024))
+# Entries the replayer applies per database transaction
+JOURNAL_REPLAY_BATCH = int(os.environ.get("JOURNAL_REPLAY_BATCH", 50))
+# Longest wait between replay attempts while the database keeps failing
+JOURNAL_RETRY_MAX = float(os.environ.get("JOURNAL_RETRY_MAX", 30))
+# Days the database remembers applied entries. Only entries after the
+# checkpoint are ever looked up, so this just has to outlast a lost checkpoint.
+JOURNAL_MARKER_DAYS = int(os.environ.get("JOURNAL_MARKER_DAYS", 30))
+
+# Every record is framed as payload length and CRC-32, so a write torn by a crash is detected
+_HEADER = struct.Struct(">II")
+CHECKPOINT_FILE = "checkpoint"
+REJECTED_FILE = "rejected.jsonl"
+LOCK_FILE = "lock"
+
+APPEND_LATENCY = REGISTRY.histogram(
+    "docbot_journal_append_seconds", "Time from submitting a journal entry to its fsync"
+)
+REPLAYED = REGISTRY.counter(
+    "docbot_journal_replayed_total", "Journal entries handled by the replayer", ["result"]
+)
+REPLAY_RETRIES = REGISTRY.counter(
+    "docbot_journal_replay_retries_total", "Replay attempts put off because the database failed"
+)
+
+@dataclass
+class JournalEntry:
+    """
+    One submission. seq orders entries within a journal and is assigned
+    when the entry is written; entry_id is unique across journals and is
+    what the database records to apply each entry only once.
+    """
+    kind: str
+    data: dict
+    entry_id: str
+    created_at: datetime
+    seq: int = 0
+
+    def to_record(self) -> dict:
+        return {
+            "seq": self.seq,
+            "id": self.entry_id,
+            "kind": self.kind,
+            "at": self.created_at.isoformat(),
+            "data": self.data,
+        }
+
+    def encode(self) -> bytes:
+        payload = json.dumps(self.to_record(), separators=(",", ":")).encode("utf-8")
+        return _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+
+    @classmethod
+    def decode(cls, payload: bytes) -> "JournalEntry":
+        return cls.from_record(json.loads(payload))
+
+    @classmethod
+    def from_record(cls, record: dict) -> "JournalEntry":
+        return cls(
+            kind=record["kind"],
+            data=record["data"],
+            entry_id=record["id"],
+            created_at=datetime.fromisoformat(record["at"]),
+            seq=record["seq"]
+        )
+
+def is_transient(error: BaseException) -> bool:
+    """
+    Whether a failed replay is worth retrying as is: the database or the
+    network failed, rather than the entry itself.
+    """
+    if isinstance(error, (OSError, asyncio.TimeoutError, sa_exc.OperationalError, sa_exc.InterfaceError, sa_exc.DisconnectionError)):
+        return True
+    return bool(getattr(error, "connection_invalidated", False))
+
+# apply(entries) writes the entries to the database, in order, in one
+# transaction, and returns how many it wrote: the others had already been
+# applied before a crash cut the replay short of its checkpoint
+ApplyEntries = Callable[[List[JournalEntry]], Awaitable[int]]
+
+class Journal:
+    """
+    Local append-only write-ahead journal.
+
+    Submitters are acknowledged once their entry is fsynced; appends that
+    arrive during an fsync share the next one, like the write batcher's
+    group commit. A single replayer task applies entries to the database in
+    journal order and records the last applied seq in a checkpoint file.
+    Segments wholly before the checkpoint are deleted.
+
+    After a crash, open() cuts a torn last record (never acknowledged) and
+    replay resumes after the checkpoint. Entries applied after the last
+    checkpoint are skipped by the apply callback, which the database makes
+    idempotent.
+    """
+
+    def __init__(self, path: str, segment_bytes: int = JOURNAL_SEGMENT_BYTES, replay_batch: int = JOURNAL_REPLAY_BATCH):
+        self.path = path
+        self.segment_bytes = segment_bytes
+        self.replay_batch = replay_batch
+
+        self.applied_seq = 0
+        self.durable_seq = 0
+        self._next_seq = 1
+        self._lock_file = None
+        self._file = None
+        self._segment = 0
+        self._size = 0
+        # Segment and offset of the first entry not yet applied
+        self._cursor: Tuple[int, int] = (0, 0)
+        self._oldest_pending_at: Optional[datetime] = None
+
+        self._pending: List[Tuple[JournalEntry, asyncio.Future, float]] = []
+        self._writer: Optional[asyncio.Task] = None
+        self._replayer: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+        self.appended = 0
+        self.applied = 0
+        self.skipped = 0
+        self.rejected = 0
+        self.retries = 0
+
+    # Files
+
+    def _segment_path(self, first_seq: int) -> str:
+        return os.path.join(self.path, f"{first_seq:020d}.log")
+
+    def _segments(self) -> List[int]:
+        return sorted(int(name[:-4]) for name in os.listdir(self.path) if name.endswith(".log"))
+
+    def _scan(self, segment: int, offset: int = 0) -> Iterator[Tuple[JournalEntry, int]]:
+        """
+        Entries of a segment from `offset`, each with the offset just past
+        it. Stops at the end of the file or at the first torn record.
+        """
+        with open(self._segment_path(segment), "rb") as f:
+            f.seek(offset)
+            while True:
+                header = f.read(_HEADER.size)
+                if len(header) < _HEADER.size:
+                    return
+                length, crc = _HEADER.unpack(header)
+                payload = f.read(length)
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    return
+                offset += _HEADER.size + length
+                yield JournalEntry.decode(payload), offset
+
+    def _sync_directory(self):
+        fd = os.open(self.path, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def open(self):
+        """
+        Lock the journal directory and recover its state from disk.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        self._lock_file = open(os.path.join(self.path, LOCK_FILE), "a")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            raise RuntimeError(f"Journal {self.path} is in use by another process")
+
+        try:
+            with open(os.path.join(self.path, CHECKPOINT_FILE)) as f:
+                self.applied_seq = int(f.read().strip() or 0)
+        except FileNotFoundError:
+            self.applied_seq = 0
+
+        segments = self._segments()
+        if not segments:
+            segments = [self.applied_seq + 1]
+            open(self._segment_path(segments[0]), "ab").close()
+            self._sync_directory()
+
+        # Only the last segment can end in a torn record: earlier ones were complete when rolled
+        last = segments[-1]
+        self._next_seq, end = last, 0
+        for entry, offset in self._scan(last):
+            self._next_seq, end = entry.seq + 1, offset
+        path = self._segment_path(last)
+        if os.path.getsize(path) > end:
+            logger.warning(f"Truncating torn journal record at {path}:{end}")
+            with open(path, "r+b") as f:
+                f.truncate(end)
+                os.fsync(f.fileno())
+        self._segment, self._size = last, end
+        self._file = open(path, "ab", buffering=0)
+        self.durable_seq = self._next_seq - 1
+
+        self._cursor = self._find_cursor(segments)
+        self._delete_applied_segments()
+        pending = self.durable_seq - self.applied_seq
+        if pending > 0:
+            logger.info(f"Journal {self.path}: {pending} entries to replay after seq {self.applied_seq}")
+
+    def _find_cursor(self, segments: List[int]) -> Tuple[int, int]:
+        # The first entry after the checkpoint lives in the last segment starting at or before it
+        candidates = [segment for segment in segments if segment <= self.applied_seq + 1] or segments[:1]
+        segment, offset = candidates[-1], 0
+        for entry, end in self._scan(segment):
+            if entry.seq > self.applied_seq:
+                break
+            offset = end
+        return segment, offset
+
+    def _delete_applied_segments(self):
+        for segment in self._segments():
+            if segment < self._cursor[0]:
+                os.remove(self._segment_path(segment))
+
+    # Appending
+
+    async def append(self, kind: str, data: dict) -> JournalEntry:
+        """
+        Journal a submission and return once it is on disk.
+        """
+        entry = JournalEntry(kind, data, uuid.uuid4().hex, datetime.now(timezone.utc))
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((entry, future, time.perf_counter()))
+        if self._writer is None:
+            self._writer = asyncio.get_running_loop().create_task(self._write_pending())
+        await future
+        return entry
+
+    async def _write_pending(self):
+        try:
+            while self._pending:
+                batch, self._pending = self._pending, []
+                try:
+                    await asyncio.to_thread(self._write, [entry for entry, _, _ in batch])
+                except Exception as e:
+                    logger.error(f"Journal append of {len(batch)} entries failed: {e}")
+                    for _, future, _ in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+
+                finished = time.perf_counter()
+                for _, future, submitted in batch:
+                    APPEND_LATENCY.observe(finished - submitted)
+                    if not future.done():
+                        future.set_result(None)
+                self.appended += len(batch)
+                if self._wakeup is not None:
+                    self._wakeup.set()
+        finally:
+            self._writer = None
+
+    def _write(self, entries: List[JournalEntry]):
+        first_seq = self._next_seq
+        for seq, entry in enumerate(entries, first_seq):
+            entry.seq = seq
+        data = b"".join(entry.encode() for entry in entries)
+        try:
+            self._file.write(data)
+            os.fsync(self._file.fileno())
+        except BaseException:
+            # Leave no partial record behind for the next batch to follow
+            self._file.truncate(self._size)
+            raise
+        self._size += len(data)
+        self._next_seq = first_seq + len(entries)
+        self.durable_seq = self._next_seq - 1
+
+        if self._size >= self.segment_bytes:
+            self._file.close()
+            self._segment, self._size = self._next_seq, 0
+            self._file = open(self._segment_path(self._segment), "ab", buffering=0)
+            self._sync_directory()
+
+    # Replaying
+
+    def start(self, apply: ApplyEntries):
+        self._wakeup = asyncio.Event()
+        self._replayer = asyncio.get_running_loop().create_task(self._replay(apply))
+
+    def _read_batch(self) -> List[Tuple[JournalEntry, Tuple[int, int]]]:
+        """
+        Up to replay_batch durable entries from the cursor on, each with
+        the cursor position just past it.
+        """
+        batch = []
+        segment, offset = self._cursor
+        while len(batch) < self.replay_batch:
+            for entry, end in self._scan(segment, offset):
+                if entry.seq > self.durable_seq:
+                    return batch
+                batch.append((entry, (segment, end)))
+                if len(batch) == self.replay_batch:
+                    return batch
+            later = [first for first in self._segments() if first > segment]
+            if not later:
+                return batch
+            segment, offset = later[0], 0
+        return batch
+
+    def _checkpoint(self, seq: int, cursor: Tuple[int, int]):
+        tmp = os.path.join(self.path, CHECKPOINT_FILE + ".tmp")
+        with open(tmp, "w") as f:
+            f.write(str(seq))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, os.path.join(self.path, CHECKPOINT_FILE))
+        self._sync_directory()
+        self.applied_seq = seq
+        self._cursor = cursor
+        self._delete_applied_segments()
+
+    def _reject(self, entry: JournalEntry, error: BaseException):
+        """
+        Set aside an entry the database refuses. The whole entry is kept, and
+        fsynced before the checkpoint can delete its segment, so an operator
+        can fix the cause and re-apply it (tools.replay_journal --rejected).
+        """
+        record = entry.to_record()
+        record.update(error=repr(error), rejected_at=datetime.now(timezone.utc).isoformat())
+        with open(os.path.join(self.path, REJECTED_FILE), "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        logger.error(f"Journal entry {entry.seq} ({entry.kind}) rejected by the database: {error}")
+
+    async def _apply_batch(self, apply: ApplyEntries, batch: List[Tuple[JournalEntry, Tuple[int, int]]]) -> int:
+        """
+        Apply a batch, isolating entries the database refuses. Returns how
+        many entries, from the start of the batch, were dealt with.
+        """
+        try:
+            self._count_applied(len(batch), await apply([entry for entry, _ in batch]))
+            return len(batch)
+        except Exception as e:
+            if is_transient(e):
+                raise
+            logger.warning(f"Replay of {len(batch)} journal entries failed, isolating: {e}")
+
+        handled = 0
+        for entry, _ in batch:
+            try:
+                self._count_applied(1, await apply([entry]))
+            except Exception as e:
+                if is_transient(e):
+                    if handled:
+                        return handled
+                    raise
+                self._reject(entry, e)
+                self.rejected += 1
+                REPLAYED.inc(result="rejected")
+            handled += 1
+        return handled
+
+    async def _replay(self, apply: ApplyEntries):
+        delay = 1.0
+        while True:
+            batch = await asyncio.to_thread(self._read_batch)
+            if not batch:
+                self._oldest_pending_at = None
+                self._wakeup.clear()
+                # An append may have landed between the read and the clear
+                if self.durable_seq > self.applied_seq:
+                    continue
+                await self._wakeup.wait()
+                continue
+
+            self._oldest_pending_at = batch[0][0].created_at
+            try:
+                handled = await self._apply_batch(apply, batch)
+            except Exception as e:
+                self.retries += 1
+                REPLAY_RETRIES.inc()
+                logger.warning(f"Journal replay failed, retrying in {delay:.0f}s: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, JOURNAL_RETRY_MAX)
+                continue
+
+            delay = 1.0
+            entry, cursor = batch[handled - 1]
+            await asyncio.to_thread(self._checkpoint, entry.seq, cursor)
+
+    def _count_applied(self, entries: int, written: int):
+        self.applied += written
+        self.skipped += entries - written
+        REPLAYED.inc(written, result="applied")
+        REPLAYED.inc(entries - written, result="skipped")
+
+    async def drain(self, poll: float = 0.05):
+        """
+        Wait until everything appended so far has been applied.
+        """
+        while self._pending or self._writer is not None or self.applied_seq < self.durable_seq:
+            await asyncio.sleep(poll)
+
+    async def close(self):
+        """
+        Stop replaying and finish in-flight appends. Entries not applied yet
+        stay in the journal for the next start.
+        """
+        if self._replayer is not None:
+            self._replayer.cancel()
+            try:
+                await self._replayer
+            except asyncio.CancelledError:
+                pass
+        if self._writer is not None:
+            await self._writer
+        if self._file is not None:
+            self._file.close()
+        if self._lock_file is not None:
+            self._lock_file.close()
+
+    # Metrics
+
+    @property
+    def pending(self) -> int:
+        return self.durable_seq - self.applied_seq
+
+    def lag_seconds(self) -> float:
+        if self._oldest_pending_at is None or not self.pending:
+            return 0.0
+        return (datetime.now(timezone.utc) - self._oldest_pending_at).total_seconds()
+
+    def size_bytes(self) -> int:
+        return sum(os.path.getsize(self._segment_path(segment)) for segment in self._segments())
+
+    def stats(self) -> dict:
+        return {
+            "appended": self.appended,
+            "applied": self.applied,
+            "skipped": self.skipped,
+            "rejected": self.rejected,
+            "retries": self.retries,
+            "pending": self.pending,
+            "lag_seconds": self.lag_seconds(),
+        }
+
+def read_rejected(path: str) -> List[dict]:
+    """
+    The records set aside in a journal directory's rejected.jsonl: entry
+    fields (see JournalEntry.from_record) plus the error the database gave.
+    """
+    try:
+        with open(os.path.join(path, REJECTED_FILE), encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+def write_rejected(path: str, records: List[dict]):
+    """
+    Replace rejected.jsonl with `records`, atomically; removes it when empty.
+    """
+    target = os.path.join(path, REJECTED_FILE)
+    if not records:
+        if os.path.exists(target):
+            os.remove(target)
+        return
+    tmp = target + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, target)
+
+_journal: Optional[Journal] = None
+
+REGISTRY.gauge(
+    "docbot_journal_pending_entries", "Journal entries on disk not yet applied to the database",
+    callback=lambda: _journal.pending if _journal is not None else 0
+)
+REGISTRY.gauge(
+    "docbot_journal_lag_seconds", "Age of the oldest journal entry not yet applied to the database",
+    callback=lambda: _journal.lag_seconds() if _journal is not None else 0
+)
+REGISTRY.gauge(
+    "docbot_journal_bytes", "Size of the journal's segment files",
+    callback=lambda: _journal.size_bytes() if _journal is not None else 0
+)
+
+def start_journal(apply: ApplyEntries, path: Optional[str] = None) -> Optional[Journal]:
+    """
+    Open the journal and start replaying it, unless WRITE_JOURNAL is "off".
+    The path is read here rather than at import so cluster workers can each
+    be given their own.
+    """
+    global _journal
+    if WRITE_JOURNAL == "off":
+        return None
+    path = path or os.environ.get("JOURNAL_PATH", os.path.join("data", "journal"))
+    journal = Journal(path)
+    journal.open()
+    journal.start(apply)
+    _journal = journal
+    logger.info(f"Write journal at {path}, {journal.pending} entries pending")
+    return journal
+
+def get_journal() -> Optional[Journal]:
+    return _journal
+
+async def close_journal():
+    global _journal
+    if _journal is not None:
+        await _journal.close()
+        _journal = None
@@ -0,0 +1,199 @@
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+# Root level, per-logger overrides ("discord=WARNING,cogs=DEBUG") and output format
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")
+
+# Records below INFO are sampled: each call site may emit this many per second
+LOG_DEBUG_RATE = float(os.getenv("LOG_DEBUG_RATE", "20"))
+# Call sites tracked at once; the least recently logged are forgotten first
+LOG_DEBUG_SITES = int(os.getenv("LOG_DEBUG_SITES", "1024"))
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+
+# discord.py logs every gateway payload at DEBUG; keep it quiet unless asked
+DEFAULT_LEVELS = {
+    "discord.gateway": "WARNING",
+    "discord.http": "WARNING",
+}
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s %(name)s: %(message)s"
+
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime"}
+
+def parse_levels(spec: str) -> Dict[str, str]:
+    """
+    Parse a "logger=LEVEL,other.logger=LEVEL" specification.
+
+    Args:
+        spec: Comma separated logger=level pairs
+
+    Returns:
+        dict: Logger name to upper-cased level name
+    """
+    levels = {}
+    for item in spec.split(","):
+        name, sep, level = item.strip().partition("=")
+        if sep and name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+class JsonFormatter(logging.Formatter):
+    """
+    Render each record as one JSON object per line. Attributes passed
+    through `extra=` are included as top-level keys.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        if record.stack_info:
+            entry["stack"] = self.formatStack(record.stack_info)
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class DebugSampler(logging.Filter):
+    """
+    Token bucket per call site (logger and unformatted message template)
+    for records below INFO. Records over the rate are dropped; the number
+    dropped is reported as `suppressed` on the next record let through.
+
+    At most `max_sites` buckets are kept, least recently used evicted
+    first, so messages built with f-strings (a new template per call)
+    cannot grow it without bound.
+    """
+
+    def __init__(self, rate: float = LOG_DEBUG_RATE, burst: Optional[float] = None, max_sites: int = LOG_DEBUG_SITES):
+        super().__init__()
+        self.rate = rate
+        self.burst = burst if burst is not None else max(rate, 1.0)
+        self.max_sites = max(1, max_sites)
+        self._buckets: "OrderedDict[tuple, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.INFO or self.rate <= 0:
+            return True
+
+        if isinstance(record.msg, str):
+            key = (record.name, record.msg)
+        else:
+            key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated, suppressed = self._buckets.pop(key, (self.burst, now, 0))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            if tokens < 1:
+                self._buckets[key] = (tokens, now, suppressed + 1)
+                return False
+            self._buckets[key] = (tokens - 1, now, 0)
+            if len(self._buckets) > self.max_sites:
+                self._buckets.popitem(last=False)
+
+        if suppressed:
+            record.suppressed = suppressed
+        return True
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that only resolves the message on the calling thread and
+    leaves formatting (timestamps, JSON, tracebacks) to the listener.
+    Records are dropped (and counted) rather than blocking when the queue
+    is full.
+    """
+
+    def __init__(self, queue_):
+        super().__init__(queue_)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # Traceback objects keep frames alive; render them now as text
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            # Never block the event loop on a slow sink
+            self.dropped += 1
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+def configure_logging(
+    level: str = LOG_LEVEL,
+    levels: Optional[Dict[str, str]] = None,
+    fmt: str = LOG_FORMAT,
+    stream=None,
+) -> logging.handlers.QueueListener:
+    """
+    Route all logging through a queue drained by a background thread.
+
+    Args:
+        level: Root logger level
+        levels: Per-logger levels; defaults to DEFAULT_LEVELS plus LOG_LEVELS
+        fmt: "json" or "text"
+        stream: Output stream for the listener (stderr by default)
+
+    Returns:
+        QueueListener: The running listener; stop it with stop_logging()
+    """
+    global _listener
+    stop_logging()
+
+    if levels is None:
+        levels = {**DEFAULT_LEVELS, **parse_levels(LOG_LEVELS)}
+
+    sink = logging.StreamHandler(stream or sys.stderr)
+    sink.setFormatter(JsonFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+
+    handler = DeferredQueueHandler(queue.Queue(LOG_QUEUE_SIZE))
+    handler.addFilter(DebugSampler())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+
+    for name, logger_level in levels.items():
+        logging.getLogger(name).setLevel(logger_level)
+
+    _listener = logging.handlers.QueueListener(handler.queue, sink, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def stop_logging():
+    """
+    Flush queued records and stop the listener thread.
+    """
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
@@ -0,0 +1,67 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+class LoopLagMonitor:
+    """
+    Measure how late the event loop wakes up a sleeping task.
+
+    Every `interval` seconds the monitor sleeps and records how much longer
+    than requested the sleep took. Any blocking call on the loop shows up
+    directly as lag, which makes this the number to watch for heartbeats.
+    """
+
+    def __init__(
+        self,
+        interval: float = 0.1,
+        window: int = 600,
+        warn_threshold: float = 0.5,
+        on_sample: Optional[Callable[[float], None]] = None
+    ):
+        self.interval = interval
+        self.warn_threshold = warn_threshold
+        self.on_sample = on_sample
+        self.samples = deque(maxlen=window)
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            self.samples.append(lag)
+            if self.on_sample is not None:
+                self.on_sample(lag)
+            if lag > self.warn_threshold:
+                logger.warning(f"Event loop lag of {lag * 1000:.0f} ms detected")
+
+    @property
+    def max_lag(self) -> float:
+        return max(self.samples, default=0.0)
+
+    def percentile(self, pct: float) -> float:
+        """
+        Return the given percentile (0-100) of the recorded lag samples in seconds.
+        """
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+        return ordered[index]
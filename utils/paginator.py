@@ -0,0 +1,139 @@
+import discord
+import logging
+from dataclasses import dataclass, field, replace
+from typing import Any, Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class Page:
+    """
+    One page of a keyset-paginated query.
+
+    first_key and last_key are the sort keys of the first and last item;
+    they are handed back to the fetch function as the `before`/`after`
+    cursor to reach the neighbouring pages.
+    """
+    items: List[Any] = field(default_factory=list)
+    has_prev: bool = False
+    has_next: bool = False
+    first_key: Optional[Any] = None
+    last_key: Optional[Any] = None
+
+def list_page(items: List[Any], after: Optional[int], before: Optional[int], size: int) -> Page:
+    """
+    Page over an in-memory list, using list indexes as the cursor keys.
+    """
+    if before is not None:
+        start = max(0, before - size)
+    elif after is not None:
+        start = after + 1
+    else:
+        start = 0
+
+    chunk = items[start:start + size]
+    return Page(
+        items=chunk,
+        has_prev=start > 0,
+        has_next=start + size < len(items),
+        first_key=start if chunk else None,
+        last_key=start + len(chunk) - 1 if chunk else None
+    )
+
+# fetch(after, before) -> Page
+FetchPage = Callable[[Optional[Any], Optional[Any]], Awaitable[Page]]
+# render(page, page_number) -> kwargs for send_message (content, embeds, files)
+RenderPage = Callable[[Page, int], Awaitable[dict]]
+
+class PaginatorView(discord.ui.View):
+    """
+    Previous/next buttons over a keyset-paginated query.
+
+    Only the current page is ever loaded; moving forward or back issues one
+    query bounded by the page size, wherever the cursor is. Without an
+    owner_id anyone who sees the message can change page.
+    """
+
+    def __init__(self, fetch_page: FetchPage, render_page: RenderPage, owner_id: Optional[int], timeout: Optional[float] = 300):
+        super().__init__(timeout=timeout)
+        self.fetch_page = fetch_page
+        self.render_page = render_page
+        self.owner_id = owner_id
+        self.page = Page()
+        self.page_number = 1
+
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if self.owner_id is not None and interaction.user.id != self.owner_id:
+            await interaction.response.send_message(
+                "Solo chi ha eseguito il comando può cambiare pagina.",
+                ephemeral=True
+            )
+            return False
+        return True
+
+    async def load_first_page(self) -> Page:
+        self.page = await self.fetch_page(None, None)
+        self.page_number = 1
+        self._update_buttons()
+        return self.page
+
+    async def send(self, interaction: discord.Interaction, ephemeral: bool = False):
+        """
+        Send the already loaded first page as the response to `interaction`.
+        """
+        kwargs = await self.render_page(self.page, self.page_number)
+        if interaction.response.is_done():
+            await interaction.followup.send(**kwargs, view=self, ephemeral=ephemeral)
+        else:
+            await interaction.response.send_message(**kwargs, view=self, ephemeral=ephemeral)
+
+    async def post(self, channel: discord.abc.Messageable) -> discord.Message:
+        """
+        Send the already loaded first page to `channel`, outside any interaction.
+        """
+        kwargs = await self.render_page(self.page, self.page_number)
+        return await channel.send(**kwargs, view=self)
+
+    def _update_buttons(self):
+        self.previous_page.disabled = not self.page.has_prev
+        self.next_page.disabled = not self.page.has_next
+
+    async def _show(self, interaction: discord.Interaction, page: Page, page_number: int):
+        if not page.items:
+            # Rows vanished under the cursor, stay where we are. The page
+            # may be shared with the read cache, so copy rather than mutate
+            self.page = replace(
+                self.page,
+                has_next=self.page.has_next and page_number < self.page_number,
+                has_prev=self.page.has_prev and page_number > self.page_number
+            )
+            self._update_buttons()
+            await interaction.response.edit_message(view=self)
+            return
+
+        self.page = page
+        self.page_number = page_number
+        self._update_buttons()
+
+        kwargs = await self.render_page(page, page_number)
+        if "files" in kwargs:
+            kwargs["attachments"] = kwargs.pop("files")
+        await interaction.response.edit_message(**kwargs, view=self)
+
+    @discord.ui.button(label="◀ Precedente", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        page = await self.fetch_page(None, self.page.first_key)
+        await self._show(interaction, page, max(1, self.page_number - 1))
+
+    @discord.ui.button(label="Successiva ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        page = await self.fetch_page(self.page.last_key, None)
+        await self._show(interaction, page, self.page_number + 1)
+
+    async def on_error(self, interaction: discord.Interaction, error: Exception, item: discord.ui.Item):
+        logger.error(f"Error while changing page: {error}", exc_info=True)
+        if not interaction.response.is_done():
+            await interaction.response.send_message(
+                "Si è verificato un errore durante il cambio pagina.",
+                ephemeral=True
+            )
@@ -0,0 +1,141 @@
+import os
+import time
+import logging
+from typing import Any, Dict
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import DisconnectionError
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+DB_POOL_CHECKED_OUT = REGISTRY.gauge(
+    "docbot_db_pool_checked_out", "Pooled database connections currently in use"
+)
+DB_POOL_OVERFLOW = REGISTRY.gauge(
+    "docbot_db_pool_overflow", "Connections open beyond pool_size (negative: pool slots not yet opened)"
+)
+DB_POOL_SIZE_GAUGE = REGISTRY.gauge(
+    "docbot_db_pool_size", "Configured pool size"
+)
+DB_POOL_WAITING = REGISTRY.gauge(
+    "docbot_db_pool_waiting", "Sessions currently waiting for a pooled connection"
+)
+DB_POOL_PINGS = REGISTRY.counter(
+    "docbot_db_pool_pings_total", "Liveness checks of idle connections at checkout", ["result"]
+)
+DB_STATEMENT_CACHE = REGISTRY.counter(
+    "docbot_db_statement_cache_total", "Statements served from (hit) or compiled into (miss) the compiled cache", ["result"]
+)
+
+def pool_settings() -> Dict[str, Any]:
+    """
+    Pool configuration from the environment, read on every call: cluster
+    workers set DB_POOL_SIZE and DB_MAX_OVERFLOW after this module is imported.
+
+    DB_POOL_SIZE           persistent connections per process (default 5)
+    DB_MAX_OVERFLOW        extra connections opened under bursts (default 10)
+    DB_POOL_TIMEOUT        seconds a checkout may wait before failing (default 10)
+    DB_POOL_RECYCLE        seconds after which a connection is replaced (default 300)
+    DB_POOL_PING_IDLE      ping a connection at checkout only if it sat idle
+                           this many seconds (default 30, 0 pings every checkout)
+    DB_STATEMENT_CACHE_SIZE  SQLAlchemy compiled statements and asyncpg
+                           prepared statements kept per engine/connection (default 500)
+    """
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "300")),
+        "ping_idle": float(os.getenv("DB_POOL_PING_IDLE", "30")),
+        "statement_cache_size": int(os.getenv("DB_STATEMENT_CACHE_SIZE", "500")),
+    }
+
+def engine_options(url: str) -> Dict[str, Any]:
+    """
+    create_engine / create_async_engine keyword arguments for `url`.
+
+    pool_pre_ping is deliberately off; install_pool_manager pings only the
+    connections that have been idle long enough to have gone stale.
+    """
+    settings = pool_settings()
+    options: Dict[str, Any] = {
+        "pool_recycle": settings["pool_recycle"],
+        "pool_pre_ping": False,
+        "query_cache_size": settings["statement_cache_size"],
+    }
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        return options
+
+    options.update(
+        pool_size=settings["pool_size"],
+        max_overflow=settings["max_overflow"],
+        pool_timeout=settings["pool_timeout"],
+    )
+    if parsed.get_driver_name() == "asyncpg":
+        # Server-side prepared statements, reused for the repository's fixed queries
+        options["connect_args"] = {"prepared_statement_cache_size": settings["statement_cache_size"]}
+    return options
+
+def install_idle_ping(engine) -> float:
+    """
+    Attach the idle-based liveness check to `engine` (sync or async); every
+    engine built from engine_options needs it, since pool_pre_ping is off.
+
+    A connection is pinged at checkout only when it has not been used for
+    DB_POOL_PING_IDLE seconds. A failed ping raises DisconnectionError,
+    which makes the pool discard the connection and hand out a fresh one.
+
+    Returns:
+        float: The idle threshold in seconds
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    pool = sync_engine.pool
+    ping_idle = pool_settings()["ping_idle"]
+
+    @event.listens_for(pool, "checkin")
+    def on_checkin(dbapi_connection, connection_record):
+        connection_record.info["idle_since"] = time.monotonic()
+
+    @event.listens_for(pool, "checkout")
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        idle_since = connection_record.info.get("idle_since")
+        if idle_since is None or time.monotonic() - idle_since < ping_idle:
+            return
+        try:
+            sync_engine.dialect.do_ping(dbapi_connection)
+        except Exception as e:
+            DB_POOL_PINGS.inc(result="failed")
+            logger.warning(f"Discarding stale pooled connection: {e}")
+            raise DisconnectionError() from e
+        DB_POOL_PINGS.inc(result="ok")
+
+    return ping_idle
+
+def install_pool_manager(engine):
+    """
+    Attach idle-based liveness checks (install_idle_ping), pool gauges and
+    statement cache counters to the bot's engine (sync or async).
+    """
+    sync_engine = getattr(engine, "sync_engine", engine)
+    pool = sync_engine.pool
+    ping_idle = install_idle_ping(engine)
+
+    @event.listens_for(sync_engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        cache_hit = getattr(context, "cache_hit", None)
+        if cache_hit is context.dialect.CACHE_HIT:
+            DB_STATEMENT_CACHE.inc(result="hit")
+        elif cache_hit is context.dialect.CACHE_MISS:
+            DB_STATEMENT_CACHE.inc(result="miss")
+
+    for gauge, method in (
+        (DB_POOL_CHECKED_OUT, "checkedout"),
+        (DB_POOL_OVERFLOW, "overflow"),
+        (DB_POOL_SIZE_GAUGE, "size"),
+    ):
+        if hasattr(pool, method):
+            gauge.callback = getattr(pool, method)
+
+    logger.info(f"{pool.status()}, ping after {ping_idle:.0f}s idle")
@@ -0,0 +1,360 @@
+import asyncio
+import hashlib
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, Iterable, List, Optional, Sequence, Tuple
+import aiohttp
+import discord
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Discord's per-message limits
+MAX_EMBEDS = 10
+MAX_FILES = 10
+MAX_EMBED_CHARS = 6000
+MAX_CONTENT_CHARS = 2000
+# Total attachment bytes per message; 10 MiB unless the guild is boosted
+MAX_UPLOAD_BYTES = int(os.environ.get("DISCORD_UPLOAD_LIMIT", 10 * 1024 * 1024))
+
+# A channel worker with nothing to send for this long exits
+WORKER_IDLE_TIMEOUT = 60.0
+
+RouteKey = Tuple[str, str]
+
+SEND_QUEUE_DEPTH = REGISTRY.gauge(
+    "docbot_send_queue_depth", "Outbound messages waiting in the send scheduler",
+    callback=lambda: send_scheduler.depth()
+)
+SEND_WAIT = REGISTRY.histogram(
+    "docbot_send_wait_seconds", "Time an outbound message waited in the send scheduler",
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+)
+SEND_TOTAL = REGISTRY.counter(
+    "docbot_send_total",
+    "Outbound messages sent by the scheduler, requests merged into them, and merged sends retried one by one",
+    ["kind"]
+)
+
+def file_size(file: discord.File) -> int:
+    """Bytes left to upload from the file's current position, where discord.py starts reading."""
+    fp = file.fp
+    position = fp.tell()
+    fp.seek(0, os.SEEK_END)
+    size = fp.tell() - position
+    fp.seek(position)
+    return size
+
+@dataclass
+class OutgoingMessage:
+    """One message worth of content, embeds and files that fits Discord's limits."""
+    content: Optional[str] = None
+    embeds: List[discord.Embed] = field(default_factory=list)
+    files: List[discord.File] = field(default_factory=list)
+    upload_bytes: int = 0
+
+    @property
+    def embed_chars(self) -> int:
+        return sum(len(embed) for embed in self.embeds)
+
+    def fits(self, other: "OutgoingMessage") -> bool:
+        content = len(self.content or "") + len(other.content or "") + (1 if self.content and other.content else 0)
+        return (
+            len(self.embeds) + len(other.embeds) <= MAX_EMBEDS
+            and len(self.files) + len(other.files) <= MAX_FILES
+            and self.embed_chars + other.embed_chars <= MAX_EMBED_CHARS
+            and self.upload_bytes + other.upload_bytes <= MAX_UPLOAD_BYTES
+            and content <= MAX_CONTENT_CHARS
+        )
+
+    def copy(self) -> "OutgoingMessage":
+        return OutgoingMessage(self.content, list(self.embeds), list(self.files), self.upload_bytes)
+
+    def merge(self, other: "OutgoingMessage"):
+        if other.content:
+            self.content = f"{self.content}\n{other.content}" if self.content else other.content
+        self.embeds.extend(other.embeds)
+        self.files.extend(other.files)
+        self.upload_bytes += other.upload_bytes
+
+def pack_messages(
+    embeds: Sequence[discord.Embed] = (),
+    files: Sequence[discord.File] = (),
+    content: Optional[str] = None,
+) -> List[OutgoingMessage]:
+    """
+    Split embeds and files into as few messages as Discord accepts.
+
+    The i-th embed and the i-th file describe the same document (as built
+    by create_document_embed and the submit flow), so they are kept in the
+    same message. `content` goes on the first message.
+    """
+    messages = [OutgoingMessage(content=content)]
+    for index in range(max(len(embeds), len(files))):
+        part = OutgoingMessage()
+        if index < len(embeds):
+            part.embeds.append(embeds[index])
+        if index < len(files):
+            part.files.append(files[index])
+            part.upload_bytes = file_size(files[index])
+            if part.upload_bytes > MAX_UPLOAD_BYTES:
+                logger.warning(f"{files[index].filename} is over the {MAX_UPLOAD_BYTES} byte upload limit")
+        if messages[-1].fits(part):
+            messages[-1].merge(part)
+        else:
+            messages.append(part)
+    return messages
+
+@dataclass
+class _Request:
+    message: OutgoingMessage
+    target: Any
+    options: dict
+    coalesce: bool
+    future: asyncio.Future
+    enqueued_at: float = field(default_factory=time.perf_counter)
+
+@dataclass
+class _RouteQueue:
+    pending: Deque[_Request] = field(default_factory=deque)
+    # Set whenever a request is queued, so an idle worker wakes up
+    ready: asyncio.Event = field(default_factory=asyncio.Event)
+
+def _webhook_key(webhook_id, token: str) -> RouteKey:
+    # Every interaction.followup has the application's id; Discord rate-limits
+    # them, and they are queued, per interaction token. The token is hashed
+    # so it never shows up in logs.
+    return ("webhooks", f"{webhook_id}/{hashlib.sha1(token.encode()).hexdigest()[:12]}")
+
+def route_key(target) -> RouteKey:
+    if isinstance(target, discord.Webhook):
+        return _webhook_key(target.id, target.token or "")
+    return ("channels", str(target.id))
+
+def route_key_from_path(path: str) -> Optional[RouteKey]:
+    """
+    Map a REST path (/api/v10/channels/123/messages, /api/v10/webhooks/1/tok)
+    to the key the scheduler queues by.
+    """
+    parts = path.strip("/").split("/")
+    if "channels" in parts:
+        index = parts.index("channels")
+        if index + 1 < len(parts):
+            return ("channels", parts[index + 1])
+    if "webhooks" in parts:
+        index = parts.index("webhooks")
+        if index + 2 < len(parts):
+            return _webhook_key(parts[index + 1], parts[index + 2])
+        if index + 1 < len(parts):
+            return ("webhooks", parts[index + 1])
+    return None
+
+def _fail_closed(requests: Iterable[_Request]):
+    for request in requests:
+        if not request.future.done():
+            SEND_TOTAL.inc(kind="failed")
+            request.future.set_exception(RuntimeError("Send scheduler closed before the message was sent"))
+
+class SendScheduler:
+    """
+    Per-channel FIFO queues for outbound messages.
+
+    One worker per channel sends the queued messages in order. Before each
+    send it waits out the route's rate-limit bucket as last reported by
+    Discord's X-RateLimit headers (fed in through `trace_config`), so bursts
+    queue here instead of turning into 429 retries. Consecutive queued
+    requests for the same channel are merged into one message when they fit;
+    if a merged message fails, its requests are retried one by one, so one
+    request's bad file does not fail the others.
+    """
+
+    def __init__(self):
+        self._queues: Dict[RouteKey, _RouteQueue] = {}
+        self._workers: Dict[RouteKey, asyncio.Task] = {}
+        # route key -> (remaining requests, monotonic time the bucket resets)
+        self._buckets: Dict[RouteKey, Tuple[int, float]] = {}
+
+    def depth(self) -> int:
+        return sum(len(queue.pending) for queue in self._queues.values())
+
+    def trace_config(self) -> aiohttp.TraceConfig:
+        """
+        aiohttp trace hooks (pass as the client's http_trace) that record
+        the rate-limit headers of every REST response.
+        """
+        trace = aiohttp.TraceConfig()
+
+        async def on_request_end(session, context, params):
+            self.observe(params.url.path, params.response.status, params.response.headers)
+
+        trace.on_request_end.append(on_request_end)
+        return trace
+
+    def observe(self, path: str, status: int, headers):
+        key = route_key_from_path(path)
+        if key is None:
+            return
+        remaining = headers.get("X-RateLimit-Remaining")
+        reset_after = headers.get("X-RateLimit-Reset-After") or headers.get("Retry-After")
+        if status == 429:
+            remaining = "0"
+        if remaining is None or reset_after is None:
+            return
+        self._buckets[key] = (int(remaining), time.monotonic() + float(reset_after))
+
+    async def _wait_for_bucket(self, key: RouteKey):
+        remaining, reset_at = self._buckets.get(key, (1, 0.0))
+        delay = reset_at - time.monotonic()
+        if remaining <= 0 and delay > 0:
+            logger.debug("Waiting %.2fs for the %s/%s rate limit bucket", delay, *key)
+            await asyncio.sleep(delay)
+
+    async def send(
+        self,
+        target,
+        content: Optional[str] = None,
+        embeds: Sequence[discord.Embed] = (),
+        files: Sequence[discord.File] = (),
+        coalesce: bool = True,
+        **options,
+    ) -> List[discord.Message]:
+        """
+        Queue embeds and files for `target` (a channel or a webhook such as
+        interaction.followup), split into compliant messages.
+
+        Args:
+            coalesce: Allow merging with other queued requests for the channel
+            **options: Passed to target.send (e.g. ephemeral=True)
+
+        Returns:
+            list: The messages sent, in order; merged requests share one
+        """
+        if isinstance(target, discord.Webhook):
+            options.setdefault("wait", True)
+
+        key = route_key(target)
+        queue = self._queues.setdefault(key, _RouteQueue())
+        loop = asyncio.get_running_loop()
+        requests = []
+        for message in pack_messages(embeds, files, content):
+            request = _Request(message, target, options, coalesce, loop.create_future())
+            queue.pending.append(request)
+            requests.append(request)
+        queue.ready.set()
+
+        if key not in self._workers or self._workers[key].done():
+            self._workers[key] = asyncio.create_task(self._run(key, queue))
+
+        return list(await asyncio.gather(*(request.future for request in requests)))
+
+    def _coalesce(self, first: _Request, pending: Deque[_Request]) -> Tuple[List[_Request], OutgoingMessage]:
+        """
+        `first` and the queued requests that can share its message, and that
+        message. The requests' own messages are left as they are, for
+        retrying them one by one.
+        """
+        batch = [first]
+        message = first.message
+        if not first.coalesce:
+            return batch, message
+        while pending:
+            candidate = pending[0]
+            if (not candidate.coalesce or candidate.options != first.options
+                    or not message.fits(candidate.message)):
+                break
+            pending.popleft()
+            if len(batch) == 1:
+                message = message.copy()
+            message.merge(candidate.message)
+            batch.append(candidate)
+        return batch, message
+
+    async def _send(self, request: _Request, message: OutgoingMessage):
+        return await request.target.send(
+            content=message.content,
+            embeds=message.embeds,
+            files=message.files,
+            **request.options
+        )
+
+    async def _send_each(self, key: RouteKey, batch: List[_Request]):
+        for request in batch:
+            # Rewind files the failed merged send already read
+            for file in request.message.files:
+                file.reset()
+            await self._wait_for_bucket(key)
+            try:
+                sent = await self._send(request, request.message)
+                SEND_TOTAL.inc(kind="sent")
+                if not request.future.done():
+                    request.future.set_result(sent)
+            except Exception as e:
+                SEND_TOTAL.inc(kind="failed")
+                if not request.future.done():
+                    request.future.set_exception(e)
+
+    async def _run(self, key: RouteKey, queue: _RouteQueue):
+        while True:
+            if not queue.pending:
+                queue.ready.clear()
+                try:
+                    await asyncio.wait_for(queue.ready.wait(), WORKER_IDLE_TIMEOUT)
+                except asyncio.TimeoutError:
+                    if not queue.pending:
+                        self._workers.pop(key, None)
+                        self._queues.pop(key, None)
+                        self._buckets.pop(key, None)
+                        return
+                continue
+
+            first = queue.pending.popleft()
+            batch = [first]
+            try:
+                await self._wait_for_bucket(key)
+                batch, message = self._coalesce(first, queue.pending)
+                now = time.perf_counter()
+                for request in batch:
+                    SEND_WAIT.observe(now - request.enqueued_at)
+                if len(batch) > 1:
+                    SEND_TOTAL.inc(len(batch) - 1, kind="coalesced")
+
+                try:
+                    sent = await self._send(first, message)
+                except Exception as e:
+                    if len(batch) > 1:
+                        logger.warning("Merged send of %d requests to %s/%s failed, sending them one by one: %s", len(batch), *key, e)
+                        SEND_TOTAL.inc(kind="split")
+                        await self._send_each(key, batch)
+                        continue
+                    SEND_TOTAL.inc(kind="failed")
+                    if not first.future.done():
+                        first.future.set_exception(e)
+                    continue
+            except asyncio.CancelledError:
+                # Closing: requests taken off the queue are failed here, the rest by close()
+                _fail_closed(batch)
+                raise
+
+            SEND_TOTAL.inc(kind="sent")
+            for request in batch:
+                if not request.future.done():
+                    request.future.set_result(sent)
+
+    async def close(self):
+        """
+        Stop the workers. Requests still queued or in flight fail with
+        RuntimeError rather than leaving their senders waiting.
+        """
+        for task in self._workers.values():
+            task.cancel()
+        await asyncio.gather(*self._workers.values(), return_exceptions=True)
+        for queue in self._queues.values():
+            _fail_closed(queue.pending)
+        self._workers.clear()
+        self._queues.clear()
+
+# Shared by every cog; DocBot feeds it rate-limit headers through http_trace
+send_scheduler = SendScheduler()
@@ -0,0 +1,68 @@
+import hashlib
+import re
+from typing import List, Optional
+
+# 64-bit fingerprints split into this many bands for the LSH lookup
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4
+BAND_BITS = SIMHASH_BITS // SIMHASH_BANDS
+# Words per shingle; texts shorter than MIN_WORDS get no fingerprint, as
+# a handful of words is too little to tell a copy from a coincidence
+SHINGLE_WORDS = 3
+MIN_WORDS = 8
+
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+def words(text: str) -> List[str]:
+    """Lower-cased words, ignoring punctuation and spacing."""
+    return _WORD.findall(text.lower())
+
+def _feature_hash(feature: str) -> int:
+    return int.from_bytes(hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest(), "big")
+
+def simhash(text: str) -> Optional[int]:
+    """
+    64-bit SimHash of `text` over overlapping word shingles.
+
+    Texts that differ in a few words get fingerprints that differ in a few
+    bits; re-spacing, re-casing or re-punctuating a text changes nothing.
+
+    Returns:
+        int: Unsigned 64-bit fingerprint, or None if the text is too short
+    """
+    tokens = words(text)
+    if len(tokens) < MIN_WORDS:
+        return None
+
+    weights = [0] * SIMHASH_BITS
+    for start in range(len(tokens) - SHINGLE_WORDS + 1):
+        value = _feature_hash(" ".join(tokens[start:start + SHINGLE_WORDS]))
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+
+    fingerprint = 0
+    for bit, weight in enumerate(weights):
+        if weight > 0:
+            fingerprint |= 1 << bit
+    return fingerprint
+
+def bands(fingerprint: int) -> List[int]:
+    """
+    The fingerprint cut into SIMHASH_BANDS integers of BAND_BITS bits.
+
+    Two fingerprints within SIMHASH_BANDS - 1 bits of each other agree on
+    at least one band, so looking up rows that share any band finds every
+    such near-duplicate.
+    """
+    mask = (1 << BAND_BITS) - 1
+    return [fingerprint >> (band * BAND_BITS) & mask for band in range(SIMHASH_BANDS)]
+
+def hamming(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+def to_signed(fingerprint: int) -> int:
+    """Fit an unsigned 64-bit fingerprint into a signed BIGINT column."""
+    return fingerprint - (1 << 64) if fingerprint >= 1 << 63 else fingerprint
+
+def to_unsigned(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
@@ -1,3 +1,7 @@
+from datetime import datetime, timezone
+
+DATE_FORMAT = "%d/%m/%Y"
+
 def validate_file(content: str) -> bool:
     """
     Validate the file content.
@@ -13,3 +17,9 @@ def validate_file(content: str) -> bool:
         
     # Add more validation rules as needed
     return True
+
+def parse_day(value: str) -> datetime:
+    """
+    Midnight UTC of a GG/MM/AAAA date. Raises ValueError if malformed.
+    """
+    return datetime.strptime(value.strip(), DATE_FORMAT).replace(tzinfo=timezone.utc)
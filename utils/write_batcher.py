@@ -0,0 +1,207 @@
+import asyncio
+import os
+import logging
+import time
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+from sqlalchemy.ext.asyncio import AsyncSession
+from utils.database import acquire_connection, get_sessionmaker, session_scope
+from utils.metrics import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Coalescing window in milliseconds; 0 commits every write on its own
+WRITE_BATCH_WINDOW_MS = float(os.environ.get("WRITE_BATCH_WINDOW_MS", 10))
+WRITE_BATCH_MAX_ROWS = int(os.environ.get("WRITE_BATCH_MAX_ROWS", 100))
+
+BATCH_SIZE = REGISTRY.histogram(
+    "docbot_write_batch_size", "Writes committed together per group commit",
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200)
+)
+WRITE_LATENCY = REGISTRY.histogram(
+    "docbot_write_batch_latency_seconds", "Time from submitting a write to its commit"
+)
+
+@dataclass
+class WriteOp:
+    """
+    A unit of work that can share a transaction with others.
+
+    stage adds the primary rows to the session without any I/O. After one
+    flush for the whole batch (a single multi-row INSERT per table),
+    finish runs with the primary keys populated, adds dependent rows and
+    returns the value handed back to the submitter.
+    """
+    stage: Callable[[AsyncSession], None]
+    finish: Callable[[AsyncSession], Awaitable[Any]]
+    rows: int = 1
+
+async def run_in_session(session: AsyncSession, op: WriteOp) -> Any:
+    op.stage(session)
+    await session.flush()
+    return await op.finish(session)
+
+class WriteBatcher:
+    """
+    Group commit for concurrent writes.
+
+    Writes submitted within `window` seconds of the first pending one (or
+    until `max_rows` rows are pending) are staged into one session, flushed
+    together and committed once. Each submitter still gets its own result
+    or exception: if the shared transaction fails, the batch is replayed
+    with a savepoint per write so only the failing ones are rejected.
+    """
+
+    def __init__(self, window: float, max_rows: int, latency_window: int = 10_000):
+        self.window = window
+        self.max_rows = max_rows
+        self._pending: List[Tuple[WriteOp, asyncio.Future, float]] = []
+        self._pending_rows = 0
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._flushes = set()
+
+        self.batches = 0
+        self.writes = 0
+        self.failures = 0
+        self.fallbacks = 0
+        self.latencies = deque(maxlen=latency_window)
+        self.batch_sizes = deque(maxlen=latency_window)
+
+    async def submit(self, op: WriteOp) -> Any:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((op, future, time.perf_counter()))
+        self._pending_rows += op.rows
+
+        if self._pending_rows >= self.max_rows:
+            self._start_flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._start_flush)
+
+        return await future
+
+    def _start_flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if not self._pending:
+            return
+
+        batch, self._pending, self._pending_rows = self._pending, [], 0
+        task = asyncio.get_running_loop().create_task(self._flush(batch))
+        self._flushes.add(task)
+        task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch: List[Tuple[WriteOp, asyncio.Future, float]]):
+        self.batches += 1
+        self.batch_sizes.append(len(batch))
+        BATCH_SIZE.observe(len(batch))
+        try:
+            try:
+                results = await self._commit_together([op for op, _, _ in batch])
+            except Exception as e:
+                logger.warning(f"Batched commit of {len(batch)} writes failed, isolating: {e}")
+                self.fallbacks += 1
+                results = await self._commit_isolated([op for op, _, _ in batch])
+
+            finished = time.perf_counter()
+            for (_, future, submitted), result in zip(batch, results):
+                self.writes += 1
+                self.latencies.append(finished - submitted)
+                WRITE_LATENCY.observe(finished - submitted)
+                if future.done():
+                    continue
+                if isinstance(result, BaseException):
+                    self.failures += 1
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+        finally:
+            # Cancellation (shutdown) or an unexpected error must not leave
+            # callers of submit() awaiting forever
+            for _, future, _ in batch:
+                if not future.done():
+                    self.failures += 1
+                    future.set_exception(RuntimeError("Write batch aborted before commit"))
+
+    async def _commit_together(self, ops: List[WriteOp]) -> List[Any]:
+        async with get_sessionmaker()() as session:
+            async with session.begin():
+                await acquire_connection(session)
+                for op in ops:
+                    op.stage(session)
+                await session.flush()
+                return [await op.finish(session) for op in ops]
+
+    async def _commit_isolated(self, ops: List[WriteOp]) -> List[Any]:
+        results: List[Any] = []
+        try:
+            async with get_sessionmaker()() as session:
+                async with session.begin():
+                    await acquire_connection(session)
+                    for op in ops:
+                        try:
+                            async with session.begin_nested():
+                                results.append(await run_in_session(session, op))
+                        except Exception as e:
+                            results.append(e)
+        except Exception as e:
+            # The commit itself failed, nothing in the batch was written
+            return [e] * len(ops)
+        return results
+
+    async def close(self):
+        """
+        Commit whatever is still pending and wait for in-flight batches.
+        """
+        self._start_flush()
+        if self._flushes:
+            await asyncio.gather(*self._flushes, return_exceptions=True)
+
+    def stats(self) -> dict:
+        ordered = sorted(self.latencies)
+
+        def pct(p: float) -> float:
+            if not ordered:
+                return 0.0
+            return ordered[min(len(ordered) - 1, int(p / 100 * len(ordered)))]
+
+        return {
+            "batches": self.batches,
+            "writes": self.writes,
+            "failures": self.failures,
+            "fallbacks": self.fallbacks,
+            "pending": len(self._pending),
+            "mean_batch_size": sum(self.batch_sizes) / len(self.batch_sizes) if self.batch_sizes else 0.0,
+            "latency_p50": pct(50),
+            "latency_p99": pct(99),
+        }
+
+_batcher: Optional[WriteBatcher] = None
+
+REGISTRY.gauge(
+    "docbot_write_batch_pending", "Writes waiting for the next group commit",
+    callback=lambda: len(_batcher._pending) if _batcher is not None else 0
+)
+
+def configure_write_batcher(window_ms: float = WRITE_BATCH_WINDOW_MS, max_rows: int = WRITE_BATCH_MAX_ROWS) -> Optional[WriteBatcher]:
+    global _batcher
+    _batcher = WriteBatcher(window_ms / 1000, max_rows) if window_ms > 0 else None
+    return _batcher
+
+def get_write_batcher() -> Optional[WriteBatcher]:
+    return _batcher
+
+async def close_write_batcher():
+    if _batcher is not None:
+        await _batcher.close()
+
+async def run_write(op: WriteOp) -> Any:
+    """
+    Execute a write, through the group-commit batcher when one is configured.
+    """
+    if _batcher is not None:
+        return await _batcher.submit(op)
+    async with session_scope() as session:
+        return await run_in_session(session, op)